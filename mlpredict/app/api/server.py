@@ -0,0 +1,430 @@
+"""
+轻量级异步HTTP推理服务
+
+基于 asyncio 标准库实现，模型常驻内存，提供以下接口:
+    POST /predict        单条预测，请求体 {"features": {原始回答}} 或 {"vector": [编码后的5个特征]}
+    POST /predict_batch  批量预测，请求体 {"rows": [{原始回答}, ...]} 或 {"vectors": [[...], ...]}
+    GET  /health         服务与模型状态（启用合批时附带合批统计）
+    GET  /models         模型清单中各模型的版本与加载状态
+    GET  /shadow         影子模型与生产模型的一致性统计（启用影子打分时）
+    GET  /drift          默认模型线上输入与打分的分布统计，设置参考分布时附带 PSI
+    GET  /metrics        Prometheus 文本格式的性能指标
+    GET  /metrics.json   JSON 格式的性能指标快照
+
+预测请求体中加 "explain": true 时，响应附带各特征相对于基线的对数几率贡献（contributions）。
+启用 micro_batcher 后，并发到达的 /predict 请求会被合并为一次批量预测。
+提供 model_registry 时，预测请求体中可用 "model" / "version" 指定清单中的模型，未指定时使用默认模型。
+提供 shadow_scorer 时，默认模型处理的预测请求会在后台再用候选模型打分，用于上线前对比。
+提供 audit_log 时，每个预测请求的回答、编码特征、模型指纹、分数和耗时由后台线程批量写入审计数据库。
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import queue
+import time
+from http import HTTPStatus
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from mlpredict.app.services.audit_log import AuditLog
+from mlpredict.app.services.drift_monitor import DriftMonitor
+from mlpredict.app.services.feature_processor import FeatureProcessor, FEATURE_KEYS
+from mlpredict.app.services.metrics import metrics
+from mlpredict.app.services.micro_batcher import MicroBatcher
+from mlpredict.app.services.model_registry import ModelRegistry
+from mlpredict.app.services.model_service import ModelService, FEATURE_NAMES
+from mlpredict.app.services.risk import positive_scores, risk_levels
+from mlpredict.app.services.shadow_scorer import ShadowScorer
+
+logger = logging.getLogger(__name__)
+
+# 请求体大小上限（字节）
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    """带HTTP状态码的请求错误"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PredictionAPI:
+    """与传输层无关的接口逻辑：解析请求体，调用特征处理和模型服务"""
+
+    def __init__(self, model_dir: str = 'models',
+                 feature_processor: Optional[FeatureProcessor] = None,
+                 model_service: Optional[ModelService] = None,
+                 micro_batcher: Optional[MicroBatcher] = None,
+                 model_registry: Optional[ModelRegistry] = None,
+                 shadow_scorer: Optional[ShadowScorer] = None,
+                 audit_log: Optional[AuditLog] = None):
+        self.feature_processor = feature_processor or FeatureProcessor()
+        self.model_registry = model_registry
+        if model_service is None:
+            model_service = model_registry.get() if model_registry is not None else ModelService(model_dir=model_dir)
+        self.model_service = model_service
+        self.micro_batcher = micro_batcher
+        self.shadow_scorer = shadow_scorer
+        self.audit_log = audit_log
+        self.routes = {
+            ('POST', '/predict'): self.predict_batched if micro_batcher else self.predict,
+            ('POST', '/predict_batch'): self.predict_batch,
+            ('GET', '/health'): self.health,
+            ('GET', '/models'): self.models,
+            ('GET', '/shadow'): self.shadow,
+            ('GET', '/drift'): self.drift,
+            ('GET', '/metrics'): lambda payload: metrics.to_prometheus(),
+            ('GET', '/metrics.json'): lambda payload: metrics.snapshot()
+        }
+
+    @property
+    def paths(self) -> set:
+        return {path for _, path in self.routes}
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, Union[dict, str]]:
+        """分发请求，返回 (状态码, 响应对象)；响应为字符串时按纯文本返回"""
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(p == path for _, p in self.routes):
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"Method {method} not allowed"}
+            return HTTPStatus.NOT_FOUND, {'error': f"Unknown path {path}"}
+
+        try:
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+            result = handler(payload)
+            if inspect.isawaitable(result):
+                result = await result
+            return HTTPStatus.OK, result
+        except json.JSONDecodeError as e:
+            metrics.inc('http_errors_total', status=HTTPStatus.BAD_REQUEST.value)
+            return HTTPStatus.BAD_REQUEST, {'error': f"Invalid JSON: {e}"}
+        except HTTPError as e:
+            metrics.inc('http_errors_total', status=e.status.value)
+            return e.status, {'error': e.message}
+        except Exception as e:
+            metrics.inc('http_errors_total', status=HTTPStatus.INTERNAL_SERVER_ERROR.value)
+            logger.error("Error handling %s %s: %s", method, path, e, exc_info=True)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Internal server error"}
+
+    def predict(self, payload: dict) -> dict:
+        """单条预测"""
+        started = time.perf_counter()
+        features = self._single_features(payload)
+        model_service = self._model_service(payload)
+        prediction, contributions = self._predict([features], model_service, explain=payload.get('explain'))
+        self._shadow(model_service, [features], prediction)
+        self._audit(model_service, [self._answers(payload)], [features], prediction, started)
+        response = self._single_response(features, prediction[0])
+        if payload.get('explain'):
+            response['contributions'] = self._contributions(contributions, 0)
+        return response
+
+    async def predict_batched(self, payload: dict) -> dict:
+        """单条预测，经合批器与其他并发请求合并打分（合批器只服务默认模型）"""
+        if 'model' in payload or 'version' in payload or payload.get('explain'):
+            return self.predict(payload)
+        started = time.perf_counter()
+        features = self._single_features(payload)
+        self._validate([features])
+        try:
+            row = await self.micro_batcher.predict_async(features)
+        except queue.Full:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Too many pending requests")
+        except RuntimeError as e:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        self._shadow(self.model_service, [features], [row])
+        self._audit(self.model_service, [self._answers(payload)], [features], [row], started)
+        return self._single_response(features, row)
+
+    def _single_features(self, payload: dict) -> list:
+        if 'vector' in payload:
+            return payload['vector']
+        if isinstance(payload.get('features'), dict):
+            try:
+                return self.feature_processor.process_all_features(payload['features'])
+            except (AttributeError, TypeError):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Feature values must be strings")
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected 'features' object or 'vector' list")
+
+    @staticmethod
+    def _single_response(features: list, prediction) -> dict:
+        score = positive_scores(np.atleast_1d(prediction)[np.newaxis, :])
+        return {
+            'risk_score': float(score[0]),
+            'risk_level': risk_levels(score)[0],
+            'prediction': np.atleast_1d(prediction).tolist(),
+            'features': features
+        }
+
+    def predict_batch(self, payload: dict) -> dict:
+        """批量预测，结果按列返回"""
+        started = time.perf_counter()
+        answers = None
+        if isinstance(payload.get('vectors'), list):
+            features = payload['vectors']
+        elif isinstance(payload.get('rows'), list):
+            if not all(isinstance(row, dict) for row in payload['rows']):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Each item of 'rows' must be an object")
+            import pandas as pd
+            try:
+                features = self.feature_processor.transform_frame(pd.DataFrame(payload['rows']))
+            except TypeError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Feature values must be strings")
+            answers = payload['rows']
+        else:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected 'rows' or 'vectors' list")
+
+        if len(features) == 0:
+            return {'count': 0, 'risk_scores': [], 'risk_levels': []}
+
+        model_service = self._model_service(payload)
+        prediction, contributions = self._predict(features, model_service, explain=payload.get('explain'))
+        self._shadow(model_service, features, prediction)
+        self._audit(model_service, answers, features, prediction, started)
+        scores = positive_scores(prediction)
+        response = {
+            'count': len(scores),
+            'risk_scores': scores.tolist(),
+            'risk_levels': risk_levels(scores).tolist()
+        }
+        if payload.get('explain'):
+            response['contribution_features'] = FEATURE_KEYS
+            response['contributions'] = None if contributions is None else contributions.tolist()
+        return response
+
+    def health(self, payload: dict) -> dict:
+        """服务与模型状态"""
+        info = self.model_service.get_model_info()
+        result = {
+            'status': 'ok' if info['model_loaded'] else 'unavailable',
+            'model_file': info['model_file'],
+            'model_type': info['model_type']
+        }
+        if info['model_name'] is not None:
+            result['model_name'] = info['model_name']
+            result['model_version'] = info['model_version']
+        if self.micro_batcher is not None:
+            result['micro_batching'] = self.micro_batcher.stats()
+        if self.audit_log is not None:
+            result['audit_log'] = self.audit_log.stats()
+        return result
+
+    def models(self, payload: dict) -> dict:
+        """模型清单中各模型的版本与加载状态"""
+        if self.model_registry is None:
+            info = self.model_service.get_model_info()
+            return {'models': [{
+                'name': info['model_name'], 'version': info['model_version'], 'default': True,
+                'model_loaded': info['model_loaded'], 'load_error': info['load_error']
+            }]}
+        return {'models': self.model_registry.list_models()}
+
+    def shadow(self, payload: dict) -> dict:
+        """影子模型与生产模型的一致性统计"""
+        if self.shadow_scorer is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Shadow scoring is not enabled on this server")
+        info = self.shadow_scorer.candidate.get_model_info()
+        return {
+            'candidate': {'name': info['model_name'], 'version': info['model_version'],
+                          'model_file': info['model_file']},
+            'stats': self.shadow_scorer.stats()
+        }
+
+    def drift(self, payload: dict) -> dict:
+        """默认模型的输入与打分分布统计"""
+        monitor = self.model_service.drift_monitor
+        if monitor is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Drift monitoring is not enabled on this server")
+        return monitor.report()
+
+    def _shadow(self, model_service: ModelService, features, prediction):
+        """默认模型的预测结果交给影子打分器在后台对比，不影响响应"""
+        if self.shadow_scorer is not None and model_service is self.model_service:
+            self.shadow_scorer.submit(features, prediction)
+
+    def _audit(self, model_service: ModelService, answers, features, prediction, started: float):
+        """预测记录放入审计日志的写入队列，不等待写入"""
+        if self.audit_log is not None:
+            self.audit_log.record_batch(answers, features, positive_scores(prediction),
+                                        time.perf_counter() - started,
+                                        model_sha256=model_service.model_fingerprint(), source='api')
+
+    @staticmethod
+    def _answers(payload: dict) -> Optional[dict]:
+        """请求中的原始回答，只提交编码后特征时为 None"""
+        return None if 'vector' in payload else payload.get('features')
+
+    def _model_service(self, payload: dict) -> ModelService:
+        """按请求体中的 model / version 选择模型服务"""
+        name, version = payload.get('model'), payload.get('version')
+        if name is None and version is None:
+            return self.model_service
+        if self.model_registry is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Model selection is not enabled on this server")
+        try:
+            return self.model_registry.get(name, None if version is None else str(version))
+        except KeyError as e:
+            raise HTTPError(HTTPStatus.NOT_FOUND, e.args[0])
+
+    @staticmethod
+    def _validate(features) -> np.ndarray:
+        """校验并转换为 (n, 5) 浮点数组"""
+        try:
+            features = np.array(features, dtype=np.float64)
+        except (ValueError, TypeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Feature vectors must be equal-length lists of numbers or null")
+        if features.ndim != 2 or features.shape[1] != len(FEATURE_NAMES):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Each feature vector must have {len(FEATURE_NAMES)} values")
+        return features
+
+    @staticmethod
+    def _contributions(contributions, row: int) -> Optional[dict]:
+        if contributions is None:
+            return None
+        return dict(zip(FEATURE_KEYS, contributions[row].tolist()))
+
+    def _predict(self, features, model_service: Optional[ModelService] = None, explain: bool = False):
+        """返回 (预测结果, 逐特征贡献)，不需要贡献或模型不支持时贡献为 None"""
+        model_service = model_service or self.model_service
+        features = self._validate(features)
+        if explain:
+            result = model_service.explain_batch(features)
+            prediction, contributions = result if result is not None else (None, None)
+        else:
+            prediction, contributions = model_service.predict_batch(features), None
+        if prediction is None:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE,
+                            f"Prediction failed: {model_service.load_error or 'model unavailable'}")
+        return prediction, contributions
+
+
+class HTTPServer:
+    """基于 asyncio 流的最小 HTTP/1.1 服务器，支持 keep-alive"""
+
+    def __init__(self, api: PredictionAPI, host: str = '0.0.0.0', port: int = 8000):
+        self.api = api
+        self.host = host
+        self.port = port
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write(writer, HTTPStatus.BAD_REQUEST, {'error': "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_SIZE:
+                    await self._write(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                      {'error': f"Content-Length must be between 0 and {MAX_BODY_SIZE}"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                path = target.split('?', 1)[0]
+                with metrics.timer('http_request'):
+                    status, payload = await self.api.handle(method.upper(), path, body)
+                metrics.inc('http_requests_total', path=path if path in self.api.paths else 'other')
+                await self._write(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Union[dict, str],
+                     keep_alive: bool):
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode('latin-1')
+        writer.write(head + body)
+        await writer.drain()
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        logger.info("API服务已启动: http://%s:%s", self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+
+def run_server(model_dir: str = 'models', host: str = '0.0.0.0', port: int = 8000,
+               micro_batch_size: int = 0, micro_batch_wait_ms: float = 2.0,
+               enable_metrics: bool = True, reload_interval: float = 0,
+               shadow_model: Optional[str] = None, drift_reference: Optional[str] = None,
+               audit_db: Optional[str] = None, audit_flush_interval: float = 1.0):
+    """启动HTTP推理服务（阻塞）
+
+    Args:
+        micro_batch_size: 合批的最大批大小，0 表示不启用合批
+        micro_batch_wait_ms: 合批的最长等待时间（毫秒）
+        enable_metrics: 是否收集性能指标（/metrics 接口）
+        reload_interval: 轮询模型文件变化的间隔（秒），大于0时模型文件更新后自动热更新
+        shadow_model: 影子打分使用的候选模型，清单中的 "名称" 或 "名称@版本"
+        drift_reference: 漂移监控的参考分布文件（run.py drift-profile 生成），/drift 接口据此计算 PSI
+        audit_db: 预测审计日志的 SQLite 数据库路径，None 表示不记录
+        audit_flush_interval: 审计日志攒批写入的最长间隔（秒）
+    """
+    if enable_metrics:
+        metrics.enable()
+    model_registry = ModelRegistry(model_dir=model_dir)
+    model_service = model_registry.get()
+    model_service.drift_monitor = DriftMonitor()
+    if drift_reference:
+        model_service.drift_monitor.set_reference(DriftMonitor.load(drift_reference))
+    if reload_interval > 0:
+        model_registry.start_watching(reload_interval)
+    micro_batcher = None
+    if micro_batch_size > 0:
+        micro_batcher = MicroBatcher(model_service, max_batch_size=micro_batch_size,
+                                     max_wait_ms=micro_batch_wait_ms)
+    shadow_scorer = None
+    if shadow_model:
+        name, _, version = shadow_model.partition('@')
+        shadow_scorer = ShadowScorer(model_registry.get(name, version or None))
+    audit_log = AuditLog(audit_db, flush_interval=audit_flush_interval) if audit_db else None
+    api = PredictionAPI(model_service=model_service, micro_batcher=micro_batcher, model_registry=model_registry,
+                        shadow_scorer=shadow_scorer, audit_log=audit_log)
+    if not api.model_service.model_loaded:
+        logger.warning("模型未加载，预测接口将返回503: %s", api.model_service.load_error)
+    try:
+        asyncio.run(HTTPServer(api, host=host, port=port).serve_forever())
+    except KeyboardInterrupt:
+        logger.info("API服务已停止")
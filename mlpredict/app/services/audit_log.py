@@ -0,0 +1,295 @@
+"""
+预测审计日志
+
+每次打分的原始回答、编码后的特征向量、模型指纹（模型文件 SHA-256）、阳性概率、风险等级和耗时
+写入本地 SQLite 数据库。调用方只把记录放入有界队列（微秒级），后台线程按批在一个事务中写入；
+数据库使用 WAL 模式，写入时不阻塞其它进程读取审计数据。
+队列已满时按 block_timeout 等待，仍无空位则丢弃并计数，审计不会拖慢或阻断预测请求。
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from mlpredict.app.services.metrics import metrics
+from mlpredict.app.services.risk import RISK_LEVELS, risk_level_codes
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# 设置后 Streamlit 界面把每次预测写入该审计数据库（run.py --audit-db 会设置）
+AUDIT_DB_ENV = 'MLPREDICT_AUDIT_DB'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source TEXT,
+    model_sha256 TEXT,
+    answers TEXT,
+    features TEXT NOT NULL,
+    risk_score REAL,
+    risk_level TEXT,
+    latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS predictions_created_at ON predictions (created_at);
+"""
+
+_INSERT = """
+INSERT INTO predictions (created_at, source, model_sha256, answers, features, risk_score, risk_level, latency_ms)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _json_value(value: Any) -> Any:
+    """NaN 写为 null"""
+    if value is None:
+        return None
+    value = float(value)
+    return None if value != value else value
+
+
+class AuditLog:
+    """后台批量写入 SQLite 的预测审计日志"""
+
+    def __init__(self, path: str, max_queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, block_timeout: float = 0.0):
+        """
+        Args:
+            path: SQLite 数据库文件路径，不存在时自动创建
+            max_queue_size: 等待写入的最大请求数（批量请求算一个）
+            batch_size: 每个事务最多写入的行数
+            flush_interval: 攒批的最长时间（秒），第一条记录入队后最迟这么久写入
+            block_timeout: 队列已满时最多等待的时间（秒），0 表示立即丢弃
+        """
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        if flush_interval <= 0:
+            raise ValueError(f"flush_interval must be positive, got {flush_interval}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._transactions = 0
+        self._write_seconds = 0.0
+
+        # 在调用方线程中建表，路径或权限错误在启动时即可发现
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        connection.close()
+
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # WAL 模式下 NORMAL 只在检查点时同步磁盘，断电最多丢失最近的事务，不会损坏数据库
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def record(self, answers: Optional[dict], features: Sequence[Any], score: float, latency_seconds: float,
+               model_sha256: Optional[str] = None, source: Optional[str] = None) -> bool:
+        """记录一次单条预测，入队失败（队列已满或已关闭）时返回 False
+
+        Args:
+            answers: 原始回答（问卷字段 -> 回答），只提交编码后特征时为 None
+            features: process_all_features 的结果
+            score: 阳性概率
+            latency_seconds: 本次预测的耗时
+            model_sha256: 模型指纹
+            source: 请求来源，如 'ui'、'api'
+        """
+        item = (time.time(), source, model_sha256, latency_seconds,
+                (None if answers is None else dict(answers),), (list(features),), (score,))
+        return self._put(item, 1)
+
+    def record_batch(self, answers: Optional[Sequence[Optional[dict]]], features: Any, scores: Any,
+                     latency_seconds: float, model_sha256: Optional[str] = None,
+                     source: Optional[str] = None) -> bool:
+        """记录一次批量预测（一次入队），各行的耗时均为整个批量请求的耗时
+
+        features 和 scores 复制后入队，调用方之后修改或复用这些数组不影响写入的内容。
+
+        Raises:
+            ValueError: answers、features 与 scores 的行数不一致，或特征不是数值（或 None）
+        """
+        features = np.array(features, dtype=np.float64, copy=True)
+        scores = np.array(scores, dtype=np.float64, copy=True).reshape(-1)
+        n = len(scores)
+        if len(features) != n or (answers is not None and len(answers) != n):
+            raise ValueError(f"Audit batch rows mismatch: {0 if answers is None else len(answers)} answers, "
+                             f"{len(features)} feature rows, {n} scores")
+        if n and features.ndim != 2:
+            raise ValueError(f"Expected audit features of shape (n, k), got {features.shape}")
+        answers = (None,) * n if answers is None else tuple(answers)
+        item = (time.time(), source, model_sha256, latency_seconds, answers, features, scores)
+        return self._put(item, n)
+
+    def _put(self, item: tuple, rows: int) -> bool:
+        if self._closed:
+            return False
+        try:
+            if self.block_timeout > 0:
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += rows
+            metrics.inc('audit_records_dropped_total', rows)
+            return False
+        with self._stats_lock:
+            self._submitted += rows
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已入队的记录全部写入，超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """写完已入队的记录后停止后台线程，最多等待 timeout 秒（None 表示一直等待）"""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Audit log queue still full after %ss, %d pending records not written to %s",
+                           timeout, self._queue.qsize(), self.path)
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        connection = self._connect()
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is _STOP:
+                    self._queue.task_done()
+                    break
+
+                # 攒批：直到行数达到 batch_size 或距第一条记录入队超过 flush_interval
+                items = [item]
+                rows = len(item[6])
+                deadline = time.monotonic() + self.flush_interval
+                while rows < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._queue.task_done()
+                        stop = True
+                        break
+                    items.append(item)
+                    rows += len(item[6])
+
+                try:
+                    self._write(connection, items)
+                except Exception as e:
+                    # 写入出错时整批计为失败，后台线程继续处理后续记录
+                    self._fail(sum(len(item[6]) for item in items), e)
+                finally:
+                    for _ in items:
+                        self._queue.task_done()
+        finally:
+            connection.close()
+
+    def _write(self, connection: sqlite3.Connection, items: Sequence[tuple]):
+        start = time.perf_counter()
+        rows = []
+        for item in items:
+            try:
+                rows.extend(self._rows(item))
+            except Exception as e:
+                # 无法序列化的记录单独计为失败，不影响同一事务中的其它记录
+                self._fail(len(item[6]), e)
+        if not rows:
+            return
+        count = len(rows)
+        try:
+            with connection:
+                connection.executemany(_INSERT, rows)
+        except sqlite3.Error as e:
+            self._fail(count, e)
+            return
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._written += count
+            self._transactions += 1
+            self._write_seconds += elapsed
+        metrics.inc('audit_records_written_total', count)
+
+    def _fail(self, count: int, error: Exception):
+        with self._stats_lock:
+            self._failed += count
+        metrics.inc('audit_records_failed_total', count)
+        logger.error("Failed to write %d audit records to %s: %s", count, self.path, error)
+
+    @staticmethod
+    def _rows(item: tuple) -> list:
+        """把一个队列项展开为数据库行（序列化在后台线程中进行）"""
+        created_at, source, model_sha256, latency, answers, features, scores = item
+        scores = np.asarray(scores, dtype=np.float64)
+        levels = risk_level_codes(np.nan_to_num(scores, nan=0.0))
+        latency_ms = latency * 1000.0
+        features = features.tolist() if isinstance(features, np.ndarray) else features
+        return [
+            (created_at, source, model_sha256,
+             None if answers[i] is None else json.dumps(answers[i], ensure_ascii=False),
+             json.dumps([_json_value(v) for v in features[i]]),
+             _json_value(scores[i]),
+             None if scores[i] != scores[i] else RISK_LEVELS[levels[i]],
+             latency_ms)
+            for i in range(len(scores))
+        ]
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                'path': self.path,
+                'submitted': self._submitted,
+                'written': self._written,
+                'dropped': self._dropped,
+                'failed': self._failed,
+                'pending': self._queue.qsize(),
+                'transactions': self._transactions,
+                'write_seconds': self._write_seconds
+            }
+
+
+def audit_log_from_env(**kwargs) -> Optional[AuditLog]:
+    """环境变量 MLPREDICT_AUDIT_DB 指定了数据库路径时创建审计日志，否则返回 None"""
+    path = os.environ.get(AUDIT_DB_ENV)
+    return AuditLog(path, **kwargs) if path else None
@@ -0,0 +1,216 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from mlpredict.app.services import columnar_io
+from mlpredict.app.services.cohort_aggregator import CohortAggregator
+from mlpredict.app.services.feature_processor import FeatureProcessor, FEATURE_KEYS
+from mlpredict.app.services.feature_schema import FEATURE_NAMES
+from mlpredict.app.services.model_service import ModelService
+from mlpredict.app.services.risk import positive_scores, risk_levels
+
+# 问卷导出文件中的中文列名 -> 原始回答字段名
+COLUMN_ALIASES = dict(zip(FEATURE_NAMES, FEATURE_KEYS))
+
+# 输入文件中可能出现的特征列名（字段名或中文列名），读取列式文件时保持字典编码
+FEATURE_COLUMNS = FEATURE_KEYS + FEATURE_NAMES
+
+# 进度回调：每处理完一个分块调用一次，参数为 (已处理行数, 已用秒数)
+ProgressCallback = Callable[[int, float], None]
+
+
+def detect_separator(path: str) -> str:
+    """根据文件扩展名判断分隔符"""
+    return '\t' if os.path.splitext(path)[1].lower() in ('.tsv', '.tab', '.txt') else ','
+
+
+class BatchScorer:
+    """问卷导出文件的流式批量打分
+
+    按固定大小的分块读取原始回答，每块批量完成特征编码和模型预测后立即写出，
+    内存占用只与分块大小有关，与文件总行数无关。
+    """
+
+    def __init__(self, model_dir: str = 'models', chunk_size: int = 50000,
+                 feature_processor: Optional[FeatureProcessor] = None,
+                 model_service: Optional[ModelService] = None):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        self.chunk_size = chunk_size
+        self.feature_processor = feature_processor or FeatureProcessor()
+        self.model_service = model_service or ModelService(model_dir=model_dir)
+
+    def iter_chunks(self, input_path: str, sep: Optional[str] = None,
+                    encoding: str = 'utf-8') -> Iterator[Any]:
+        """按分块读取原始回答
+
+        CSV/TSV 和 .xlsx 产出 DataFrame，所有列按字符串读取，空单元格保留为空字符串；
+        Parquet/Arrow 产出 pyarrow 记录批，特征列保持字典编码。
+        """
+        input_format = columnar_io.file_format(input_path)
+        if input_format in columnar_io.COLUMNAR_FORMATS:
+            return columnar_io.iter_record_batches(input_path, self.chunk_size, dictionary_columns=FEATURE_COLUMNS)
+        if input_format == 'xlsx':
+            return columnar_io.iter_xlsx_frames(input_path, self.chunk_size)
+        return pd.read_csv(
+            input_path,
+            sep=sep or detect_separator(input_path),
+            dtype=str,
+            keep_default_na=False,
+            encoding=encoding,
+            chunksize=self.chunk_size
+        )
+
+    def score_chunk(self, chunk: Any) -> Any:
+        """为一个分块（DataFrame 或记录批）追加 risk_score 和 risk_level 两列"""
+        return self.attach_scores(chunk, self.compute_scores(chunk))
+
+    @staticmethod
+    def feature_columns(chunk: Any) -> pd.DataFrame:
+        """分块中的特征列，记录批中字典编码的列转换为 Categorical"""
+        if isinstance(chunk, pd.DataFrame):
+            return chunk[[c for c in chunk.columns if c in FEATURE_KEYS or c in COLUMN_ALIASES]]
+        return columnar_io.feature_frame(chunk, FEATURE_COLUMNS)
+
+    @staticmethod
+    def aggregation_columns(chunk: Any, group_by: Iterable[str]) -> pd.DataFrame:
+        """分块中的特征列和分组列，记录批中字典编码的列转换为 Categorical"""
+        group_by = list(group_by)
+        if isinstance(chunk, pd.DataFrame):
+            missing = [c for c in group_by if c not in chunk.columns]
+            if missing:
+                raise KeyError(f"Group columns not found in input: {missing}")
+            columns = [c for c in chunk.columns if c in FEATURE_KEYS or c in COLUMN_ALIASES or c in group_by]
+            return chunk[columns]
+        missing = [c for c in group_by if c not in chunk.schema.names]
+        if missing:
+            raise KeyError(f"Group columns not found in input: {missing}")
+        return columnar_io.feature_frame(chunk, list(dict.fromkeys(FEATURE_COLUMNS + group_by)))
+
+    def compute_scores(self, chunk: Any) -> np.ndarray:
+        """批量编码并预测一个分块，返回阳性概率"""
+        if not isinstance(chunk, pd.DataFrame):
+            chunk = self.feature_columns(chunk)
+        answers = chunk.rename(columns=COLUMN_ALIASES)
+        prediction = self.model_service.predict_batch(self.feature_processor.transform_frame(answers))
+        if prediction is None:
+            raise RuntimeError(f"Prediction failed: {self.model_service.load_error or 'see log for details'}")
+        return positive_scores(prediction)
+
+    @staticmethod
+    def attach_scores(chunk: Any, scores: np.ndarray) -> Any:
+        """将打分结果追加到分块末尾"""
+        if not isinstance(chunk, pd.DataFrame):
+            return columnar_io.append_scores(chunk, scores)
+        result = chunk.copy(deep=False)
+        result['risk_score'] = scores
+        result['risk_level'] = risk_levels(scores)
+        return result
+
+    def score_chunks(self, chunks: Iterable[Any]) -> Iterator[Any]:
+        """依次为每个分块打分，按输入顺序产出结果"""
+        for chunk in chunks:
+            yield self.score_chunk(chunk)
+
+    def aggregate_chunks(self, chunks: Iterable[Any], aggregator: CohortAggregator) -> Iterator[int]:
+        """依次为每个分块打分并按组累加到 aggregator，不保留逐行分数，产出每块的行数"""
+        for chunk in chunks:
+            frame = self.aggregation_columns(chunk, aggregator.group_by)
+            aggregator.update(frame, self.compute_scores(frame))
+            yield len(frame)
+
+    def aggregate_file(self, input_path: str, group_by: Iterable[str], output_path: Optional[str] = None,
+                       bands: Optional[dict] = None, score_bins: int = 10, sep: Optional[str] = None,
+                       encoding: str = 'utf-8', progress: Optional[ProgressCallback] = None) -> dict:
+        """流式读取整个文件一次，按分组汇总风险分布
+
+        Args:
+            input_path: 输入文件路径
+            group_by: 分组列名
+            output_path: 汇总表输出路径（CSV/TSV 或 Parquet，按扩展名判断），为 None 时不写出
+            bands: 数值列的分段边界，见 CohortAggregator
+            score_bins: 分数直方图的分箱数
+            progress: 进度回调，见 ProgressCallback
+
+        Returns:
+            dict: 处理行数、分组数、耗时(秒)、吞吐量(行/秒)和汇总表(report, DataFrame)
+        """
+        aggregator = CohortAggregator(group_by, bands=bands, score_bins=score_bins)
+        rows = 0
+        start = time.perf_counter()
+        chunks = self.iter_chunks(input_path, sep=sep, encoding=encoding)
+        for chunk_rows in self.aggregate_chunks(chunks, aggregator):
+            rows += chunk_rows
+            if progress is not None:
+                progress(rows, time.perf_counter() - start)
+
+        report = aggregator.report()
+        if output_path:
+            output_format = columnar_io.file_format(output_path)
+            if output_format == 'parquet':
+                columnar_io._import_pyarrow()
+                report.to_parquet(output_path, index=False)
+            elif output_format == 'csv':
+                report.to_csv(output_path, sep=detect_separator(output_path), index=False, encoding=encoding)
+            else:
+                raise ValueError(f"Unsupported report format: {output_path} (use .csv, .tsv or .parquet)")
+
+        elapsed = time.perf_counter() - start
+        return {
+            'rows': rows,
+            'groups': len(report),
+            'seconds': elapsed,
+            'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0,
+            'report': report
+        }
+
+    def score_file(self, input_path: str, output_path: str, sep: Optional[str] = None,
+                   encoding: str = 'utf-8', progress: Optional[ProgressCallback] = None) -> dict:
+        """对整个文件打分并增量写出结果
+
+        输出格式由扩展名决定：Parquet 每个分块写成一个行组，Arrow 每个分块写成一个记录批，其余按 CSV/TSV 写出。
+        progress 为进度回调，见 ProgressCallback。
+
+        Returns:
+            dict: 处理行数、耗时(秒)和吞吐量(行/秒)
+        """
+        columnar = columnar_io.file_format(output_path) in columnar_io.COLUMNAR_FORMATS
+        output_sep = detect_separator(output_path)
+        rows = 0
+        start = time.perf_counter()
+
+        chunks = self.iter_chunks(input_path, sep=sep, encoding=encoding)
+        writer = columnar_io.RecordBatchWriter(output_path) if columnar else None
+        try:
+            for i, scored in enumerate(self.score_chunks(chunks)):
+                if columnar:
+                    if isinstance(scored, pd.DataFrame):
+                        scored = columnar_io.to_record_batch(scored)
+                    writer.write(scored)
+                    rows += scored.num_rows
+                else:
+                    if not isinstance(scored, pd.DataFrame):
+                        scored = scored.to_pandas()
+                    scored.to_csv(
+                        output_path,
+                        sep=output_sep,
+                        index=False,
+                        header=(i == 0),
+                        mode='w' if i == 0 else 'a',
+                        encoding=encoding
+                    )
+                    rows += len(scored)
+                if progress is not None:
+                    progress(rows, time.perf_counter() - start)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        elapsed = time.perf_counter() - start
+        return {
+            'rows': rows,
+            'seconds': elapsed,
+            'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0
+        }
@@ -0,0 +1,165 @@
+"""
+人群分组的风险汇总
+
+按地区、年龄段等任意问卷列分组，统计每组的人数、平均风险、风险标准差、各风险等级人数和分数直方图。
+每个分块只保留按组汇总的累加量（人数、分数和、分数平方和、等级计数、直方图计数），
+分块内用 NumPy bincount 向量化累加，分块之间、工作进程之间按组相加合并，
+内存占用只与分组数有关，不保存逐行分数。
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from mlpredict.app.services.risk import RISK_LEVELS, risk_level_codes
+
+# 分组键组合数超过该值时改用 np.unique 按行去重，避免 ravel_multi_index 溢出
+_MAX_RAVEL_SIZE = 2 ** 62
+
+
+def band_labels(edges: Sequence[float]) -> list:
+    """分段标签，如 [0, 18, 40, inf] -> ['0-18', '18-40', '40+']（左闭右开）"""
+    return [f"{lo:g}+" if np.isinf(hi) else f"{lo:g}-{hi:g}" for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def parse_bands(specs: Sequence[str]) -> Dict[str, list]:
+    """解析命令行的分段定义，如 'age=0,18,40,60,inf'"""
+    bands = {}
+    for spec in specs:
+        column, sep, values = spec.partition('=')
+        if not sep or not column:
+            raise ValueError(f"Invalid band spec {spec!r}, expected COLUMN=EDGE,EDGE,...")
+        bands[column] = [float(v) for v in values.split(',')]
+    return bands
+
+
+class CohortAggregator:
+    """可合并的分组风险汇总"""
+
+    def __init__(self, group_by: Sequence[str], bands: Optional[Dict[str, Sequence[float]]] = None,
+                 score_bins: int = 10):
+        """
+        Args:
+            group_by: 分组列名（问卷导出文件中的任意列）
+            bands: 需要分段的数值列及其分段边界（左闭右开），如 {'age': [0, 18, 40, 60, inf]}，
+                列必须在 group_by 中；无法转换为数值或不在任何分段内的值归入空分组
+            score_bins: 分数直方图在 [0, 1] 上的等宽分箱数
+        """
+        if not group_by:
+            raise ValueError("group_by must contain at least one column")
+        if score_bins <= 0:
+            raise ValueError(f"score_bins must be positive, got {score_bins}")
+        bands = {column: [float(e) for e in edges] for column, edges in (bands or {}).items()}
+        unknown = [column for column in bands if column not in group_by]
+        if unknown:
+            raise ValueError(f"Band columns {unknown} are not in group_by {list(group_by)}")
+        for column, edges in bands.items():
+            if len(edges) < 2 or any(lo >= hi for lo, hi in zip(edges[:-1], edges[1:])):
+                raise ValueError(f"Band edges for {column!r} must be increasing with at least two values")
+        self.group_by = list(group_by)
+        self.bands = bands
+        self.score_bins = score_bins
+        edges = np.linspace(0.0, 1.0, score_bins + 1)
+        self.histogram_columns = [f"score_{lo:.2f}_{hi:.2f}" for lo, hi in zip(edges[:-1], edges[1:])]
+        # 每组的累加量：人数、分数和、分数平方和、各风险等级人数、直方图计数
+        self.columns = ['count', 'score_sum', 'score_sq_sum'] + list(RISK_LEVELS) + self.histogram_columns
+        self._table = None
+
+    def config(self) -> dict:
+        """构造参数，用于在工作进程中创建相同配置的汇总器"""
+        return {'group_by': self.group_by, 'bands': self.bands, 'score_bins': self.score_bins}
+
+    def _key_column(self, groups: pd.DataFrame, column: str):
+        values = groups[column]
+        if column not in self.bands:
+            return values
+        edges = self.bands[column]
+        return pd.cut(pd.to_numeric(values, errors='coerce'), edges, right=False, labels=band_labels(edges))
+
+    def partial(self, groups: pd.DataFrame, scores) -> pd.DataFrame:
+        """计算一个分块的分组累加量
+
+        Args:
+            groups: 包含分组列的 DataFrame（Categorical 列直接使用其字典编码）
+            scores: 与 groups 逐行对应的阳性概率
+
+        Returns:
+            pd.DataFrame: 以分组键为索引、self.columns 为列的累加量
+        """
+        missing = [c for c in self.group_by if c not in groups.columns]
+        if missing:
+            raise KeyError(f"Group columns not found in input: {missing}")
+        scores = np.asarray(scores, dtype=np.float64)
+        if len(scores) != len(groups):
+            raise ValueError(f"Expected {len(groups)} scores, got {len(scores)}")
+
+        # 各分组列分别编码（空值单独成组），再组合为一维的分组编号
+        codes, uniques = [], []
+        for column in self.group_by:
+            column_codes, column_uniques = pd.factorize(self._key_column(groups, column), use_na_sentinel=False)
+            codes.append(column_codes)
+            uniques.append(np.asarray(column_uniques, dtype=object))
+        shape = tuple(max(len(u), 1) for u in uniques)
+        if float(np.prod(shape, dtype=np.float64)) < _MAX_RAVEL_SIZE:
+            group_codes, group_ids = np.unique(np.ravel_multi_index(codes, shape), return_inverse=True)
+            key_codes = np.unravel_index(group_codes, shape)
+        else:
+            key_codes, group_ids = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+            key_codes = key_codes.T
+        group_ids = group_ids.reshape(-1)
+        n_groups = len(key_codes[0])
+
+        bins = np.clip((scores * self.score_bins).astype(np.int64), 0, self.score_bins - 1)
+        levels = risk_level_codes(scores)
+        n_levels = len(RISK_LEVELS)
+        values = np.column_stack([
+            np.bincount(group_ids, minlength=n_groups),
+            np.bincount(group_ids, weights=scores, minlength=n_groups),
+            np.bincount(group_ids, weights=scores * scores, minlength=n_groups),
+            np.bincount(group_ids * n_levels + levels, minlength=n_groups * n_levels).reshape(n_groups, n_levels),
+            np.bincount(group_ids * self.score_bins + bins,
+                        minlength=n_groups * self.score_bins).reshape(n_groups, self.score_bins)
+        ]).astype(np.float64)
+        keys = [u[k] for u, k in zip(uniques, key_codes)]
+        if len(keys) == 1:
+            index = pd.Index(keys[0], dtype=object, name=self.group_by[0])
+        else:
+            index = pd.MultiIndex.from_arrays(keys, names=self.group_by)
+        return pd.DataFrame(values, index=index, columns=self.columns)
+
+    def update(self, groups: pd.DataFrame, scores):
+        """累加一个分块"""
+        self.merge(self.partial(groups, scores))
+
+    def merge(self, other):
+        """按组相加合并另一个汇总器或 partial() 的结果"""
+        table = other._table if isinstance(other, CohortAggregator) else other
+        if table is None or table.empty:
+            return
+        if self._table is None:
+            self._table = table.copy()
+            return
+        levels = self.group_by if len(self.group_by) > 1 else self.group_by[0]
+        self._table = pd.concat([self._table, table]).groupby(level=levels, sort=False, dropna=False).sum()
+
+    def report(self) -> pd.DataFrame:
+        """每组一行的汇总表：人数、平均风险、风险标准差、各风险等级人数与占比、分数直方图"""
+        if self._table is None:
+            return pd.DataFrame(columns=self.group_by + ['count', 'mean_risk', 'std_risk'])
+        table = self._table.sort_index()
+        count = table['count'].to_numpy()
+        mean = table['score_sum'].to_numpy() / count
+        variance = np.maximum(table['score_sq_sum'].to_numpy() / count - mean * mean, 0.0)
+
+        report = pd.DataFrame(index=table.index)
+        report['count'] = count.astype(np.int64)
+        report['mean_risk'] = mean
+        report['std_risk'] = np.sqrt(variance)
+        for level in RISK_LEVELS:
+            report[level] = table[level].to_numpy().astype(np.int64)
+        for level in RISK_LEVELS:
+            report[f'{level}_ratio'] = table[level].to_numpy() / count
+        for column in self.histogram_columns:
+            report[column] = table[column].to_numpy().astype(np.int64)
+        return report.reset_index()
@@ -0,0 +1,210 @@
+"""
+列式文件（Parquet / Arrow）与 Excel 的流式读写
+
+Parquet 按行组、Arrow IPC 按记录批读取，问卷回答列保持字典编码：转换为 pandas 后是 Categorical，
+特征编码只需对字典中的少量取值编码再按下标映射，不必处理上百万个字符串。
+打分结果作为新列追加到原记录批上写出，原有列不经过 pandas 转换。
+.xlsx 以 openpyxl 只读模式逐行读取，按分块产出 DataFrame。
+
+pyarrow 和 openpyxl 为可选依赖，只在读写对应格式时导入。
+"""
+
+import os
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from mlpredict.app.services.risk import RISK_LEVELS, risk_level_codes
+
+# 扩展名 -> 文件格式，其余扩展名按 CSV/TSV 处理
+FILE_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.xlsx': 'xlsx'
+}
+
+# 读写时使用 pyarrow 记录批的格式
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+
+def file_format(path: str) -> str:
+    """根据扩展名判断文件格式：'parquet'、'arrow'、'xlsx' 或 'csv'"""
+    return FILE_FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Reading or writing Parquet/Arrow files requires pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def iter_record_batches(path: str, batch_size: int,
+                        dictionary_columns: Sequence[str] = ()) -> Iterator['pyarrow.RecordBatch']:
+    """按记录批读取 Parquet / Arrow IPC 文件
+
+    Args:
+        path: 输入文件路径
+        batch_size: 每批最多的行数
+        dictionary_columns: 需要保持字典编码的列（文件中不存在的列忽略），
+            Parquet 直接读取字典页，Arrow 中未做字典编码的字符串列在读取后编码
+    """
+    pa = _import_pyarrow()
+    import pyarrow.compute as pc
+
+    if file_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        names = set(pq.read_schema(path).names)
+        parquet_file = pq.ParquetFile(path, read_dictionary=[c for c in dictionary_columns if c in names])
+        batches = parquet_file.iter_batches(batch_size=batch_size)
+    else:
+        batches = _iter_ipc_batches(path, batch_size)
+
+    dictionary_columns = set(dictionary_columns)
+    for batch in batches:
+        columns = batch.columns
+        for i, name in enumerate(batch.schema.names):
+            column_type = columns[i].type
+            if name in dictionary_columns and (pa.types.is_string(column_type) or pa.types.is_large_string(column_type)):
+                columns[i] = pc.dictionary_encode(columns[i])
+        yield pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def _iter_ipc_batches(path: str, batch_size: int):
+    """读取 Arrow IPC 文件（随机访问格式或流格式），超过 batch_size 的记录批切分后产出"""
+    pa = _import_pyarrow()
+    import pyarrow.ipc as ipc
+
+    with pa.memory_map(path, 'r') as source:
+        try:
+            reader = ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            batches = iter(ipc.open_stream(source))
+        for batch in batches:
+            for offset in range(0, batch.num_rows, batch_size):
+                yield batch.slice(offset, batch_size)
+
+
+def iter_xlsx_frames(path: str, chunk_size: int, sheet_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """以只读模式逐行读取 .xlsx，第一行为表头，每 chunk_size 行产出一个字符串 DataFrame（空单元格为空字符串）"""
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError("Reading .xlsx files requires openpyxl: pip install openpyxl") from e
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = ['' if v is None else str(v) for v in header]
+        chunk = []
+        for row in rows:
+            chunk.append(['' if v is None else str(v) for v in row])
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk, columns=columns, dtype=object)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, dtype=object)
+    finally:
+        workbook.close()
+
+
+def feature_frame(batch, columns: Sequence[str]) -> pd.DataFrame:
+    """取出记录批中的特征列，字典编码的列转换为 Categorical（只转换下标和字典，不展开字符串）"""
+    names = batch.schema.names
+    return pd.DataFrame({
+        name: batch.column(names.index(name)).to_pandas() for name in columns if name in names
+    })
+
+
+def append_scores(batch, scores: np.ndarray):
+    """在记录批末尾追加 risk_score（float64，直接引用数组内存）和 risk_level（字典编码）两列"""
+    pa = _import_pyarrow()
+    scores = np.ascontiguousarray(scores, dtype=np.float64)
+    levels = pa.DictionaryArray.from_arrays(
+        pa.array(risk_level_codes(scores).astype(np.int8)), pa.array(RISK_LEVELS)
+    )
+    return pa.RecordBatch.from_arrays(
+        batch.columns + [pa.array(scores), levels],
+        names=batch.schema.names + ['risk_score', 'risk_level']
+    )
+
+
+def to_record_batch(frame: pd.DataFrame):
+    """DataFrame 分块转换为记录批，risk_level 列按固定字典编码"""
+    pa = _import_pyarrow()
+    data = frame.drop(columns=['risk_score', 'risk_level'], errors='ignore')
+    batch = pa.RecordBatch.from_pandas(data, preserve_index=False)
+    if 'risk_score' in frame.columns:
+        batch = append_scores(batch, frame['risk_score'].to_numpy())
+    return batch
+
+
+class RecordBatchWriter:
+    """按记录批写出 Parquet / Arrow IPC 文件，首批确定文件的列结构
+
+    Arrow IPC 文件中每列只能有一个字典，因此写 Arrow 时输入的字典编码列解码为普通列，
+    risk_level 的字典固定不变，保持字典编码。
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = 'snappy'):
+        self.path = path
+        self.format = file_format(path)
+        if self.format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported columnar output format: {path}")
+        self.compression = compression
+        self.rows = 0
+        self._writer = None
+        self._sink = None
+
+    def write(self, batch):
+        pa = _import_pyarrow()
+        if self.format == 'arrow':
+            batch = self._decode_dictionaries(batch)
+        if self._writer is None:
+            if self.format == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, batch.schema, compression=self.compression)
+            else:
+                import pyarrow.ipc as ipc
+                self._sink = pa.OSFile(self.path, 'wb')
+                self._writer = ipc.new_file(self._sink, batch.schema)
+        if self.format == 'parquet':
+            # 每个记录批写成一个行组
+            self._writer.write_batch(batch, row_group_size=max(batch.num_rows, 1))
+        else:
+            self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    @staticmethod
+    def _decode_dictionaries(batch):
+        pa = _import_pyarrow()
+        columns = batch.columns
+        for i, name in enumerate(batch.schema.names):
+            if name != 'risk_level' and pa.types.is_dictionary(columns[i].type):
+                columns[i] = columns[i].dictionary_decode()
+        return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    def __enter__(self) -> 'RecordBatchWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,303 @@
+"""
+线上输入与打分分布的漂移监控
+
+DriftMonitor 用固定大小的计数数组记录：
+    - 五个编码后特征的取值分布（取值域见 FEATURE_DOMAINS，另设一个"域外"计数）
+    - 阳性概率的分位数草图：[0, 1] 上 1000 个等宽分箱的直方图，分位数误差不超过 0.001
+    - 低/中/高风险等级（阈值 0.3/0.7）的占比
+单条更新只追加到定长缓冲区，攒满后批量计数，开销与已记录的行数无关；所有统计都是计数，多个进程的监控器可以直接相加合并。
+与参考分布（如训练数据或上线时的打分结果，由 run.py drift-profile 生成）比较时按需计算 PSI。
+"""
+
+import json
+import math
+import os
+import threading
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS, FEATURE_KEYS
+from mlpredict.app.services.risk import RISK_LEVELS, positive_scores, risk_level_codes
+
+PROFILE_FORMAT = 'mlpredict-drift-profile'
+PROFILE_VERSION = 1
+
+# 计算 PSI 时各分箱占比的下限，避免空分箱取对数
+PSI_EPSILON = 1e-4
+
+# 常用的 PSI 判断标准：< 0.1 稳定，0.1~0.25 轻微漂移，> 0.25 显著漂移
+PSI_THRESHOLDS = [0.1, 0.25]
+
+
+def psi(expected: Sequence[float], actual: Sequence[float], epsilon: float = PSI_EPSILON) -> Optional[float]:
+    """两组分箱计数的群体稳定性指数 PSI = Σ (实际占比 - 参考占比) × ln(实际占比 / 参考占比)，任一组为空时返回 None"""
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if expected.sum() <= 0 or actual.sum() <= 0:
+        return None
+    p = np.maximum(expected / expected.sum(), epsilon)
+    q = np.maximum(actual / actual.sum(), epsilon)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+class _FeatureCounter:
+    """一个编码后特征的取值计数：取值域中的每个值一格，最后一格为域外取值"""
+
+    __slots__ = ('labels', 'index', 'missing_index', 'other_index', 'lookup')
+
+    def __init__(self, domain: Sequence[Optional[float]]):
+        values = [v for v in domain if v is not None]
+        self.labels = [str(v) for v in values] + (['missing'] if None in domain else []) + ['other']
+        self.index = {float(v): i for i, v in enumerate(values)}
+        self.other_index = len(self.labels) - 1
+        self.missing_index = len(values) if None in domain else self.other_index
+        # 批量更新用的查找表：非负整数取值 -> 格下标
+        size = int(max(values)) + 1 if values else 0
+        self.lookup = np.full(size, self.other_index, dtype=np.intp)
+        for v, i in self.index.items():
+            if v == int(v) and v >= 0:
+                self.lookup[int(v)] = i
+
+    def slots(self, column: np.ndarray) -> np.ndarray:
+        result = np.full(len(column), self.other_index, dtype=np.intp)
+        result[np.isnan(column)] = self.missing_index
+        as_int = np.floor(np.nan_to_num(column, nan=-1.0))
+        valid = (as_int == column) & (as_int >= 0) & (as_int < len(self.lookup))
+        result[valid] = self.lookup[as_int[valid].astype(np.intp)]
+        return result
+
+
+class DriftMonitor:
+    """恒定内存、可合并的输入与打分分布统计"""
+
+    def __init__(self, score_bins: int = 1000, domains: Sequence[Sequence[Optional[float]]] = FEATURE_DOMAINS,
+                 feature_keys: Sequence[str] = FEATURE_KEYS, buffer_size: int = 1024):
+        """
+        Args:
+            score_bins: 阳性概率直方图的分箱数
+            domains: 各特征编码后的取值域
+            feature_keys: 各特征的字段名（用于报告）
+            buffer_size: 单条预测的缓冲区大小，攒满后批量计数
+        """
+        if score_bins <= 0:
+            raise ValueError(f"score_bins must be positive, got {score_bins}")
+        self.feature_keys = list(feature_keys)
+        self.domains = [list(d) for d in domains]
+        self.score_bins = score_bins
+        self.buffer_size = buffer_size
+        self._counters = [_FeatureCounter(d) for d in self.domains]
+        self._lock = threading.Lock()
+        self.reference = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._pending = []
+            self.rows = 0
+            self.score_sum = 0.0
+            self.feature_counts = [np.zeros(len(c.labels), dtype=np.int64) for c in self._counters]
+            self.score_counts = np.zeros(self.score_bins, dtype=np.int64)
+            self.level_counts = np.zeros(len(RISK_LEVELS), dtype=np.int64)
+
+    def update(self, features: Sequence[Any], prediction: Any):
+        """记录一次单条预测（编码后的特征向量和 predict() 的结果）
+
+        只把 (特征, 分数) 追加到缓冲区，缓冲区满或读取统计时再批量计数，单次更新的开销与已记录的行数无关。
+        """
+        if isinstance(prediction, np.ndarray) and prediction.ndim == 1 and len(prediction) > 1:
+            score = float(prediction[1])
+        else:
+            score = float(positive_scores(np.reshape(prediction, (1, -1)))[0])
+        with self._lock:
+            self._pending.append((*features, score))
+            if len(self._pending) >= self.buffer_size:
+                self._flush()
+
+    def update_batch(self, X: Any, prediction: Any):
+        """记录一批预测（形状为 (n, 5) 的编码后特征和 predict_batch() 的结果）"""
+        increments = self._count(np.asarray(X, dtype=np.float64), positive_scores(prediction))
+        with self._lock:
+            self._add(*increments)
+
+    def _flush(self):
+        """批量计数缓冲区中的单条预测（调用方持有锁）"""
+        if self._pending:
+            rows = np.array(self._pending, dtype=np.float64)
+            self._pending = []
+            self._add(*self._count(rows[:, :-1], rows[:, -1]))
+
+    def _count(self, X: np.ndarray, scores: np.ndarray) -> tuple:
+        """一批预测的各项计数，分数为 NaN 的行忽略"""
+        valid = ~np.isnan(scores)
+        if not valid.all():
+            X, scores = X[valid], scores[valid]
+        feature_counts = [
+            np.bincount(counter.slots(X[:, i]), minlength=len(counter.labels))
+            for i, counter in enumerate(self._counters)
+        ]
+        score_bins = np.clip((scores * self.score_bins).astype(np.intp), 0, self.score_bins - 1)
+        score_counts = np.bincount(score_bins, minlength=self.score_bins)
+        level_counts = np.bincount(risk_level_codes(scores), minlength=len(RISK_LEVELS))
+        return len(scores), float(scores.sum()), feature_counts, score_counts, level_counts
+
+    def _add(self, rows: int, score_sum: float, feature_counts: Sequence[np.ndarray],
+             score_counts: np.ndarray, level_counts: np.ndarray):
+        """累加计数（调用方持有锁）"""
+        self.rows += rows
+        self.score_sum += score_sum
+        for counts, increment in zip(self.feature_counts, feature_counts):
+            counts += increment
+        self.score_counts += score_counts
+        self.level_counts += level_counts
+
+    def merge(self, other: 'DriftMonitor') -> 'DriftMonitor':
+        """把另一个监控器（如其它工作进程的）的统计加到本监控器上"""
+        if other.score_bins != self.score_bins or other.domains != self.domains:
+            raise ValueError("Cannot merge drift monitors with different feature domains or score bins")
+        with other._lock:
+            state = other._state()
+        with self._lock:
+            self._add(state['rows'], state['score_sum'], state['feature_counts'],
+                      state['score_counts'], state['level_counts'])
+        return self
+
+    def _state(self) -> dict:
+        """当前计数的副本（调用方持有锁）"""
+        self._flush()
+        return {
+            'rows': self.rows,
+            'score_sum': self.score_sum,
+            'feature_counts': [c.copy() for c in self.feature_counts],
+            'score_counts': self.score_counts.copy(),
+            'level_counts': self.level_counts.copy()
+        }
+
+    def quantile(self, q: float) -> Optional[float]:
+        """阳性概率的近似分位数（分箱内线性插值），未记录任何预测时返回 None"""
+        with self._lock:
+            counts = self._state()['score_counts']
+        return self._quantile(counts, q)
+
+    def _quantile(self, counts: np.ndarray, q: float) -> Optional[float]:
+        total = counts.sum()
+        if total == 0:
+            return None
+        target = min(max(q, 0.0), 1.0) * total
+        cumulative = np.cumsum(counts)
+        i = int(np.searchsorted(cumulative, target, side='left'))
+        i = min(i, self.score_bins - 1)
+        before = cumulative[i] - counts[i]
+        fraction = (target - before) / counts[i] if counts[i] else 0.0
+        return float((i + fraction) / self.score_bins)
+
+    def _score_buckets(self, reference_counts: np.ndarray, n_buckets: int = 10) -> np.ndarray:
+        """按参考分布的十分位把分箱合并为 PSI 使用的桶，返回各桶起始分箱下标"""
+        cumulative = np.cumsum(reference_counts) / max(reference_counts.sum(), 1)
+        cuts = np.searchsorted(cumulative, np.arange(1, n_buckets) / n_buckets, side='left') + 1
+        return np.unique(np.concatenate([[0], cuts[cuts < self.score_bins]]))
+
+    def set_reference(self, reference: Optional['DriftMonitor']):
+        """设置用于计算 PSI 的参考分布"""
+        if reference is not None and (reference.score_bins != self.score_bins or reference.domains != self.domains):
+            raise ValueError("Reference profile has different feature domains or score bins")
+        self.reference = reference
+
+    def report(self) -> dict:
+        """当前分布统计；设置了参考分布时附带各项 PSI"""
+        with self._lock:
+            state = self._state()
+        reference = None
+        if self.reference is not None:
+            with self.reference._lock:
+                reference = self.reference._state()
+
+        rows = state['rows']
+        features = {}
+        for i, (key, counter) in enumerate(zip(self.feature_keys, self._counters)):
+            counts = state['feature_counts'][i]
+            item = {'counts': dict(zip(counter.labels, counts.tolist()))}
+            if reference is not None:
+                item['psi'] = psi(reference['feature_counts'][i], counts)
+            features[key] = item
+
+        score_counts = state['score_counts']
+        score = {
+            'mean': state['score_sum'] / rows if rows else None,
+            'quantiles': {
+                f"p{int(q * 100):02d}": self._quantile(score_counts, q) for q in (0.05, 0.25, 0.5, 0.75, 0.95)
+            }
+        }
+        levels = {'counts': dict(zip(RISK_LEVELS, state['level_counts'].tolist()))}
+        if reference is not None:
+            starts = self._score_buckets(reference['score_counts'])
+            score['psi'] = psi(np.add.reduceat(reference['score_counts'], starts),
+                               np.add.reduceat(score_counts, starts))
+            levels['psi'] = psi(reference['level_counts'], state['level_counts'])
+
+        result = {
+            'rows': rows,
+            'features': features,
+            'score': score,
+            'risk_levels': levels,
+            'reference_rows': reference['rows'] if reference is not None else None
+        }
+        if reference is not None:
+            values = [f['psi'] for f in features.values()] + [score['psi'], levels['psi']]
+            values = [v for v in values if v is not None]
+            result['max_psi'] = max(values) if values else None
+            result['status'] = psi_status(result['max_psi'])
+        return result
+
+    def to_dict(self) -> dict:
+        """可序列化为 JSON 的分布统计，用于保存参考分布或在进程间传递后合并"""
+        with self._lock:
+            state = self._state()
+        return {
+            'format': PROFILE_FORMAT,
+            'version': PROFILE_VERSION,
+            'feature_keys': self.feature_keys,
+            'domains': self.domains,
+            'score_bins': self.score_bins,
+            'rows': state['rows'],
+            'score_sum': state['score_sum'],
+            'feature_counts': [c.tolist() for c in state['feature_counts']],
+            'score_counts': state['score_counts'].tolist(),
+            'level_counts': state['level_counts'].tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DriftMonitor':
+        if data.get('format') != PROFILE_FORMAT:
+            raise ValueError(f"Not a drift profile: format={data.get('format')!r}")
+        if data.get('version') != PROFILE_VERSION:
+            raise ValueError(f"Unsupported drift profile version: {data.get('version')!r}")
+        monitor = cls(score_bins=data['score_bins'], domains=data['domains'], feature_keys=data['feature_keys'])
+        monitor.rows = int(data['rows'])
+        monitor.score_sum = float(data['score_sum'])
+        monitor.feature_counts = [np.asarray(c, dtype=np.int64) for c in data['feature_counts']]
+        monitor.score_counts = np.asarray(data['score_counts'], dtype=np.int64)
+        monitor.level_counts = np.asarray(data['level_counts'], dtype=np.int64)
+        if [len(c) for c in monitor.feature_counts] != [len(c.labels) for c in monitor._counters]:
+            raise ValueError("Drift profile feature counts do not match its feature domains")
+        return monitor
+
+    def save(self, path: str):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'DriftMonitor':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def psi_status(value: Optional[float]) -> Optional[str]:
+    """按常用标准把 PSI 归为 'stable'、'minor' 或 'major'"""
+    if value is None or math.isnan(value):
+        return None
+    if value < PSI_THRESHOLDS[0]:
+        return 'stable'
+    return 'minor' if value < PSI_THRESHOLDS[1] else 'major'
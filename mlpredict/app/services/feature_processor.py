@@ -1,67 +1,69 @@
-class FeatureProcessor:
-    def __init__(self):
-        # 特征映射字典
-        self.toilet_map = {
-            '否': 0,
-            '是': 1
-        }
-        
-        self.toilet_score = {
-            '传统旱厕': 0,
-            '冲洗坑厕': 1,
+import numpy as np
+
+# FEATURE_KEYS / FEATURE_DOMAINS 由 feature_schema 中的特征定义派生，这里保留原有的导入路径
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS, FEATURE_KEYS, FEATURE_SCHEMA
+from mlpredict.app.services.metrics import metrics
+
+
+class _LookupTable:
+    """预编译的查找表：类别 -> 编码值，最后一位存放未知类别的默认值"""
+
+    def __init__(self, mapping, default):
+        import pandas as pd
+        self.categories = pd.Index(list(mapping.keys()))
+        self.values = np.array(
+            [np.nan if v is None else v for v in mapping.values()]
+            + [np.nan if default is None else default],
+            dtype=np.float64
+        )
 
-            '抽水马桶': 2,
-        }
+    def encode(self, values) -> np.ndarray:
+        """按类别位置批量查表，未知类别(位置为-1)取默认值"""
+        codes = self.categories.get_indexer(values)
+        return self.values[codes]
+
+
+class FeatureProcessor:
+    def __init__(self, schema=FEATURE_SCHEMA):
+        # 特征定义按输入顺序编译为 (字段名, 编码函数)，单条处理时直接查表
+        self.schema = list(schema)
+        self.keys = [spec.key for spec in self.schema]
+        self._encoders = [(spec.key, spec.encode) for spec in self.schema]
+        self._specs = specs = {spec.key: spec for spec in self.schema}
         
-        self.house_score = {
-            '自己购买新房': 4,
-            '自己购买二手房': 3,
-            '自建房': 2,
-            '租房': 1,
-            '否': 0
-        }
+        # 特征映射字典（由特征定义派生，保留原有属性名）
+        self.toilet_map = specs['toilet_lid'].mapping
+        self.toilet_score = specs['toilet_type'].mapping
+        self.house_score = specs['house_ownership'].mapping
+        self.freq_map = specs['snack_frequency'].mapping
+        self.veg_score = specs['vegetable_purchase'].mapping
         
-        self.freq_map = {
-            '否': 0,
-            '1-2次/年': 1,
-            '1-2次/月': 2,
-            '1-2次/周': 3,
-            '3-5次/周': 4,
-            '＞5次/周': 5,
-            '未填': None
-        }
+        # 马桶盖问题中视为缺失的回答
+        self.toilet_lid_missing = specs['toilet_lid'].missing
         
-        self.veg_score = {
-            '自家种植': 0,
-            '超市': 1,
-            '菜市场': 2,
-            '街头小贩': 3,
-            '都有': 3
-        }
+        # 批量编码使用的查找表，首次批量处理时构建（依赖 pandas，单条处理不需要）
+        self._tables = None
+        self._multi_select = {spec.key for spec in self.schema if spec.multi_select}
     
     def process_toilet_lid(self, value):
         """处理马桶盖使用习惯"""
-        if value in ['抽水马桶', '未填']:
-            return None
-        return self.toilet_map.get(value, None)
+        return self._specs['toilet_lid'].encode(value)
     
     def process_toilet_type(self, value):
         """处理家庭厕所类型"""
-        parts = value.replace(' ', '').split('+')
-        return max(self.toilet_score.get(p, 0) for p in parts)
+        return self._specs['toilet_type'].encode(value)
     
     def process_house_ownership(self, value):
         """处理居住房屋所有权"""
-        return self.house_score.get(value, 0)
+        return self._specs['house_ownership'].encode(value)
     
     def process_snack_frequency(self, value):
         """处理零食的食用频率"""
-        return self.freq_map.get(value, None)
+        return self._specs['snack_frequency'].encode(value)
     
     def process_vegetable_purchase(self, value):
         """处理家中蔬菜的购买方式"""
-        parts = value.replace(' ', '').split('+')
-        return max(self.veg_score.get(p, 0) for p in parts)
+        return self._specs['vegetable_purchase'].encode(value)
     
     def process_all_features(self, features):
         """处理所有特征
@@ -72,22 +74,88 @@ class FeatureProcessor:
         Returns:
             list: 处理后的特征值列表，按照指定顺序
         """
-        processed_features = []
+        with metrics.timer('process_all_features'):
+            return self._process_all_features(features)
+    
+    def _process_all_features(self, features):
+        # 按照特征定义的顺序处理特征
+        return [encode(features.get(key, '')) for key, encode in self._encoders]
+    
+    def _get_tables(self) -> dict:
+        """构建批量编码使用的查找表"""
+        if self._tables is None:
+            self._tables = {spec.key: _LookupTable(spec.codes, spec.default) for spec in self.schema}
+        return self._tables
+    
+    def transform_frame(self, df):
+        """批量处理整张问卷表
         
-        # 按照指定顺序处理特征
-        # 1. 如果使用马桶，是否习惯盖马桶盖
-        processed_features.append(self.process_toilet_lid(features.get('toilet_lid', '')))
+        Args:
+            df: pandas DataFrame，列名为 FEATURE_KEYS 中的字段名，缺少的列按空回答处理；
+                Categorical 列只对其字典编码，再按下标映射
+            
+        Returns:
+            np.ndarray: 形状为 (n, 5) 的浮点数组，缺失值为 NaN
+        """
+        n = len(df)
+        columns = [df[key] if key in df.columns else [''] * n for key in self.keys]
+        return self.transform_arrays(*columns)
+    
+    def transform_arrays(self, toilet_lid, toilet_type, house_ownership,
+                         snack_frequency, vegetable_purchase):
+        """批量处理五列原始回答
         
-        # 2. 家庭厕所类型
-        processed_features.append(self.process_toilet_type(features.get('toilet_type', '')))
+        结果与逐行调用 process_all_features 完全一致（None 对应 NaN）。
         
-        # 3. 居住房屋所有权
-        processed_features.append(self.process_house_ownership(features.get('house_ownership', '')))
+        Returns:
+            np.ndarray: 形状为 (n, 5) 的浮点数组
+        """
+        columns = [toilet_lid, toilet_type, house_ownership, snack_frequency, vegetable_purchase]
+        lengths = {len(c) for c in columns}
+        if len(lengths) != 1:
+            raise ValueError(f"All feature columns must have the same length, got {sorted(lengths)}")
         
-        # 4. 零食的食用频率
-        processed_features.append(self.process_snack_frequency(features.get('snack_frequency', '')))
+        with metrics.timer('transform_arrays'):
+            return self._transform_columns(columns, lengths.pop())
+    
+    def _transform_columns(self, columns, n):
+        import pandas as pd
         
-        # 5. 家中蔬菜的购买方式
-        processed_features.append(self.process_vegetable_purchase(features.get('vegetable_purchase', '')))
+        tables = self._get_tables()
+        result = np.empty((n, len(self.keys)), dtype=np.float64)
+        for i, (key, column) in enumerate(zip(self.keys, columns)):
+            # 先对整列去重，只对不同的回答编码，再按编码映射回整列；缺失单元格(编码为-1)按空回答处理
+            if isinstance(getattr(column, 'dtype', None), pd.CategoricalDtype):
+                # 已字典编码的列（如 Parquet/Arrow 的字典列）直接使用其下标和字典
+                codes = column.cat.codes.to_numpy()
+                uniques = column.cat.categories.to_numpy(dtype=object)
+            else:
+                codes, uniques = pd.factorize(np.asarray(column, dtype=object))
+            uniques = pd.Series(np.append(uniques.astype(object), ''), dtype=object)
+            if key in self._multi_select:
+                encoded = self._encode_multi_select(tables[key], uniques, self._specs[key])
+            else:
+                encoded = tables[key].encode(uniques)
+            result[:, i] = encoded[codes]
+        return result
+    
+    @staticmethod
+    def _encode_multi_select(table, values, spec) -> np.ndarray:
+        """处理'+'连接的多选回答，取各选项得分的最大值
         
-        return processed_features
\ No newline at end of file
+        与单条处理的 FeatureSpec.encode 一致：回答必须为字符串（否则抛出 TypeError），
+        编码为缺失的选项按默认值计。
+        """
+        invalid = [v for v in values if not isinstance(v, str)]
+        if invalid:
+            raise TypeError(f"Multi-select answers for {spec.key!r} must be strings, got {invalid[0]!r}")
+        parts = values.str.replace(' ', '', regex=False).str.split('+', expand=True)
+        default = np.nan if spec.default is None else spec.default
+        # 每个回答至少有一个选项；不存在的选项位置为 NaN，fmax 忽略 NaN
+        scores = np.full(parts.shape, np.nan)
+        for j in range(parts.shape[1]):
+            part = parts[j]
+            present = part.notna().to_numpy()
+            encoded = table.encode(part[present])
+            scores[present, j] = np.where(np.isnan(encoded), default, encoded)
+        return np.fmax.reduce(scores, axis=1)
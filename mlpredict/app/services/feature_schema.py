@@ -0,0 +1,139 @@
+"""
+问卷特征的声明式定义
+
+每个特征声明一次：问卷字段名、模型输入列名（即界面上的问题）、界面选项、回答到编码值的映射、
+未知回答的默认值、视为缺失的回答、是否为'+'连接的多选题，以及界面展示的简称和预防建议。
+特征编码器、界面选项和建议、模型输入列顺序、全输入域结果表都由这里派生，模型加载时用 check_model_schema()
+检查一次模型的输入列与此一致。
+"""
+
+from typing import Any, List, Optional, Sequence
+
+
+class FeatureSpec:
+    """一个问卷特征的定义
+
+    Args:
+        key: 问卷字段名
+        name: 模型输入列名，也是界面上显示的问题
+        mapping: 回答 -> 编码值，编码值为 None 表示缺失
+        options: 界面中的选项（按显示顺序）
+        default: 映射中没有的回答的编码值（None 表示缺失）
+        missing: 视为缺失的回答
+        multi_select: 是否为'+'连接的多选回答，多选时取各选项编码的最大值
+        label: 界面展示的简称，默认为 name
+        tip: 该特征提高风险时在界面上展示的预防建议
+    """
+
+    __slots__ = ('key', 'name', 'mapping', 'options', 'default', 'missing', 'multi_select', 'label', 'tip',
+                 'codes', 'domain')
+
+    def __init__(self, key: str, name: str, mapping: dict, options: Sequence[str],
+                 default: Optional[float] = None, missing: Sequence[str] = (), multi_select: bool = False,
+                 label: Optional[str] = None, tip: str = ''):
+        self.key = key
+        self.name = name
+        self.mapping = dict(mapping)
+        self.options = list(options)
+        self.default = default
+        self.missing = list(missing)
+        self.multi_select = multi_select
+        self.label = label or name
+        self.tip = tip
+
+        # 编译后的查找表：缺失回答覆盖映射中的值
+        self.codes = dict(self.mapping)
+        self.codes.update((answer, None) for answer in self.missing)
+
+        # 编码后的全部可能取值（None 表示缺失）
+        values = set(self.codes.values()) | {default}
+        self.domain = sorted(v for v in values if v is not None) + ([None] if None in values else [])
+
+    def encode(self, value: Any) -> Optional[float]:
+        """编码单个回答；多选回答要求为字符串"""
+        if self.multi_select:
+            parts = value.replace(' ', '').split('+')
+            return max(self._encode_part(p) for p in parts)
+        return self.codes.get(value, self.default)
+
+    def _encode_part(self, part: str):
+        code = self.codes.get(part, self.default)
+        return self.default if code is None else code
+
+
+FEATURE_SCHEMA = [
+    FeatureSpec(
+        key='toilet_lid',
+        name='如果使用马桶，是否习惯盖马桶盖',
+        mapping={'否': 0, '是': 1},
+        options=['是', '否', '未填'],
+        default=None,
+        missing=['抽水马桶', '未填'],
+        label='如厕习惯',
+        tip='冲水前盖上马桶盖，减少含菌气溶胶扩散'
+    ),
+    FeatureSpec(
+        key='toilet_type',
+        name='家庭厕所类型',
+        mapping={'传统旱厕': 0, '冲洗坑厕': 1, '抽水马桶': 2},
+        options=['传统旱厕', '冲洗坑厕', '抽水马桶'],
+        default=0,
+        multi_select=True,
+        label='厕所类型',
+        tip='保持厕所清洁通风、定期消毒，便后及时洗手'
+    ),
+    FeatureSpec(
+        key='house_ownership',
+        name='居住房屋所有权',
+        mapping={'自己购买新房': 4, '自己购买二手房': 3, '自建房': 2, '租房': 1, '否': 0},
+        options=['自己购买新房', '自己购买二手房', '自建房', '租房', '否'],
+        default=0,
+        label='居住条件',
+        tip='保持居住环境整洁，家庭成员分餐，餐具定期消毒'
+    ),
+    FeatureSpec(
+        key='snack_frequency',
+        name='零食的食用频率',
+        mapping={'否': 0, '1-2次/年': 1, '1-2次/月': 2, '1-2次/周': 3, '3-5次/周': 4, '＞5次/周': 5, '未填': None},
+        options=['否', '1-2次/年', '1-2次/月', '1-2次/周', '3-5次/周', '＞5次/周', '未填'],
+        default=None,
+        label='零食习惯',
+        tip='减少食用来源不明的零食，选择包装完好、卫生有保障的食品'
+    ),
+    FeatureSpec(
+        key='vegetable_purchase',
+        name='家中蔬菜的购买方式',
+        mapping={'自家种植': 0, '超市': 1, '菜市场': 2, '街头小贩': 3, '都有': 3},
+        options=['自家种植', '超市', '菜市场', '街头小贩', '都有'],
+        default=0,
+        multi_select=True,
+        label='蔬菜来源',
+        tip='蔬菜彻底清洗、尽量熟食，减少生食'
+    )
+]
+
+# 原始问卷字段名（按模型输入顺序）
+FEATURE_KEYS = [spec.key for spec in FEATURE_SCHEMA]
+# 模型输入特征列名（按训练时的顺序）
+FEATURE_NAMES = [spec.name for spec in FEATURE_SCHEMA]
+# 各特征编码后的全部可能取值（None 表示缺失），与 FEATURE_KEYS 顺序一致
+FEATURE_DOMAINS = [spec.domain for spec in FEATURE_SCHEMA]
+
+
+def model_feature_names(model: Any) -> Optional[List[str]]:
+    """模型训练时的输入列名（scikit-learn 的 feature_names_in_ 或 LinearScorer 的 feature_names）"""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        names = getattr(model, 'feature_names', None)
+    return None if names is None else [str(n) for n in names]
+
+
+def check_model_schema(model: Any, schema: Sequence[FeatureSpec] = FEATURE_SCHEMA):
+    """检查模型的输入列名和列数与特征定义一致，不一致时抛出 ValueError"""
+    expected = [spec.name for spec in schema]
+    names = model_feature_names(model)
+    if names is not None and names != expected:
+        raise ValueError(f"Model expects features {names}, but the feature schema defines {expected}")
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features is not None and int(n_features) != len(expected):
+        raise ValueError(f"Model expects {n_features} features, but the feature schema defines {len(expected)}")
@@ -0,0 +1,269 @@
+"""
+逻辑回归模型的轻量导出格式与纯 NumPy 打分器
+
+导出文件为 JSON，记录每个输入特征对决策函数的贡献方式（独热编码权重或线性权重）、
+截距、类别以及源模型文件的签名(mtime, size)和校验和。加载和打分只依赖 NumPy，不需要 scikit-learn、pandas 或 joblib。
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+FORMAT_NAME = 'mlpredict-linear'
+FORMAT_VERSION = 1
+# 导出文件扩展名，与模型文件同名存放，如 model.joblib -> model.linear.json
+ARTIFACT_SUFFIX = '.linear.json'
+# 导出结果与原模型 predict_proba 的最大允许误差
+EXPORT_TOLERANCE = 1e-12
+
+
+def artifact_path_for(model_file: str) -> str:
+    """模型文件对应的导出文件路径"""
+    return os.path.splitext(model_file)[0] + ARTIFACT_SUFFIX
+
+
+def file_sha256(path: str) -> str:
+    """计算文件的 SHA-256 校验和"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_info(path: str) -> dict:
+    """导出文件中记录的源模型文件信息：文件名、签名(mtime_ns, size)和校验和"""
+    stat = os.stat(path)
+    return {
+        'file': os.path.basename(path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': file_sha256(path)
+    }
+
+
+def source_matches(source: Optional[dict], path: str, sha256: Optional[str] = None) -> bool:
+    """导出文件记录的源文件是否就是 path 的当前版本
+
+    已知源文件校验和（清单中配置了校验和，加载时已计算）时比较校验和；
+    否则只比较签名(mtime_ns, size)，加载时不读取整个模型文件。
+    """
+    if not source:
+        return False
+    if sha256 is not None:
+        return source.get('sha256') == sha256.lower()
+    stat = os.stat(path)
+    return (source.get('mtime_ns'), source.get('size')) == (stat.st_mtime_ns, stat.st_size)
+
+
+class LinearScorer:
+    """纯 NumPy 实现的二分类逻辑回归打分器
+
+    决策函数为各特征贡献之和加截距；与 scikit-learn 的计算顺序一致（按特征顺序累加后再加截距），
+    阳性概率为 sigmoid(决策函数)。
+    """
+
+    def __init__(self, spec: dict):
+        if spec.get('format') != FORMAT_NAME:
+            raise ValueError(f"Not a {FORMAT_NAME} artifact")
+        if spec.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact version {spec.get('format_version')}")
+
+        self.spec = spec
+        self.feature_names = list(spec['feature_names'])
+        self.n_features_in_ = len(self.feature_names)
+        self.classes_ = np.array(spec['classes'])
+        self.intercept = float(spec['intercept'])
+        self.terms = []
+        for term in spec['terms']:
+            if term['encoding'] == 'onehot':
+                self.terms.append((
+                    'onehot', term['index'],
+                    np.array(term['categories'], dtype=np.float64),
+                    np.array(term['weights'], dtype=np.float64)
+                ))
+            elif term['encoding'] == 'linear':
+                self.terms.append((
+                    'linear', term['index'],
+                    float(term.get('mean', 0.0)), float(term.get('scale', 1.0)), float(term['weight'])
+                ))
+            else:
+                raise ValueError(f"Unknown term encoding {term['encoding']!r}")
+
+    @classmethod
+    def load(cls, path: str) -> 'LinearScorer':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.spec, f, ensure_ascii=False, indent=2)
+
+    def term_values(self, X: Any) -> np.ndarray:
+        """各项对决策函数的贡献，形状为 (n, 项数)，顺序与决策函数的累加顺序一致"""
+        X = np.asarray(X, dtype=np.float64)
+        values = np.zeros((len(X), len(self.terms)))
+        for t, term in enumerate(self.terms):
+            column = X[:, term[1]]
+            if term[0] == 'onehot':
+                categories, weights = term[2], term[3]
+                pos = np.minimum(np.searchsorted(categories, column), len(categories) - 1)
+                # 未知类别（含缺失值）不激活任何独热列，贡献为0
+                values[:, t] = np.where(categories[pos] == column, weights[pos], 0.0)
+            else:
+                mean, scale, weight = term[2], term[3], term[4]
+                values[:, t] = (column - mean) / scale * weight
+        return values
+
+    def decision_function(self, X: Any) -> np.ndarray:
+        values = self.term_values(X)
+        decision = np.zeros(len(values))
+        for t in range(values.shape[1]):
+            decision += values[:, t]
+        return decision + self.intercept
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+def _split_pipeline(model: Any):
+    """拆分为 (预处理步骤, 逻辑回归)"""
+    steps = getattr(model, 'steps', None)
+    if steps is None:
+        return None, model
+    if len(steps) == 1:
+        return None, steps[0][1]
+    if len(steps) == 2:
+        return steps[0][1], steps[1][1]
+    raise ValueError(f"Unsupported pipeline with {len(steps)} steps")
+
+
+def _column_indices(columns: Any, feature_names: Sequence[str]) -> list:
+    if isinstance(columns, slice) or np.ndim(columns) == 0:
+        columns = [columns]
+    indices = []
+    for c in columns:
+        if isinstance(c, str):
+            indices.append(list(feature_names).index(c))
+        elif isinstance(c, (int, np.integer)):
+            indices.append(int(c))
+        else:
+            raise ValueError(f"Unsupported column selector {c!r}")
+    return indices
+
+
+def _transformer_terms(transformer: Any, indices: list, coef: np.ndarray, offset: int):
+    """将一个预处理器与其对应的系数转换为项列表，返回 (项列表, 使用的系数个数)"""
+    if transformer == 'passthrough':
+        return [
+            {'encoding': 'linear', 'index': idx, 'weight': float(coef[offset + k])}
+            for k, idx in enumerate(indices)
+        ], len(indices)
+
+    name = type(transformer).__name__
+    if name == 'OneHotEncoder':
+        if transformer.drop is not None:
+            raise ValueError("OneHotEncoder with drop is not supported")
+        terms = []
+        width = 0
+        for idx, categories in zip(indices, transformer.categories_):
+            categories = np.asarray(categories, dtype=np.float64)
+            weights = coef[offset + width: offset + width + len(categories)]
+            order = np.argsort(categories, kind='stable')
+            terms.append({
+                'encoding': 'onehot',
+                'index': idx,
+                'categories': categories[order].tolist(),
+                'weights': weights[order].tolist()
+            })
+            width += len(categories)
+        return terms, width
+
+    if name == 'StandardScaler':
+        means = transformer.mean_ if transformer.with_mean else np.zeros(len(indices))
+        scales = transformer.scale_ if transformer.with_std else np.ones(len(indices))
+        return [
+            {
+                'encoding': 'linear', 'index': idx, 'weight': float(coef[offset + k]),
+                'mean': float(means[k]), 'scale': float(scales[k])
+            }
+            for k, idx in enumerate(indices)
+        ], len(indices)
+
+    raise ValueError(f"Unsupported preprocessing step {name}")
+
+
+def compile_linear_model(model: Any, feature_names: Sequence[str]) -> dict:
+    """从已训练的逻辑回归（或 预处理 + 逻辑回归 的 Pipeline）中提取导出描述"""
+    preprocessor, classifier = _split_pipeline(model)
+    if not hasattr(classifier, 'coef_') or not hasattr(classifier, 'intercept_'):
+        raise ValueError(f"{type(classifier).__name__} is not a linear model")
+    if classifier.coef_.shape[0] != 1 or len(getattr(classifier, 'classes_', [])) != 2:
+        raise ValueError("Only binary logistic regression is supported")
+
+    coef = np.asarray(classifier.coef_[0], dtype=np.float64)
+    all_indices = list(range(len(feature_names)))
+
+    if preprocessor is None:
+        terms, used = _transformer_terms('passthrough', all_indices, coef, 0)
+    elif hasattr(preprocessor, 'transformers_'):
+        terms, used = [], 0
+        for _, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop':
+                continue
+            new_terms, width = _transformer_terms(
+                transformer, _column_indices(columns, feature_names), coef, used
+            )
+            terms.extend(new_terms)
+            used += width
+    else:
+        terms, used = _transformer_terms(preprocessor, all_indices, coef, 0)
+
+    if used != len(coef):
+        raise ValueError(f"Preprocessing produces {used} columns but the model has {len(coef)} coefficients")
+
+    return {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'feature_names': list(feature_names),
+        'classes': np.asarray(classifier.classes_).tolist(),
+        'intercept': float(classifier.intercept_[0]),
+        'terms': terms
+    }
+
+
+def export_linear_model(model: Any, feature_names: Sequence[str], output_path: str,
+                        validation_X: np.ndarray, source_file: Optional[str] = None) -> LinearScorer:
+    """导出为轻量文件，并在 validation_X 上校验与原模型 predict_proba 的误差
+
+    Raises:
+        ValueError: 模型结构不受支持，或最大误差超过 EXPORT_TOLERANCE
+    """
+    spec = compile_linear_model(model, feature_names)
+    if source_file is not None:
+        spec['source'] = source_info(source_file)
+    try:
+        import sklearn
+        spec['sklearn_version'] = sklearn.__version__
+    except ImportError:
+        pass
+
+    scorer = LinearScorer(spec)
+    model_input = validation_X
+    if hasattr(model, 'feature_names_in_'):
+        import pandas as pd
+        model_input = pd.DataFrame(validation_X, columns=list(feature_names))
+    max_error = float(np.max(np.abs(scorer.predict_proba(validation_X) - model.predict_proba(model_input))))
+    if max_error > EXPORT_TOLERANCE:
+        raise ValueError(f"Exported model differs from predict_proba by {max_error:.3e}")
+
+    spec['validation'] = {'rows': int(len(validation_X)), 'max_abs_error': max_error}
+    scorer.save(output_path)
+    return scorer
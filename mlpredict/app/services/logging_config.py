@@ -0,0 +1,189 @@
+"""
+结构化、非阻塞的日志管道
+
+各模块通过 logging.getLogger(__name__) 记录日志（均位于 'mlpredict' 日志器之下），
+入口程序调用 configure_logging() 后，日志记录先放入有界队列，由后台线程统一格式化并写出，
+业务线程不会阻塞在终端或文件 I/O 上。队列已满时丢弃记录并计数，而不是等待。
+
+环境变量：
+    MLPREDICT_LOG_LEVEL        日志级别（默认 INFO，调试信息在 DEBUG 级别）
+    MLPREDICT_LOG_FORMAT       text 或 json（默认 text）
+    MLPREDICT_LOG_SAMPLE_RATE  WARNING 以下日志的采样率，0~1（默认 1，即不采样）
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from typing import Optional
+
+from mlpredict.app.services.metrics import metrics
+
+ROOT_LOGGER = 'mlpredict'
+DEFAULT_QUEUE_SIZE = 10000
+
+# LogRecord 的标准属性，其余属性视为通过 extra 传入的结构化字段
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_lock = threading.Lock()
+_listener = None
+_handler = None
+
+
+class SamplingFilter(logging.Filter):
+    """按消息模板对 WARNING 以下的日志做确定性采样
+
+    同一日志器、同一消息模板的记录每 1/rate 条保留一条，WARNING 及以上始终保留。
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = min(max(float(rate), 0.0), 1.0)
+        self.step = max(int(round(1.0 / self.rate)), 1) if self.rate > 0 else 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        if self.rate <= 0.0:
+            return False
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        keep = count % self.step == 0
+        if not keep:
+            metrics.inc('log_records_sampled_out_total')
+        return keep
+
+
+class StructuredFormatter(logging.Formatter):
+    """单行 JSON 格式，extra 中的字段作为顶层键输出"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    """文本格式，extra 中的字段以 key=value 追加在消息后"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = [
+            f'{key}={value}' for key, value in vars(record).items()
+            if key not in _RESERVED_ATTRS and not key.startswith('_')
+        ]
+        if not fields:
+            return text
+        head, sep, tail = text.partition('\n')
+        return f"{head} {' '.join(fields)}{sep}{tail}"
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列已满时丢弃记录并计数，不阻塞调用线程
+
+    调用线程只合并消息参数，异常堆栈的格式化和输出都在后台线程完成。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc('log_records_dropped_total')
+
+
+def _make_formatter(fmt: str) -> logging.Formatter:
+    if fmt == 'json':
+        return StructuredFormatter()
+    return _TextFormatter('%(asctime)s %(levelname)s %(name)s: %(message)s', '%Y-%m-%d %H:%M:%S')
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None,
+                      sample_rate: Optional[float] = None, stream=None,
+                      queue_size: int = DEFAULT_QUEUE_SIZE, force: bool = False) -> logging.Logger:
+    """为 'mlpredict' 日志器配置队列 + 后台线程输出
+
+    已配置过时直接返回（Streamlit 每次重跑都会调用），force=True 时按新参数重新配置。
+
+    Args:
+        level: 日志级别，默认取 MLPREDICT_LOG_LEVEL 或 INFO
+        fmt: 'text' 或 'json'，默认取 MLPREDICT_LOG_FORMAT 或 text
+        sample_rate: WARNING 以下日志的采样率，默认取 MLPREDICT_LOG_SAMPLE_RATE 或 1
+        stream: 输出流，默认 sys.stderr
+        queue_size: 队列容量，超出时丢弃日志
+        force: 已配置时是否重新配置
+    """
+    global _listener, _handler
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    if _listener is not None and not force:
+        return logger
+
+    level = (level or os.environ.get('MLPREDICT_LOG_LEVEL') or 'INFO').upper()
+    fmt = (fmt or os.environ.get('MLPREDICT_LOG_FORMAT') or 'text').lower()
+    if sample_rate is None:
+        sample_rate = float(os.environ.get('MLPREDICT_LOG_SAMPLE_RATE') or 1.0)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(_make_formatter(fmt))
+
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SamplingFilter(sample_rate))
+
+    with _lock:
+        shutdown_logging()
+        logger.setLevel(level)
+        logger.addHandler(handler)
+        logger.propagate = False
+        _handler = handler
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+    return logger
+
+
+def shutdown_logging():
+    """停止后台线程，写出队列中剩余的日志"""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _handler = None
+
+
+def _reset_after_fork():
+    """fork 出的子进程中没有后台线程，丢弃继承来的配置，由子进程自行调用 configure_logging()"""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+    _listener = None
+    _handler = None
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,167 @@
+"""
+进程内性能指标
+
+提供按阶段的耗时直方图和计数器，可导出为 Prometheus 文本格式或 JSON 快照。
+默认关闭，关闭时 timer() 返回共享的空上下文、inc() 直接返回，几乎没有额外开销；
+可通过环境变量 MLPREDICT_METRICS=1 或 metrics.enable() 开启。
+"""
+
+import contextlib
+import os
+import threading
+import time
+from typing import Optional
+
+# 阶段耗时直方图的分桶上界（秒）
+DEFAULT_BUCKETS = [
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+]
+
+METRIC_PREFIX = 'mlpredict_'
+
+_NOOP = contextlib.nullcontext()
+
+
+class Histogram:
+    """固定分桶的直方图"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'count': self.count,
+                'sum': self.sum,
+                'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts))
+            }
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """阶段耗时直方图与计数器的注册表"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def timer(self, stage: str):
+        """统计一个阶段耗时的上下文管理器"""
+        if not self.enabled:
+            return _NOOP
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, Histogram())
+        return _Timer(histogram)
+
+    def observe(self, stage: str, seconds: float):
+        """直接记录一个阶段耗时"""
+        if not self.enabled:
+            return
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """计数器加 amount，labels 为可选标签"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        """JSON 快照"""
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+        return {
+            'enabled': self.enabled,
+            'stages': {stage: h.snapshot() for stage, h in sorted(stages.items())},
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(counters.items())
+            ]
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        snapshot = self.snapshot()
+        lines = []
+
+        if snapshot['stages']:
+            name = f'{METRIC_PREFIX}stage_duration_seconds'
+            lines.append(f'# HELP {name} Duration of each processing stage.')
+            lines.append(f'# TYPE {name} histogram')
+            for stage, h in snapshot['stages'].items():
+                cumulative = 0
+                for upper, count in h['buckets'].items():
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{upper}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h["sum"]}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h["count"]}')
+
+        declared = set()
+        for counter in snapshot['counters']:
+            name = f'{METRIC_PREFIX}{counter["name"]}'
+            if name not in declared:
+                lines.append(f'# TYPE {name} counter')
+                declared.add(name)
+            labels = ','.join(f'{k}="{v}"' for k, v in counter['labels'].items())
+            lines.append(f'{name}{{{labels}}} {counter["value"]}' if labels else f'{name} {counter["value"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _enabled_from_env(value: Optional[str]) -> bool:
+    return (value or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# 进程级全局指标注册表
+metrics = MetricsRegistry(enabled=_enabled_from_env(os.environ.get('MLPREDICT_METRICS')))
@@ -0,0 +1,193 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Sequence
+
+import numpy as np
+
+from mlpredict.app.services.model_service import ModelService, FEATURE_NAMES
+
+# 批大小直方图的分桶上界
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+# 排队等待时间直方图的分桶上界（毫秒）
+QUEUE_WAIT_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100]
+
+_STOP = object()
+
+
+class _Request:
+    __slots__ = ('features', 'future', 'enqueued_at')
+
+    def __init__(self, features: Sequence[Any]):
+        self.features = features
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+def _bucket_index(buckets: list, value: float) -> int:
+    for i, upper in enumerate(buckets):
+        if value <= upper:
+            return i
+    return len(buckets)
+
+
+class MicroBatcher:
+    """单条预测请求的动态合批
+
+    后台线程收集在时间窗口内（从批中第一个请求入队开始计时）或达到最大批大小前到达的请求，
+    用一次 predict_batch 完成打分，再逐个设置调用方的 Future。
+    每个请求额外增加的排队延迟不超过 max_wait_ms（外加一次批量打分的耗时）。
+    批量打分失败时逐行重新打分，一行的错误只返回给提交该行的调用方。
+    """
+
+    def __init__(self, model_service: ModelService, max_batch_size: int = 64,
+                 max_wait_ms: float = 2.0, max_queue_size: int = 10000):
+        if max_batch_size <= 0:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        self.model_service = model_service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        # close() 之后不再接受请求；与入队在同一把锁内检查，保证停止信号之后不会再有请求入队
+        self._closed = False
+        self._close_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._max_batch_size_seen = 0
+        self._batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._queue_wait_counts = [0] * (len(QUEUE_WAIT_BUCKETS_MS) + 1)
+
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, features: Sequence[Any]) -> Future:
+        """提交一条编码后的特征，返回结果为该行预测输出的 Future
+
+        Raises:
+            ValueError: 特征不是长度为 5 的数值（或 None）列表
+            queue.Full: 等待队列已满
+            RuntimeError: 合批器已关闭
+        """
+        # 入队前逐行校验，格式错误的请求只影响提交它的调用方，不会拖垮同批的其它请求
+        try:
+            row = np.asarray(features, dtype=np.float64)
+        except (ValueError, TypeError):
+            raise ValueError("Features must be numbers or None")
+        if row.shape != (len(FEATURE_NAMES),):
+            raise ValueError(f"Expected {len(FEATURE_NAMES)} features, got shape {row.shape}")
+        request = _Request(row)
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put_nowait(request)
+        return request.future
+
+    def predict(self, features: Sequence[Any], timeout: float = None) -> Any:
+        """同步提交并等待结果"""
+        return self.submit(features).result(timeout=timeout)
+
+    async def predict_async(self, features: Sequence[Any]) -> Any:
+        """在 asyncio 事件循环中提交并等待结果"""
+        return await asyncio.wrap_future(self.submit(features))
+
+    def close(self, timeout: float = None):
+        """处理完已入队的请求后停止后台线程，之后提交的请求抛出 RuntimeError"""
+        with self._close_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _collect(self, first: _Request) -> tuple:
+        """以第一个请求的入队时间为起点，收集一个批次；返回 (批次, 是否收到停止信号)"""
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+
+            # 跳过调用方已取消的请求
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            self._record(batch, started)
+            prediction, error = self._predict([r.features for r in batch])
+            if error is None:
+                for r, row in zip(batch, prediction):
+                    r.future.set_result(row)
+            elif len(batch) == 1:
+                batch[0].future.set_exception(error)
+            else:
+                # 批量打分失败时逐行重试，每个调用方得到自己那一行的结果或错误
+                for r in batch:
+                    prediction, error = self._predict([r.features])
+                    if error is None:
+                        r.future.set_result(prediction[0])
+                    else:
+                        r.future.set_exception(error)
+
+    def _predict(self, rows: list) -> tuple:
+        """批量打分，返回 (预测结果, None) 或 (None, 异常)"""
+        try:
+            prediction = self.model_service.predict_batch(np.stack(rows))
+        except Exception as e:
+            return None, e
+        if prediction is None:
+            return None, RuntimeError(
+                f"Prediction failed: {self.model_service.load_error or 'see log for details'}"
+            )
+        return prediction, None
+
+    def _record(self, batch: list, started: float):
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._max_batch_size_seen = max(self._max_batch_size_seen, len(batch))
+            self._batch_size_counts[_bucket_index(BATCH_SIZE_BUCKETS, len(batch))] += 1
+            for r in batch:
+                wait_ms = (started - r.enqueued_at) * 1000.0
+                self._queue_wait_total += wait_ms
+                self._queue_wait_max = max(self._queue_wait_max, wait_ms)
+                self._queue_wait_counts[_bucket_index(QUEUE_WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def stats(self) -> dict:
+        """合批统计：请求数、批次数、批大小与排队等待时间分布"""
+        with self._stats_lock:
+            return {
+                'requests': self._requests,
+                'batches': self._batches,
+                'queue_depth': self._queue.qsize(),
+                'mean_batch_size': self._requests / self._batches if self._batches else 0.0,
+                'max_batch_size': self._max_batch_size_seen,
+                'batch_size_histogram': dict(zip(
+                    [str(b) for b in BATCH_SIZE_BUCKETS] + ['+Inf'], self._batch_size_counts
+                )),
+                'mean_queue_wait_ms': self._queue_wait_total / self._requests if self._requests else 0.0,
+                'max_queue_wait_ms': self._queue_wait_max,
+                'queue_wait_ms_histogram': dict(zip(
+                    [str(b) for b in QUEUE_WAIT_BUCKETS_MS] + ['+Inf'], self._queue_wait_counts
+                ))
+            }
@@ -0,0 +1,75 @@
+"""
+可内存映射的模型导出格式
+
+只保存具有 predict 方法的模型对象（不含保存时一起打包的 LabelEncoder 等其它对象），
+以不压缩的 joblib 格式写出，模型中的 NumPy 数组在文件中按原始字节存放。
+加载时使用 mmap_mode='r'，数组直接映射文件的只读页面：多个工作进程加载同一文件时共享物理内存，
+而不是各自持有一份副本；加载也只需反序列化对象结构，不再复制大数组。
+"""
+
+import os
+import time
+from typing import Any, Optional, Tuple
+
+from mlpredict.app.services.linear_scorer import source_info
+
+FORMAT_NAME = 'mlpredict-mmap'
+FORMAT_VERSION = 1
+# 导出文件扩展名，与模型文件同名存放，如 model.joblib -> model.mmap
+# （不使用 .joblib 扩展名，避免被当作模型文件查找到）
+ARTIFACT_SUFFIX = '.mmap'
+
+
+def mmap_artifact_path_for(model_file: str) -> str:
+    """模型文件对应的内存映射导出文件路径"""
+    return os.path.splitext(model_file)[0] + ARTIFACT_SUFFIX
+
+
+def export_mmap_model(model: Any, output_path: str, source_file: Optional[str] = None) -> str:
+    """将模型对象导出为可内存映射的文件
+
+    Args:
+        model: 具有 predict 方法的模型对象
+        output_path: 输出路径
+        source_file: 源模型文件，记录其签名和校验和，加载时据此判断导出文件是否过期（见 source_matches）
+    """
+    import joblib
+
+    payload = {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'source': None,
+        'model': model
+    }
+    if source_file is not None:
+        payload['source'] = source_info(source_file)
+
+    # 先写临时文件再替换，避免其它进程读到写了一半的文件
+    tmp_path = f'{output_path}.tmp'
+    joblib.dump(payload, tmp_path, compress=0)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def load_mmap_model(path: str) -> Tuple[Any, dict, float]:
+    """以只读内存映射方式加载导出文件
+
+    Returns:
+        (模型对象, 元数据, 加载耗时秒数)
+
+    Raises:
+        ValueError: 文件不是本格式或版本不受支持
+    """
+    import joblib
+
+    start = time.perf_counter()
+    payload = joblib.load(path, mmap_mode='r')
+    elapsed = time.perf_counter() - start
+
+    if not isinstance(payload, dict) or payload.get('format') != FORMAT_NAME:
+        raise ValueError(f"Not a {FORMAT_NAME} artifact")
+    if payload.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact version {payload.get('format_version')}")
+
+    meta = {key: value for key, value in payload.items() if key != 'model'}
+    return payload['model'], meta, elapsed
@@ -0,0 +1,265 @@
+"""
+模型清单与多模型注册表
+
+模型目录中可放置 manifest.json，列出要提供服务的模型及其名称、版本、校验和与输入特征：
+
+    {
+        "default": "hp-risk",
+        "models": [
+            {
+                "name": "hp-risk",
+                "version": "1.0.0",
+                "file": "best_logistic_regression_model.joblib",
+                "sha256": "...",
+                "features": ["如果使用马桶，是否习惯盖马桶盖", ...]
+            }
+        ]
+    }
+
+有清单时只加载清单中列出的文件，按名称/版本确定性地选择；没有清单时按扩展名优先级和文件名排序选择，
+不再依赖 os.listdir 的返回顺序。
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+# 模型文件扩展名，按优先级排列
+MODEL_EXTENSIONS = ('.joblib', '.pkl', '.pickle', '.model')
+
+# 已解析的清单缓存：{清单路径: (mtime_ns, size, ModelManifest)}
+_manifest_cache = {}
+_manifest_lock = threading.Lock()
+
+
+class ModelSpec:
+    """清单中的一个模型：名称、版本、文件路径、校验和、输入特征"""
+
+    __slots__ = ('name', 'version', 'path', 'sha256', 'features')
+
+    def __init__(self, name: str, version: str, path: str, sha256: Optional[str] = None,
+                 features: Optional[List[str]] = None):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.sha256 = sha256
+        self.features = features
+
+    @property
+    def ref(self) -> str:
+        return f'{self.name}@{self.version}'
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'version': self.version,
+            'file': os.path.basename(self.path),
+            'sha256': self.sha256,
+            'features': self.features
+        }
+
+
+def version_key(version: str) -> tuple:
+    """版本号排序键：按点分隔逐段比较，数字段按数值比较"""
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in str(version).split('.'))
+
+
+class ModelManifest:
+    """解析后的模型清单"""
+
+    def __init__(self, model_dir: str, specs: List[ModelSpec], default: Optional[str] = None):
+        if not specs:
+            raise ValueError("Manifest lists no models")
+        refs = [spec.ref for spec in specs]
+        duplicates = sorted({ref for ref in refs if refs.count(ref) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate models in manifest: {', '.join(duplicates)}")
+
+        self.model_dir = model_dir
+        self.specs = specs
+        self.default = default
+
+    @classmethod
+    def from_dict(cls, model_dir: str, data: dict) -> 'ModelManifest':
+        specs = []
+        for item in data.get('models', []):
+            for field in ('name', 'version', 'file'):
+                if not item.get(field):
+                    raise ValueError(f"Manifest entry is missing '{field}': {item}")
+            specs.append(ModelSpec(
+                name=str(item['name']),
+                version=str(item['version']),
+                path=os.path.join(model_dir, item['file']),
+                sha256=item.get('sha256'),
+                features=item.get('features')
+            ))
+        return cls(model_dir, specs, data.get('default'))
+
+    @classmethod
+    def load(cls, model_dir: str) -> Optional['ModelManifest']:
+        """读取模型目录中的清单，没有清单时返回 None；清单文件未变化时复用上次的解析结果"""
+        path = os.path.join(model_dir, MANIFEST_NAME)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        with _manifest_lock:
+            cached = _manifest_cache.get(path)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cached[2]
+
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = cls.from_dict(model_dir, json.load(f))
+            _manifest_cache[path] = (stat.st_mtime_ns, stat.st_size, manifest)
+            return manifest
+
+    def resolve(self, name: Optional[str] = None, version: Optional[str] = None) -> ModelSpec:
+        """按名称和版本选择模型
+
+        未指定名称时使用清单的 default（可写作 "名称" 或 "名称@版本"），没有 default 时使用第一个模型；
+        未指定版本时使用该名称下版本号最高的模型。
+
+        Raises:
+            KeyError: 清单中没有匹配的模型
+        """
+        if name is None and self.default:
+            name, _, default_version = str(self.default).partition('@')
+            version = version or default_version or None
+        if name is None:
+            name = self.specs[0].name
+
+        candidates = [spec for spec in self.specs if spec.name == name]
+        if version is not None:
+            candidates = [spec for spec in candidates if spec.version == str(version)]
+        if not candidates:
+            ref = f'{name}@{version}' if version is not None else name
+            raise KeyError(f"Model {ref} is not listed in {MANIFEST_NAME}")
+        return max(candidates, key=lambda spec: version_key(spec.version))
+
+
+def select_model_file(model_dir: str) -> Optional[str]:
+    """没有清单时确定性地选择模型文件：先按扩展名优先级，再按文件名排序"""
+    candidates = []
+    for file in os.listdir(model_dir):
+        for priority, ext in enumerate(MODEL_EXTENSIONS):
+            if file.endswith(ext):
+                candidates.append((priority, file))
+                break
+    if not candidates:
+        return None
+
+    candidates.sort()
+    if len(candidates) > 1:
+        logger.info("Multiple model files found, using %s (others: %s)", candidates[0][1],
+                    ', '.join(file for _, file in candidates[1:]))
+    return os.path.join(model_dir, candidates[0][1])
+
+
+class ModelRegistry:
+    """按清单加载全部模型（每个模型只加载一次），按名称/版本提供对应的 ModelService
+
+    没有清单时只包含按 select_model_file 选出的单个模型，名称为文件名（不含扩展名）。
+    清单文件变化后，下次访问时为新增的模型创建服务，移除已从清单中删除的模型。
+    """
+
+    def __init__(self, model_dir: str = 'models', **service_kwargs: Any):
+        self.model_dir = model_dir
+        self.service_kwargs = service_kwargs
+        self.manifest = None
+        self.default_ref = None
+        self._services = {}
+        self._watch_interval = None
+        self._manifest_error = None
+        self._lock = threading.Lock()
+        self._sync(ModelManifest.load(model_dir))
+
+    def _sync(self, manifest: Optional[ModelManifest]):
+        """按清单创建新增模型的服务，移除清单中已删除的模型"""
+        from mlpredict.app.services.model_service import ModelService
+
+        specs = {spec.ref: spec for spec in manifest.specs} if manifest is not None else {None: None}
+        # 在副本上修改后整体替换，其它线程读取时看到的始终是完整的服务表
+        services = dict(self._services)
+        for ref in [ref for ref in services if ref not in specs]:
+            services.pop(ref).stop_watching()
+            logger.info("Model %s removed from %s", ref, MANIFEST_NAME)
+        for ref, spec in specs.items():
+            if ref in services:
+                continue
+            if spec is None:
+                service = ModelService(model_dir=self.model_dir, **self.service_kwargs)
+            else:
+                service = ModelService(model_dir=self.model_dir, model_name=spec.name,
+                                       model_version=spec.version, **self.service_kwargs)
+            if self._watch_interval:
+                service.start_watching(self._watch_interval)
+            services[ref] = service
+        self._services = services
+        self.manifest = manifest
+        self.default_ref = manifest.resolve().ref if manifest is not None else None
+
+    def refresh(self):
+        """清单文件变化时（按 mtime/size 判断）同步模型服务；新清单无效时保留当前的模型"""
+        try:
+            manifest = ModelManifest.load(self.model_dir)
+        except (ValueError, KeyError, OSError) as e:
+            if str(e) != self._manifest_error:
+                self._manifest_error = str(e)
+                logger.warning("Ignoring invalid %s in %s: %s", MANIFEST_NAME, self.model_dir, e)
+            return
+        self._manifest_error = None
+        if manifest is self.manifest:
+            return
+        with self._lock:
+            if manifest is not self.manifest:
+                self._sync(manifest)
+
+    def start_watching(self, interval: float):
+        """为全部模型（包括之后加入清单的模型）启动文件变化的轮询热更新"""
+        with self._lock:
+            self._watch_interval = interval
+            for service in self._services.values():
+                service.start_watching(interval)
+
+    def get(self, name: Optional[str] = None, version: Optional[str] = None):
+        """按名称/版本获取模型服务，均未指定时返回默认模型
+
+        Raises:
+            KeyError: 没有匹配的模型
+        """
+        self.refresh()
+        manifest, services = self.manifest, self._services
+        if manifest is None:
+            if name is not None or version is not None:
+                raise KeyError(f"No {MANIFEST_NAME} in {self.model_dir}; only the default model is available")
+            return services[None]
+        return services[manifest.resolve(name, version).ref]
+
+    def services(self) -> list:
+        """全部模型服务"""
+        self.refresh()
+        return list(self._services.values())
+
+    def list_models(self) -> List[dict]:
+        """各模型的清单信息与加载状态"""
+        self.refresh()
+        specs = {spec.ref: spec for spec in self.manifest.specs} if self.manifest is not None else {}
+        models = []
+        for ref, service in list(self._services.items()):
+            spec = specs.get(ref)
+            info = spec.to_dict() if spec is not None else {
+                'name': os.path.splitext(os.path.basename(service.model_file or ''))[0] or None,
+                'version': None,
+                'file': os.path.basename(service.model_file) if service.model_file else None
+            }
+            info['default'] = ref == self.default_ref
+            info['model_loaded'] = service.model_loaded
+            info['load_error'] = service.load_error
+            models.append(info)
+        return models
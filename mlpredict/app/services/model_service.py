@@ -1,112 +1,658 @@
+import logging
 import os
-import joblib
-import pandas as pd
-from typing import Optional, Any
+import threading
+import time
+import numpy as np
+from typing import Optional, Any, Union, Sequence
+
+from mlpredict.app.services.drift_monitor import DriftMonitor
+from mlpredict.app.services.explanations import LinearExplainer
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS, FEATURE_NAMES, check_model_schema
+from mlpredict.app.services.metrics import metrics
+from mlpredict.app.services.linear_scorer import (
+    LinearScorer, artifact_path_for, export_linear_model, file_sha256, source_matches
+)
+from mlpredict.app.services.model_registry import ModelManifest, ModelSpec, select_model_file
+from mlpredict.app.services.mmap_artifact import load_mmap_model, mmap_artifact_path_for, export_mmap_model
+from mlpredict.app.services.prediction_cache import PredictionCache, feature_key
+from mlpredict.app.services.score_table import ScoreTable, domain_grid
+
+logger = logging.getLogger(__name__)
+
+# 加载新模型后用于冒烟预测的标准测试向量
+SMOKE_TEST_VECTOR = [1, 2, 4, 3, 1]
+
+
+class _ModelEntry:
+    """模型缓存条目：真实路径 + 文件签名(mtime, size) + 已加载的模型对象 + 全输入域结果表 + 单条预测缓存"""
+
+    __slots__ = ('path', 'signature', 'model', 'source', 'load_seconds', 'sha256', 'score_table',
+                 'prediction_cache', 'explainer')
+
+    def __init__(self, path: str, signature: tuple, model: Any, source: str = 'joblib',
+                 load_seconds: float = 0.0):
+        self.path = path
+        self.signature = signature
+        self.model = model
+        # 模型来源：joblib / linear_artifact / mmap_artifact
+        self.source = source
+        self.load_seconds = load_seconds
+        # 模型文件的 SHA-256，按需计算（清单中给出校验和时）
+        self.sha256 = None
+        self.score_table = None
+        self.prediction_cache = None
+        # 逐特征贡献的计算器：None 表示尚未创建，False 表示模型不支持
+        self.explainer = None
+
 
 class ModelService:
-    def __init__(self, model_dir: str = 'models'):
+    # 进程级共享的模型注册表，所有会话和 Streamlit 重跑共用：{(真实路径, 加载选项): _ModelEntry}
+    _registry = {}
+    _registry_lock = threading.RLock()
+    _cache_stats = {'hits': 0, 'misses': 0}
+    # 每个缓存键的加载锁，保证同一模型文件同时只被一个线程加载
+    _load_locks = {}
+
+    def __init__(self, model_dir: str = 'models', use_score_table: bool = True,
+                 use_linear_artifact: bool = True, prediction_cache_size: int = 0,
+                 use_mmap_artifact: bool = True, model_name: Optional[str] = None,
+                 model_version: Optional[str] = None, drift_monitor: Optional[DriftMonitor] = None):
         self.model_dir = model_dir
-        self.model = None
+        # 模型目录中有 manifest.json 时，按名称/版本从清单中选择模型，均为 None 时使用清单的默认模型
+        self.model_name = model_name
+        self.model_version = model_version
+        self.model_spec = None
+        self.use_score_table = use_score_table
+        # 单条预测的 LRU 缓存容量，0 表示不缓存；缓存随模型条目一起在模型重新加载时失效
+        self.prediction_cache_size = prediction_cache_size
+        # 存在与模型文件匹配的 .linear.json 导出文件时，使用纯 NumPy 打分器代替 joblib 加载
+        self.use_linear_artifact = use_linear_artifact
+        # 存在与模型文件匹配的 .mmap 导出文件时，以只读内存映射方式加载，多进程共享模型数组
+        self.use_mmap_artifact = use_mmap_artifact
+        # 设置后每次预测的编码特征和结果都计入漂移监控
+        self.drift_monitor = drift_monitor
+        self.model_file = None
         self.model_loaded = False
         self.load_error = None
+        self._entry = None
+        self._watcher = None
         
         # 初始化时自动加载模型
         self.load_model()
+
+    @property
+    def model(self) -> Optional[Any]:
+        """当前使用的模型对象"""
+        entry = self._entry
+        return entry.model if entry is not None else None
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        """获取模型缓存的命中/未命中计数"""
+        with cls._registry_lock:
+            return {
+                'hits': cls._cache_stats['hits'],
+                'misses': cls._cache_stats['misses'],
+                'size': len(cls._registry)
+            }
+
+    @classmethod
+    def clear_cache(cls):
+        """清空模型缓存及计数"""
+        with cls._registry_lock:
+            cls._registry.clear()
+            cls._cache_stats['hits'] = 0
+            cls._cache_stats['misses'] = 0
     
     def find_model_file(self) -> Optional[str]:
-        """查找模型文件"""
-        model_extensions = ['.joblib', '.pkl', '.pickle', '.model']
+        """查找模型文件（确定性选择，见 _resolve_model）"""
+        return self._resolve_model()[0]
+
+    def _resolve_model(self):
+        """选择模型文件，返回 (文件路径, 清单条目)
         
-        for file in os.listdir(self.model_dir):
-            if any(file.endswith(ext) for ext in model_extensions):
-                return os.path.join(self.model_dir, file)
+        有清单时按 model_name/model_version 从清单中选择；没有清单时按扩展名优先级和文件名排序选择，
+        清单条目为 None。
         
-        return None
+        Raises:
+            KeyError: 清单中没有指定的模型
+            ValueError: 清单格式错误，或没有清单却指定了模型名称/版本
+        """
+        manifest = ModelManifest.load(self.model_dir)
+        if manifest is None:
+            if self.model_name is not None or self.model_version is not None:
+                raise ValueError(f"Model {self.model_name}@{self.model_version} requested "
+                                 f"but {self.model_dir} has no manifest")
+            return select_model_file(self.model_dir), None
+        spec = manifest.resolve(self.model_name, self.model_version)
+        return spec.path, spec
+    
+    def model_snapshot(self) -> Optional[tuple]:
+        """当前应加载的模型：(真实路径, 文件签名, 清单中的校验和)，没有模型文件时返回 None"""
+        model_file, spec = self._resolve_model()
+        if not model_file:
+            return None
+        path = os.path.realpath(model_file)
+        signature = self._file_signature(path, self.use_linear_artifact, self.use_mmap_artifact)[0]
+        return path, signature, spec.sha256 if spec is not None else None
+
+    def loaded_snapshot(self) -> Optional[tuple]:
+        """正在使用的模型，格式同 model_snapshot()"""
+        entry, spec = self._entry, self.model_spec
+        if entry is None:
+            return None
+        return entry.path, entry.signature, spec.sha256 if spec is not None else None
+
+    def start_watching(self, interval: float = 2.0):
+        """启动后台线程轮询模型文件，文件变化时热更新（见 ModelWatcher）"""
+        from mlpredict.app.services.model_watcher import ModelWatcher
+        
+        if self._watcher is None:
+            self._watcher = ModelWatcher(self, interval=interval).start()
+        return self._watcher
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
     
     def load_model(self) -> bool:
-        """加载模型文件"""
-        model_file = self.find_model_file()
+        """加载模型文件
+        
+        同一文件（按真实路径和 mtime/size 判断）只会被 joblib 加载一次，
+        之后的调用直接复用进程级缓存中的模型；文件发生变化时才重新加载。
+        清单中给出的校验和与特征列在加载前后校验，不匹配时加载失败。
+        新模型的结果表构建完成后才替换当前模型；加载失败时继续使用之前已加载的模型。
+        """
+        try:
+            with metrics.timer('find_model_file'):
+                model_file, spec = self._resolve_model()
+        except (KeyError, ValueError, OSError) as e:
+            metrics.inc('model_load_errors_total')
+            self.load_error = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+            logger.error("Error selecting model in %s: %s", self.model_dir, self.load_error)
+            return False
         
         if not model_file:
-            print(f"No model file found in {self.model_dir}")
+            logger.warning("No model file found in %s", self.model_dir)
+            return False
+        
+        try:
+            with metrics.timer('load_model'):
+                entry = self._get_or_load(model_file, self.use_linear_artifact, self.use_mmap_artifact,
+                                          expected_sha256=spec.sha256 if spec is not None else None)
+            self._check_feature_schema(spec)
+        except Exception as e:
+            metrics.inc('model_load_errors_total')
+            self.load_error = str(e)
+            logger.error("Error loading model from %s: %s", model_file, e, exc_info=True)
             return False
         
+        if self.use_score_table:
+            self._ensure_score_table(entry, (entry.path, self.use_linear_artifact, self.use_mmap_artifact))
+        if self.prediction_cache_size > 0:
+            self._ensure_prediction_cache(entry, self.prediction_cache_size)
+        
+        self._entry = entry
+        self.model_file = model_file
+        self.model_spec = spec
+        self.model_loaded = True
+        self.load_error = None
+        return True
+
+    @classmethod
+    def _ensure_score_table(cls, entry: _ModelEntry, key: tuple):
+        """为缓存条目构建全输入域结果表（每个模型文件版本只构建一次）
+        
+        构建时只持有该缓存键的加载锁，不阻塞其它模型的加载和查询；构建完成后才在注册表锁内发布。
+        """
+        if entry.score_table is not None:
+            return
+        
+        with cls._registry_lock:
+            load_lock = cls._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            if entry.score_table is not None:
+                return
+            try:
+                with metrics.timer('score_table_build'):
+                    score_table = ScoreTable.build(
+                        FEATURE_DOMAINS, lambda grid: cls._predict_model(entry.model, grid)
+                    )
+            except Exception as e:
+                logger.warning("Error building score table, falling back to model predictions: %s", e)
+                return
+            with cls._registry_lock:
+                entry.score_table = score_table
+            logger.debug("Score table built with %d entries", len(score_table.outputs))
+
+    @classmethod
+    def _ensure_prediction_cache(cls, entry: _ModelEntry, max_size: int):
+        """为缓存条目创建单条预测缓存（同一条目的多个服务实例共用，容量取首次创建时的值）"""
+        if entry.prediction_cache is not None:
+            return
+        with cls._registry_lock:
+            if entry.prediction_cache is None:
+                entry.prediction_cache = PredictionCache(max_size, fingerprint=(entry.path, entry.signature))
+
+    @staticmethod
+    def _file_signature(path: str, use_linear_artifact: bool, use_mmap_artifact: bool):
+        """模型文件及其导出文件的签名，返回 (签名, 纯 NumPy 导出文件, 内存映射导出文件)"""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        artifacts = []
+        for enabled, artifact in ((use_linear_artifact, artifact_path_for(path)),
+                                  (use_mmap_artifact, mmap_artifact_path_for(path))):
+            if enabled and os.path.exists(artifact):
+                artifact_stat = os.stat(artifact)
+                signature += (artifact_stat.st_mtime_ns, artifact_stat.st_size)
+                artifacts.append(artifact)
+            else:
+                artifacts.append(None)
+        return signature, artifacts[0], artifacts[1]
+
+    @classmethod
+    def _get_or_load(cls, model_file: str, use_linear_artifact: bool = True,
+                     use_mmap_artifact: bool = True, expected_sha256: Optional[str] = None) -> _ModelEntry:
+        """从缓存获取模型，缓存缺失或文件已变化时重新加载
+        
+        加载顺序：纯 NumPy 打分文件(.linear.json) -> 内存映射文件(.mmap) -> joblib 加载模型文件，
+        导出文件缺失、损坏或与模型文件不匹配时依次回退。
+        给出 expected_sha256 时，在反序列化之前校验模型文件的校验和，并用它核对导出文件；
+        否则只按签名(mtime, size)核对导出文件，不计算校验和。
+        新加载的模型通过冒烟预测后才放入缓存。文件变化后若已有其它线程在加载新版本，
+        直接返回旧版本而不是等待，避免重新加载期间的请求被阻塞。
+        """
+        path = os.path.realpath(model_file)
+        signature, linear_artifact, mmap_artifact = cls._file_signature(
+            path, use_linear_artifact, use_mmap_artifact
+        )
+        key = (path, use_linear_artifact, use_mmap_artifact)
+        
+        with cls._registry_lock:
+            entry = cls._registry.get(key)
+            hit = entry is not None and entry.signature == signature
+            if hit:
+                cls._cache_stats['hits'] += 1
+                sha256 = entry.sha256
+            else:
+                load_lock = cls._load_locks.setdefault(key, threading.Lock())
+
+        if hit:
+            metrics.inc('model_cache_hits_total')
+            if expected_sha256 is not None:
+                # 校验和在注册表锁外计算，避免大文件的哈希阻塞其它模型的加载和查询
+                if sha256 is None:
+                    sha256 = file_sha256(path)
+                    with cls._registry_lock:
+                        entry.sha256 = sha256
+                cls._check_sha256(path, sha256, expected_sha256)
+            return entry
+
+        if not load_lock.acquire(blocking=entry is None):
+            # 其它线程正在加载新版本，先继续使用旧版本
+            return entry
         try:
-            print(f"Attempting to load model from {model_file}")
-            # 直接使用joblib加载模型
-            self.model = joblib.load(model_file)
-            print(f"Raw model loaded. Type: {type(self.model)}")
+            with cls._registry_lock:
+                current = cls._registry.get(key)
+                if current is not None and current.signature == signature:
+                    return current
+                cls._cache_stats['misses'] += 1
+            metrics.inc('model_cache_misses_total')
             
-            # 处理模型数据，如果是元组，尝试找到模型对象
-            if isinstance(self.model, tuple):
-                print(f"Model is a tuple of length {len(self.model)}")
-                found_predict = False
-                for i, item in enumerate(self.model):
-                    print(f"Checking item {i}: type={type(item)}")
-                    try:
-                        if hasattr(item, 'predict'):
-                            print(f"Item {i} has 'predict' method.")
-                            self.model = item
-                            found_predict = True
-                            break
-                    except Exception as e:
-                        print(f"Error checking item {i}: {e}")
-                
-                # 如果没有找到，使用第一个元素
-                if not found_predict and isinstance(self.model, tuple):
-                    print("No item with 'predict' found, using first element.")
-                    self.model = self.model[0]
+            start = time.perf_counter()
+            sha256 = None
+            if expected_sha256 is not None:
+                sha256 = file_sha256(path)
+                cls._check_sha256(path, sha256, expected_sha256)
+            model, source = None, None
+            if linear_artifact:
+                with metrics.timer('linear_artifact_load'):
+                    model = cls._load_linear_artifact(path, linear_artifact, sha256)
+                source = 'linear_artifact'
+            if model is None and mmap_artifact:
+                with metrics.timer('mmap_artifact_load'):
+                    model = cls._load_mmap_artifact(path, mmap_artifact, sha256)
+                source = 'mmap_artifact'
+            if model is None:
+                # joblib（及反序列化时用到的 scikit-learn）只在真正需要加载模型文件时导入
+                import joblib
+                logger.debug("Attempting to load model from %s", path)
+                with metrics.timer('joblib_load'):
+                    model = cls._unwrap_model(joblib.load(path))
+                source = 'joblib'
+            # 输入列只在加载时与特征定义核对一次，预测时不再逐次检查
+            check_model_schema(model)
+            cls._smoke_test(model)
+            load_seconds = time.perf_counter() - start
+            metrics.inc('model_loads_total', source=source)
             
-            self.model_loaded = True
-            print(f"Model loaded successfully from {model_file}")
-            return True
+            entry = _ModelEntry(path, signature, model, source=source, load_seconds=load_seconds)
+            entry.sha256 = sha256
+            with cls._registry_lock:
+                cls._registry[key] = entry
+            logger.info("Model loaded from %s", path, extra={
+                'model_type': type(model).__name__, 'source': source, 'load_seconds': round(load_seconds, 6)
+            })
+            return entry
+        finally:
+            load_lock.release()
+
+    @classmethod
+    def _smoke_test(cls, model: Any):
+        """用标准测试向量做一次预测，结果形状或取值异常时抛出 ValueError"""
+        result = np.asarray(cls._predict_model(model, np.array([SMOKE_TEST_VECTOR], dtype=np.float64)))
+        if len(result) != 1 or not np.all(np.isfinite(result)):
+            raise ValueError(f"Smoke prediction on {SMOKE_TEST_VECTOR} returned {result!r}")
+        if result.ndim == 2 and (np.any(result < 0) or np.any(result > 1) or abs(result.sum() - 1.0) > 1e-6):
+            raise ValueError(f"Smoke prediction on {SMOKE_TEST_VECTOR} returned invalid probabilities {result!r}")
+
+    @staticmethod
+    def _check_sha256(path: str, actual: str, expected: str):
+        if actual.lower() != expected.lower():
+            raise ValueError(f"Checksum mismatch for {path}: expected {expected}, got {actual}")
+
+    @staticmethod
+    def _check_feature_schema(spec: Optional[ModelSpec]):
+        """校验清单中的特征列与特征定义一致（模型训练时的列已在加载时由 check_model_schema 校验）"""
+        if spec is None or not spec.features:
+            return
+        if list(spec.features) != FEATURE_NAMES:
+            raise ValueError(f"Model {spec.ref} expects features {spec.features}, "
+                             f"but the service provides {FEATURE_NAMES}")
+
+    @staticmethod
+    def _load_mmap_artifact(model_file: str, artifact: str, sha256: Optional[str] = None) -> Optional[Any]:
+        """以内存映射方式加载导出文件，导出文件与模型文件不匹配时返回 None（见 source_matches）"""
+        try:
+            model, meta, _ = load_mmap_model(artifact)
         except Exception as e:
-            print(f"Error loading model: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+            logger.warning("Error loading mmap artifact %s, falling back to joblib: %s", artifact, e)
+            return None
+        
+        if not source_matches(meta.get('source'), model_file, sha256):
+            logger.warning("Mmap artifact %s does not match %s, falling back to joblib", artifact, model_file)
+            return None
+        
+        logger.debug("Using mmap artifact %s", artifact)
+        return model
+
+    @staticmethod
+    def _load_linear_artifact(model_file: str, artifact: str, sha256: Optional[str] = None) -> Optional[LinearScorer]:
+        """加载纯 NumPy 打分器，导出文件与模型文件不匹配时返回 None（见 source_matches）"""
+        try:
+            scorer = LinearScorer.load(artifact)
+        except Exception as e:
+            logger.warning("Error loading linear artifact %s, falling back to joblib: %s", artifact, e)
+            return None
+        
+        if not source_matches(scorer.spec.get('source'), model_file, sha256):
+            logger.warning("Linear artifact %s does not match %s, falling back to joblib", artifact, model_file)
+            return None
+        
+        logger.debug("Using linear artifact %s", artifact)
+        return scorer
+
+    @staticmethod
+    def _unwrap_model(model: Any) -> Any:
+        """处理模型数据，如果是元组，尝试找到具有 predict 方法的模型对象"""
+        logger.debug("Raw model loaded. Type: %s", type(model))
+        
+        if not isinstance(model, tuple):
+            return model
+        
+        logger.debug("Model is a tuple of length %d", len(model))
+        for i, item in enumerate(model):
+            logger.debug("Checking item %d: type=%s", i, type(item))
+            try:
+                if hasattr(item, 'predict'):
+                    logger.debug("Item %d has 'predict' method.", i)
+                    return item
+            except Exception as e:
+                logger.debug("Error checking item %d: %s", i, e)
+        
+        # 如果没有找到，使用第一个元素
+        logger.warning("No item with 'predict' found, using first element.")
+        return model[0]
     
     def predict(self, features: list) -> Optional[Any]:
         """使用模型进行预测"""
-        if not self.model_loaded:
+        entry = self._entry
+        cache = entry.prediction_cache if entry is not None and self.prediction_cache_size > 0 else None
+        key = feature_key(features) if cache is not None else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                metrics.inc('prediction_cache_hits_total')
+                self._update_drift(features, cached, single=True)
+                return cached
+            metrics.inc('prediction_cache_misses_total')
+        
+        result = self._predict_entry(entry, [features])
+        if result is None:
+            return None
+        # 返回独立的副本而不是批量结果的视图；缓存中另存只读副本，调用方修改返回值不影响缓存
+        prediction = result[0].copy()
+        if key is not None:
+            cache.put(key, prediction)
+        self._update_drift(features, prediction, single=True)
+        return prediction
+
+    def predict_batch(self, X: Union[np.ndarray, Sequence[Sequence[Any]]]) -> Optional[np.ndarray]:
+        """批量预测
+        
+        Args:
+            X: 形状为 (n, 5) 的 NumPy 数组或特征列表的列表，None/NaN 表示缺失
+            
+        Returns:
+            np.ndarray: 分类模型返回 (n, 类别数) 的概率矩阵，回归模型返回 (n,) 的预测值；
+            失败时返回 None
+        """
+        result = self._predict_entry(self._entry, X)
+        if result is not None:
+            self._update_drift(X, result)
+        return result
+
+    def _update_drift(self, X: Any, prediction: Any, single: bool = False):
+        """把预测计入漂移监控（single 为 True 时 X 为单条特征向量）
+
+        监控出错只记录日志，不影响预测结果的返回。
+        """
+        if self.drift_monitor is None:
+            return
+        try:
+            if single:
+                self.drift_monitor.update(X, prediction)
+            else:
+                self.drift_monitor.update_batch(X, prediction)
+        except Exception as e:
+            metrics.inc('drift_monitor_errors_total')
+            logger.warning("Error updating drift monitor: %s", e, exc_info=True)
+
+    def _predict_entry(self, entry: Optional[_ModelEntry], X: Union[np.ndarray, Sequence[Sequence[Any]]]
+                       ) -> Optional[np.ndarray]:
+        """在给定的模型条目上预测
+        
+        调用方在请求开始时取一次 self._entry，整个请求都使用这个条目：
+        热更新替换 self._entry 后，进行中的请求仍在旧模型上完成，新请求使用新模型。
+        """
+        if entry is None:
             if not self.load_model():
                 return None
+            entry = self._entry
         
         try:
-            # 处理缺失值
-            processed_features = [0 if f is None else f for f in features]
-            
-            # 创建DataFrame，使用正确的列名
-            feature_names = [
-                '如果使用马桶，是否习惯盖马桶盖',
-                '家庭厕所类型',
-                '居住房屋所有权',
-                '零食的食用频率',
-                '家中蔬菜的购买方式'
-            ]
-            
-            df = pd.DataFrame([processed_features], columns=feature_names)
-            
-            # 确保输入形状正确
-            if hasattr(self.model, 'predict_proba'):
-                # 对于分类模型，返回概率
-                return self.model.predict_proba(df)[0]
-            else:
-                # 对于回归模型，返回预测值
-                return self.model.predict(df)[0]
+            with metrics.timer('predict_batch'):
+                features = self._prepare_features(X)
+                metrics.inc('predicted_rows_total', len(features))
+                
+                table = entry.score_table if self.use_score_table else None
+                if table is None:
+                    return self._predict_model(entry.model, features)
+                
+                # 输入域内的行直接查表，其余行回退到模型计算
+                with metrics.timer('score_table_lookup'):
+                    result, valid = table.lookup(features)
+                if not valid.all():
+                    result[~valid] = self._predict_model(entry.model, features[~valid])
+                return result
         except Exception as e:
-            print(f"Error during prediction: {e}")
-            import traceback
-            traceback.print_exc()
+            metrics.inc('prediction_errors_total')
+            logger.error("Error during prediction: %s", e, exc_info=True)
+            return None
+
+    @classmethod
+    def _predict_model(cls, model: Any, features: np.ndarray) -> np.ndarray:
+        """调用模型预测，缺失值(NaN)批量填充为0"""
+        with metrics.timer('build_model_input'):
+            model_input = cls._build_model_input(model, np.nan_to_num(features, nan=0.0))
+        
+        if hasattr(model, 'predict_proba'):
+            # 对于分类模型，返回概率
+            with metrics.timer('predict_proba'):
+                return model.predict_proba(model_input)
+        else:
+            # 对于回归模型，返回预测值
+            with metrics.timer('model_predict'):
+                return model.predict(model_input)
+
+    def explain_batch(self, X: Union[np.ndarray, Sequence[Sequence[Any]]]):
+        """批量预测并计算逐特征的对数几率贡献
+        
+        贡献相对于基线（各特征在整个输入域上的平均贡献），满足
+        对数几率 = contribution_baseline() + 各特征贡献之和。
+        
+        Returns:
+            (预测结果, 形状为 (n, 5) 的贡献矩阵)；模型不是线性模型时贡献为 None；预测失败时返回 None
+        """
+        entry = self._entry
+        prediction = self._predict_entry(entry, X)
+        if prediction is None:
+            return None
+        self._update_drift(X, prediction)
+        explainer = self._get_explainer(self._entry if entry is None else entry)
+        if explainer is None:
+            return prediction, None
+        with metrics.timer('contributions'):
+            return prediction, explainer.contributions(self._prepare_features(X))
+
+    def explain(self, features: list):
+        """单条预测并计算逐特征贡献，返回 (预测结果, 长度为 5 的贡献)，含义同 explain_batch
+        
+        预测结果经过 predict()，启用预测缓存时同样命中缓存。
+        """
+        prediction = self.predict(features)
+        if prediction is None:
+            return None
+        explainer = self._get_explainer(self._entry)
+        if explainer is None:
+            return prediction, None
+        with metrics.timer('contributions'):
+            return prediction, explainer.contributions(self._prepare_features(features))[0]
+
+    def contribution_baseline(self) -> Optional[float]:
+        """贡献的基线对数几率，模型不支持逐特征贡献时返回 None"""
+        explainer = self._get_explainer(self._entry)
+        return None if explainer is None else explainer.baseline_logit
+
+    @classmethod
+    def _get_explainer(cls, entry: Optional[_ModelEntry]) -> Optional[LinearExplainer]:
+        """为缓存条目创建逐特征贡献计算器（每个模型文件版本只创建一次）"""
+        if entry is None:
             return None
+        if entry.explainer is None:
+            with cls._registry_lock:
+                if entry.explainer is None:
+                    explainer = LinearExplainer.from_model(entry.model, FEATURE_NAMES, domain_grid(FEATURE_DOMAINS))
+                    if explainer is None:
+                        logger.info("Model %s does not support per-feature contributions", type(entry.model).__name__)
+                    entry.explainer = explainer or False
+        return entry.explainer or None
+
+    @staticmethod
+    def _prepare_features(X: Union[np.ndarray, Sequence[Sequence[Any]]]) -> np.ndarray:
+        """转换为二维浮点数组，None 转为 NaN；已是 float64 数组时直接使用，不复制"""
+        features = np.asarray(X, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if features.ndim != 2 or features.shape[1] != len(FEATURE_NAMES):
+            raise ValueError(
+                f"Expected input of shape (n, {len(FEATURE_NAMES)}), got {features.shape}"
+            )
+        return features
+
+    @staticmethod
+    def _build_model_input(model: Any, features: np.ndarray) -> Any:
+        """仅当模型按列名取特征(feature_names_in_)时才构建 DataFrame，否则直接使用数组"""
+        if hasattr(model, 'feature_names_in_'):
+            import pandas as pd
+            return pd.DataFrame(features, columns=FEATURE_NAMES, copy=False)
+        return features
     
+    def export_linear_artifact(self, output_path: Optional[str] = None) -> str:
+        """将当前的 scikit-learn 逻辑回归导出为纯 NumPy 打分器使用的文件
+        
+        导出结果在整个输入域上与 predict_proba 的误差不超过 1e-12，否则抛出 ValueError。
+        
+        Returns:
+            str: 导出文件路径
+        """
+        if not self.model_loaded and not self.load_model():
+            raise RuntimeError(f"Model not loaded: {self.load_error}")
+        if isinstance(self.model, LinearScorer):
+            raise ValueError("Model was loaded from a linear artifact; reload with use_linear_artifact=False")
+        
+        output_path = output_path or artifact_path_for(self._entry.path)
+        validation_X = np.nan_to_num(domain_grid(FEATURE_DOMAINS), nan=0.0)
+        export_linear_model(self.model, FEATURE_NAMES, output_path, validation_X,
+                            source_file=self._entry.path)
+        return output_path
+    
+    def prediction_cache_stats(self) -> Optional[dict]:
+        """单条预测缓存的命中率和大小，未启用时返回 None"""
+        entry = self._entry
+        if entry is None or entry.prediction_cache is None or self.prediction_cache_size <= 0:
+            return None
+        return entry.prediction_cache.stats()
+    
+    def export_mmap_artifact(self, output_path: Optional[str] = None) -> str:
+        """将当前模型导出为可内存映射的文件，多个工作进程加载时共享只读的模型数组
+        
+        Returns:
+            str: 导出文件路径
+        """
+        if not self.model_loaded and not self.load_model():
+            raise RuntimeError(f"Model not loaded: {self.load_error}")
+        if self._entry.source != 'joblib':
+            raise ValueError(f"Model was loaded from {self._entry.source}; reload with the artifact disabled")
+        
+        output_path = output_path or mmap_artifact_path_for(self._entry.path)
+        return export_mmap_model(self.model, output_path, source_file=self._entry.path)
+    
+    def model_fingerprint(self) -> Optional[str]:
+        """当前模型文件的 SHA-256（清单中没有校验和时首次调用时计算，每个模型文件版本只计算一次）"""
+        entry = self._entry
+        if entry is None:
+            return None
+        if entry.sha256 is None:
+            entry.sha256 = file_sha256(entry.path)
+        return entry.sha256
+
     def get_model_info(self) -> dict:
         """获取模型信息"""
-        model_file = self.find_model_file()
+        model = self.model
+        entry = self._entry
         
         return {
             'model_loaded': self.model_loaded,
-            'model_file': model_file,
-            'model_type': type(self.model).__name__ if self.model else 'None',
-            'load_error': self.load_error
+            'model_file': self.model_file,
+            'model_name': self.model_spec.name if self.model_spec is not None else None,
+            'model_version': self.model_spec.version if self.model_spec is not None else None,
+            'model_type': type(model).__name__ if model is not None else 'None',
+            'model_source': entry.source if entry is not None else None,
+            'load_seconds': entry.load_seconds if entry is not None else None,
+            'load_error': self.load_error,
+            'cache_stats': self.cache_stats(),
+            'watcher': self._watcher.stats() if self._watcher is not None else None,
+            'prediction_cache': self.prediction_cache_stats()
         }
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+模型热更新
+
+后台线程按固定间隔轮询模型目录（清单、模型文件及其导出文件的 mtime/size），
+发现变化且文件在连续两次轮询间保持不变后，在后台线程中加载新模型、做冒烟预测并构建结果表，
+全部通过后原子替换 ModelService 当前使用的模型条目。替换前已开始的请求在旧模型上完成，
+新请求使用新模型；加载或校验失败时继续使用旧模型。
+"""
+
+import logging
+import threading
+from typing import Optional
+
+from mlpredict.app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWatcher:
+    """轮询模型文件变化并热更新 ModelService"""
+
+    def __init__(self, model_service, interval: float = 2.0):
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.model_service = model_service
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+        self._pending = None
+        self._failed = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'ModelWatcher':
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error("Model watcher error: %s", e, exc_info=True)
+
+    def check(self) -> bool:
+        """轮询一次，发生热更新时返回 True"""
+        service = self.model_service
+        try:
+            snapshot = service.model_snapshot()
+        except Exception as e:
+            logger.warning("Cannot check model files in %s: %s", service.model_dir, e)
+            return False
+
+        if snapshot is None or snapshot == service.loaded_snapshot():
+            self._pending = None
+            return False
+        # 文件在连续两次轮询间不变才加载，避免读到正在复制中的文件
+        if snapshot != self._pending:
+            self._pending = snapshot
+            return False
+        if snapshot == self._failed:
+            return False
+
+        logger.info("Model files changed, reloading %s", snapshot[0])
+        if service.load_model():
+            if service.loaded_snapshot() != snapshot:
+                # 其它线程正在加载同一文件，下次轮询再确认
+                return False
+            self.reloads += 1
+            self._failed = None
+            metrics.inc('model_reloads_total', result='ok')
+            logger.info("Model reloaded from %s", snapshot[0])
+            return True
+
+        self.failures += 1
+        self._failed = snapshot
+        metrics.inc('model_reloads_total', result='failed')
+        logger.error("Model reload failed, keeping the previous model: %s", service.load_error)
+        return False
+
+    def stats(self) -> dict:
+        return {
+            'interval': self.interval,
+            'running': self._thread is not None,
+            'reloads': self.reloads,
+            'failures': self.failures
+        }
@@ -0,0 +1,108 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from mlpredict.app.services.batch_scorer import BatchScorer
+from mlpredict.app.services.cohort_aggregator import CohortAggregator
+from mlpredict.app.services.logging_config import configure_logging
+from mlpredict.app.services.model_service import ModelService
+
+# 工作进程内的打分器，由进程池初始化函数创建，整个进程生命周期内只加载一次模型
+_worker_scorer = None
+
+
+def _init_worker(model_dir: str, model_options: dict):
+    """进程池初始化：在每个工作进程中按主进程给出的选项加载一次模型"""
+    global _worker_scorer
+    configure_logging()
+    _worker_scorer = BatchScorer(model_service=ModelService(model_dir=model_dir, **model_options))
+
+
+def _compute_scores(answers: pd.DataFrame) -> np.ndarray:
+    """在工作进程中为一个分块打分"""
+    return _worker_scorer.compute_scores(answers)
+
+
+def _aggregate_chunk(frame: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """在工作进程中为一个分块打分并按组汇总，只返回分组累加量"""
+    return CohortAggregator(**config).partial(frame, _worker_scorer.compute_scores(frame))
+
+
+class ParallelScorer(BatchScorer):
+    """多进程批量打分
+
+    读取和写出仍在主进程中按顺序进行，特征编码和模型预测分发到进程池；
+    同时在途的分块数有上限，结果按输入顺序返回，内存占用保持平稳。
+    模型只在工作进程中加载，主进程不持有模型（model_service 为 None）；
+    模型加载或预测失败时，score_file/aggregate_file 抛出 RuntimeError。
+    """
+
+    def __init__(self, model_dir: str = 'models', chunk_size: int = 50000,
+                 workers: Optional[int] = None, start_method: Optional[str] = None,
+                 max_pending: Optional[int] = None, use_score_table: bool = True,
+                 use_linear_artifact: bool = True, use_mmap_artifact: bool = True):
+        """
+        Args:
+            model_dir: 模型目录
+            chunk_size: 每个任务的行数
+            workers: 工作进程数，默认为 CPU 核数
+            start_method: 进程启动方式（'fork'、'spawn'、'forkserver'），默认使用平台默认值
+            max_pending: 同时在途的最大分块数，默认为工作进程数的两倍
+            use_score_table, use_linear_artifact, use_mmap_artifact: 工作进程中 ModelService 的加载选项
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        self.chunk_size = chunk_size
+        self.feature_processor = None
+        self.model_service = None
+        self.model_dir = model_dir
+        self.model_options = {
+            'use_score_table': use_score_table,
+            'use_linear_artifact': use_linear_artifact,
+            'use_mmap_artifact': use_mmap_artifact
+        }
+        self.workers = workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self.max_pending = max_pending or 2 * self.workers
+
+    def _executor(self) -> ProcessPoolExecutor:
+        context = multiprocessing.get_context(self.start_method)
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(self.model_dir, self.model_options))
+
+    def score_chunks(self, chunks: Iterable[Any]) -> Iterator[Any]:
+        """将分块的特征列（字典编码的列以 Categorical 形式）分发到进程池打分，按输入顺序产出结果"""
+        with self._executor() as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_compute_scores, self.feature_columns(chunk))))
+                if len(pending) >= self.max_pending:
+                    done_chunk, future = pending.popleft()
+                    yield self.attach_scores(done_chunk, future.result())
+
+            while pending:
+                done_chunk, future = pending.popleft()
+                yield self.attach_scores(done_chunk, future.result())
+
+    def aggregate_chunks(self, chunks: Iterable[Any], aggregator: CohortAggregator) -> Iterator[int]:
+        """将分块的特征列和分组列分发到进程池打分并按组汇总，主进程只合并各分块的分组累加量"""
+        config = aggregator.config()
+        with self._executor() as executor:
+            pending = deque()
+            for chunk in chunks:
+                frame = self.aggregation_columns(chunk, aggregator.group_by)
+                pending.append((len(frame), executor.submit(_aggregate_chunk, frame, config)))
+                if len(pending) >= self.max_pending:
+                    rows, future = pending.popleft()
+                    aggregator.merge(future.result())
+                    yield rows
+
+            while pending:
+                rows, future = pending.popleft()
+                aggregator.merge(future.result())
+                yield rows
@@ -0,0 +1,74 @@
+"""
+有界 LRU 预测缓存
+
+以编码后的特征向量为键缓存预测结果，挂在模型缓存条目上：模型文件重新加载时会生成新的条目，
+旧条目连同其预测缓存一起失效，不会返回旧模型的结果。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Sequence
+
+import numpy as np
+
+
+def feature_key(features: Sequence[Any]) -> Optional[tuple]:
+    """编码后特征向量的缓存键，缺失值(None/NaN)统一为 None；无法转换为数值时返回 None"""
+    try:
+        return tuple(None if v is None or v != v else float(v) for v in features)
+    except (TypeError, ValueError):
+        return None
+
+
+class PredictionCache:
+    """线程安全的有界 LRU 缓存，超过 max_size 时淘汰最久未使用的条目"""
+
+    def __init__(self, max_size: int, fingerprint: Hashable = None):
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.max_size = max_size
+        # 模型版本指纹（模型路径 + 文件签名），仅用于展示
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return value.copy()
+
+    def put(self, key: Hashable, value: np.ndarray):
+        value = np.array(value, copy=True)
+        value.flags.writeable = False
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hit_ratio': self.hits / total if total else 0.0
+            }
@@ -0,0 +1,26 @@
+import numpy as np
+
+# 风险等级划分阈值：< 0.3 低风险，< 0.7 中等风险，其余为高风险
+RISK_THRESHOLDS = [0.3, 0.7]
+RISK_LEVELS = ['低风险', '中等风险', '高风险']
+
+
+def positive_scores(prediction) -> np.ndarray:
+    """从模型输出中取阳性概率
+
+    分类模型的 (n, 类别数) 概率矩阵取第二列，回归模型的 (n,) 预测值原样返回。
+    """
+    prediction = np.asarray(prediction, dtype=np.float64)
+    if prediction.ndim == 2 and prediction.shape[1] > 1:
+        return prediction[:, 1]
+    return prediction.reshape(len(prediction))
+
+
+def risk_level_codes(scores) -> np.ndarray:
+    """批量计算风险等级编号（0=低风险, 1=中等风险, 2=高风险）"""
+    return np.searchsorted(RISK_THRESHOLDS, scores, side='right')
+
+
+def risk_levels(scores) -> np.ndarray:
+    """批量计算风险等级名称"""
+    return np.array(RISK_LEVELS, dtype=object)[risk_level_codes(scores)]
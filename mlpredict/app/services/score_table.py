@@ -0,0 +1,112 @@
+import itertools
+import numpy as np
+from typing import Callable, Sequence, Optional, Any
+
+
+def domain_grid(domains: Sequence[Sequence[Optional[float]]]) -> np.ndarray:
+    """按混合进制编码顺序枚举整个输入域，缺失值为 NaN"""
+    return np.array(
+        [[np.nan if v is None else v for v in row] for row in itertools.product(*domains)],
+        dtype=np.float64
+    ).reshape(-1, len(domains))
+
+
+class ScoreTable:
+    """全输入域预测结果表
+
+    所有特征都只有少量离散取值，因此可以一次性枚举整个输入域并用模型打分，
+    结果按混合进制编码存放在 NumPy 数组中，预测时只需一次数组查找。
+    """
+
+    # 不超过该行数时走逐行编码，避免大量小数组运算的固定开销
+    SMALL_BATCH = 8
+
+    def __init__(self, domains: Sequence[Sequence[Optional[float]]], outputs: np.ndarray):
+        """
+        Args:
+            domains: 每个特征的取值列表，None 表示缺失
+            outputs: 按混合进制编码顺序排列的模型输出，第一维长度为各特征取值数之积
+        """
+        self.radices = np.array([len(d) for d in domains], dtype=np.int64)
+        # 混合进制的位权，第一个特征为最高位（与 itertools.product 的枚举顺序一致）
+        self.strides = np.ones(len(domains), dtype=np.int64)
+        for i in range(len(domains) - 2, -1, -1):
+            self.strides[i] = self.strides[i + 1] * self.radices[i + 1]
+
+        self._stride_list = self.strides.tolist()
+
+        if len(outputs) != int(np.prod(self.radices)):
+            raise ValueError(
+                f"Expected {int(np.prod(self.radices))} outputs for the domain, got {len(outputs)}"
+            )
+        self.outputs = outputs
+
+        # 每个特征的取值 -> domain 位置的稠密查找表(-1 表示不在输入域内)，缺失值单独记录位置
+        self._luts = []
+        self._missing_slot = []
+        # 小批量（如单行请求）逐元素查字典更快：{取值: 位置}，缺失值以 None 为键
+        self._slot_maps = [{v: i for i, v in enumerate(domain)} for domain in domains]
+        for domain in domains:
+            known = [v for v in domain if v is not None]
+            if any(v < 0 or v != int(v) for v in known):
+                raise ValueError(f"Domain values must be non-negative integers, got {domain}")
+            lut = np.full(int(max(known, default=-1)) + 1, -1, dtype=np.int64)
+            for i, v in enumerate(domain):
+                if v is not None:
+                    lut[int(v)] = i
+            self._luts.append(lut)
+            self._missing_slot.append(domain.index(None) if None in domain else -1)
+
+    @classmethod
+    def build(cls, domains: Sequence[Sequence[Optional[float]]],
+              predict_fn: Callable[[np.ndarray], Any]) -> 'ScoreTable':
+        """枚举整个输入域，用 predict_fn 一次性打分并构建结果表"""
+        return cls(domains, np.asarray(predict_fn(domain_grid(domains))))
+
+    def encode(self, X: np.ndarray) -> np.ndarray:
+        """将 (n, 特征数) 的数组编码为表索引，不在输入域内的行返回 -1"""
+        if len(X) <= self.SMALL_BATCH:
+            return np.array([self._encode_row(row) for row in X.tolist()], dtype=np.int64)
+
+        codes = np.zeros(len(X), dtype=np.int64)
+        valid = np.ones(len(X), dtype=bool)
+
+        # 按列连续存放，后续逐列运算更快
+        for j, column in enumerate(np.ascontiguousarray(X.T)):
+            lut = self._luts[j]
+            missing = np.isnan(column)
+
+            # 越界、非整数和缺失值先映射到0号位置，再通过 matched 标记为无效
+            index = np.where((column >= 0) & (column < len(lut)), column, 0).astype(np.int64)
+            slots = lut[index]
+            matched = (index == column) & (slots >= 0)
+
+            if self._missing_slot[j] >= 0:
+                slots[missing] = self._missing_slot[j]
+                matched |= missing
+
+            valid &= matched
+            codes += slots * self.strides[j]
+
+        codes[~valid] = -1
+        return codes
+
+    def _encode_row(self, row) -> int:
+        """逐元素编码单行"""
+        code = 0
+        for value, slot_map, stride in zip(row, self._slot_maps, self._stride_list):
+            slot = slot_map.get(None if value != value else value)
+            if slot is None:
+                return -1
+            code += slot * stride
+        return code
+
+    def lookup(self, X: np.ndarray):
+        """查表预测
+
+        Returns:
+            tuple: (结果数组, 有效行掩码)，无效行的结果未定义，需要回退到模型计算
+        """
+        codes = self.encode(X)
+        valid = codes >= 0
+        return self.outputs[np.where(valid, codes, 0)], valid
@@ -0,0 +1,160 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from mlpredict.app.services.model_service import ModelService
+from mlpredict.app.services.risk import RISK_LEVELS, positive_scores, risk_level_codes
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ShadowScorer:
+    """影子打分：用候选模型对线上流量打分并与生产模型对比
+
+    生产模型的结果由调用方照常返回，submit() 只把 (特征, 生产结果) 放入有界队列；
+    后台线程把队列中积累的请求合并成一批，用候选模型打分后增量更新一致性统计。
+    队列已满时丢弃并计数，不会拖慢线上请求；候选模型打分失败时计入 errors，不影响后续请求。
+    """
+
+    def __init__(self, candidate: ModelService, max_queue_size: int = 10000, max_batch_size: int = 1024):
+        self.candidate = candidate
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+
+        n_levels = len(RISK_LEVELS)
+        self._stats_lock = threading.Lock()
+        self._rows = 0
+        self._agree = 0
+        self._dropped = 0
+        self._errors = 0
+        self._abs_diff_sum = 0.0
+        self._abs_diff_max = 0.0
+        self._candidate_seconds = 0.0
+        # 风险等级混淆矩阵：行为生产模型等级，列为候选模型等级
+        self._confusion = np.zeros((n_levels, n_levels), dtype=np.int64)
+
+        self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+        self._thread.start()
+
+    def submit(self, features: Any, production: Any) -> bool:
+        """提交一批已由生产模型打分的请求，入队失败（队列已满或已关闭）时返回 False
+
+        Args:
+            features: 形状为 (n, 5) 的编码后特征，或单条特征向量
+            production: 生产模型对这些请求的输出（predict_batch 的结果，单条时为 predict 的结果）
+        """
+        features = np.asarray(features, dtype=np.float64)
+        production = np.asarray(production, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+            production = production.reshape(1, -1)
+        try:
+            self._queue.put_nowait((features, production))
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += len(features)
+            return False
+
+    def close(self, timeout: Optional[float] = None):
+        """处理完已入队的请求后停止后台线程"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            # 合并队列中已积累的请求，一次批量打分
+            items = [item]
+            rows = len(item[0])
+            stop = False
+            while rows < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                items.append(item)
+                rows += len(item[0])
+
+            self._score(items)
+            if stop:
+                return
+
+    def _score(self, items: Sequence[tuple]):
+        features = np.concatenate([f for f, _ in items])
+        production = positive_scores(np.concatenate([p for _, p in items]))
+
+        start = time.perf_counter()
+        # 候选模型出错只计入统计，不能让后台线程退出
+        try:
+            prediction = self.candidate.predict_batch(features)
+            if prediction is None:
+                raise RuntimeError(self.candidate.load_error or 'see log for details')
+            candidate = positive_scores(prediction)
+            if candidate.shape != production.shape:
+                raise ValueError(f"Expected {len(production)} scores, got shape {candidate.shape}")
+        except Exception as e:
+            with self._stats_lock:
+                self._errors += len(features)
+            logger.warning("Shadow model failed to score %d rows: %s", len(features), e)
+            return
+        elapsed = time.perf_counter() - start
+
+        abs_diff = np.abs(candidate - production)
+        production_levels = risk_level_codes(production)
+        candidate_levels = risk_level_codes(candidate)
+        n_levels = len(RISK_LEVELS)
+        confusion = np.bincount(
+            production_levels * n_levels + candidate_levels, minlength=n_levels * n_levels
+        ).reshape(n_levels, n_levels)
+
+        with self._stats_lock:
+            self._rows += len(features)
+            self._agree += int(np.count_nonzero(production_levels == candidate_levels))
+            self._abs_diff_sum += float(abs_diff.sum())
+            self._abs_diff_max = max(self._abs_diff_max, float(abs_diff.max()))
+            self._candidate_seconds += elapsed
+            self._confusion += confusion
+
+    def stats(self) -> dict:
+        """一致性统计：风险等级一致率、分数差异、按生产模型风险等级分桶的不一致率、混淆矩阵"""
+        with self._stats_lock:
+            rows = self._rows
+            confusion = self._confusion.copy()
+            result = {
+                'rows': rows,
+                'pending': self._queue.qsize(),
+                'dropped': self._dropped,
+                'errors': self._errors,
+                'agreement_rate': self._agree / rows if rows else None,
+                'mean_abs_score_diff': self._abs_diff_sum / rows if rows else None,
+                'max_abs_score_diff': self._abs_diff_max if rows else None,
+                'candidate_seconds': self._candidate_seconds
+            }
+
+        per_level = {}
+        for i, level in enumerate(RISK_LEVELS):
+            total = int(confusion[i].sum())
+            disagree = total - int(confusion[i, i])
+            per_level[level] = {
+                'rows': total,
+                'disagreements': disagree,
+                'disagreement_rate': disagree / total if total else None
+            }
+        result['by_production_level'] = per_level
+        result['confusion'] = {
+            level: dict(zip(RISK_LEVELS, confusion[i].tolist())) for i, level in enumerate(RISK_LEVELS)
+        }
+        return result
@@ -1,19 +1,30 @@
 import streamlit as st
+import logging
 import os
 import sys
+import time
 
 # 尝试导入必要的模块
 try:
     # 添加项目根目录到Python路径
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
     
+    from mlpredict.app.services.audit_log import audit_log_from_env
     from mlpredict.app.services.feature_processor import FeatureProcessor
+    from mlpredict.app.services.feature_schema import FEATURE_SCHEMA
+    from mlpredict.app.services.logging_config import configure_logging
+    from mlpredict.app.services.metrics import metrics
     from mlpredict.app.services.model_service import ModelService
+    from mlpredict.app.services.risk import RISK_LEVELS, positive_scores, risk_level_codes
+    configure_logging()
     modules_loaded = True
 except ImportError as e:
     modules_loaded = False
     error_message = str(e)
-    print(f"Error loading modules: {error_message}")
+
+logger = logging.getLogger('mlpredict.app.ui')
+if not modules_loaded:
+    logger.error("Error loading modules: %s", error_message)
 
 # 设置页面配置
 st.set_page_config(
@@ -23,138 +34,190 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# 自定义CSS
-st.markdown("""
-<style>
-    /* 引入字体 */
-    @import url('https://fonts.googleapis.com/css2?family=Noto+Sans+SC:wght@300;400;500;700&display=swap');
-    
-    * {
-        font-family: 'Noto+Sans+SC', sans-serif;
-    }
+UI_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(UI_DIR, '../../..'))
+# 模型目录，run.py --model-dir 通过该环境变量传入，默认使用项目自带的 models 目录
+MODELS_DIR = os.environ.get('MLPREDICT_MODEL_DIR') or os.path.join(PROJECT_ROOT, 'mlpredict', 'models')
+# 轮询模型文件变化的间隔（秒），run.py --reload-interval 通过该环境变量传入，0 表示不热更新
+RELOAD_INTERVAL = float(os.environ.get('MLPREDICT_RELOAD_INTERVAL') or 2.0)
 
-    /* 主容器样式 */
-    .main-container {
-        max-width: 1000px;
-        margin: 0 auto;
-        padding: 2rem 1rem;
-    }
-    
-    /* 标题样式 */
-    .title {
-        font-size: 3rem;
-        font-weight: 800;
-        background: linear-gradient(135deg, #1e3a8a 0%, #3b82f6 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        margin-bottom: 0.5rem;
-        letter-spacing: -1px;
-    }
+# Streamlit 1.37+ 为 st.fragment，更早的版本为 st.experimental_fragment；都没有时退化为整页重跑
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+
+@st.cache_resource
+def load_css() -> str:
+    """读取本地样式表，进程内只读取一次"""
+    with open(os.path.join(UI_DIR, 'style.css'), encoding='utf-8') as f:
+        return f"<style>\n{f.read()}</style>"
+
+
+@st.cache_resource
+def get_services(models_dir: str, reload_interval: float):
+    """特征处理器和模型服务在进程内只创建一次，所有会话共享；模型文件更新后由后台线程热更新"""
+    # 目录信息只在 DEBUG 级别输出
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("项目根目录: %s, 模型目录: %s", PROJECT_ROOT, models_dir)
+        if os.path.exists(models_dir):
+            logger.debug("模型目录中的文件: %s", os.listdir(models_dir))
+        else:
+            logger.debug("模型目录不存在: %s", models_dir)
     
-    /* 副标题样式 */
-    .subtitle {
-        font-size: 1.1rem;
-        color: #64748b;
-        text-align: center;
-        margin-bottom: 3rem;
-    }
+    # 同样的回答组合直接命中预测缓存
+    model_service = ModelService(model_dir=models_dir, prediction_cache_size=1024)
+    if reload_interval > 0:
+        model_service.start_watching(reload_interval)
+    return FeatureProcessor(), model_service
+
+
+@st.cache_resource
+def get_audit_log():
+    """设置了 MLPREDICT_AUDIT_DB 时创建审计日志，所有会话共享一个后台写入线程"""
+    return audit_log_from_env()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_model_info(_model_service, snapshot) -> dict:
+    """侧边栏展示的模型信息，按当前加载的模型版本缓存（热更新后立即刷新），最长一分钟"""
+    return _model_service.get_model_info()
+
+
+# 自定义CSS
+st.markdown(load_css(), unsafe_allow_html=True)
+
+# 各风险等级（与 RISK_LEVELS 顺序一致）的展示颜色和说明
+RISK_STYLES = [
+    ("#22c55e", "您的生活习惯良好，感染风险较低。请继续保持！"),
+    ("#eab308", "存在一定的感染风险。建议改善卫生习惯，并关注胃部状况。"),
+    ("#ef4444", "感染风险较高！建议及时去医院进行 C13/C14 呼气试验筛查。")
+]
+
+
+@fragment
+def prediction_panel(feature_processor, model_service):
+    """特征填写表单和预测结果"""
+    with st.form('feature_form'):
+        st.header("特征信息填写")
+        
+        # 表单布局：问题和选项按特征定义的顺序生成，前三题在左列
+        col1, col2 = st.columns(2)
+        answers = {}
+        for i, spec in enumerate(FEATURE_SCHEMA):
+            with col1 if i < 3 else col2:
+                answers[spec.key] = st.selectbox(
+                    spec.name,
+                    options=['请选择'] + spec.options,
+                    index=0
+                )
+        
+        # 预测按钮
+        submitted = st.form_submit_button("开始预测")
     
-    /* 卡片通用样式 */
-    .card {
-        background: rgba(255, 255, 255, 0.95);
-        border-radius: 24px;
-        border: 1px solid rgba(226, 232, 240, 0.8);
-        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.04), 0 4px 6px -2px rgba(0, 0, 0, 0.02);
-        padding: 2rem;
-        margin-bottom: 2rem;
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-    }
+    if not submitted:
+        return
     
-    .card:hover {
-        transform: translateY(-4px);
-        box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
-        border-color: #3b82f6;
-    }
+    # 验证输入
+    if any(answer == '请选择' for answer in answers.values()):
+        st.error("请填写所有特征信息")
+        return
     
-    /* 侧边栏样式定制 */
-    [data-testid="stSidebar"] {
-        background-color: #f8fafc;
-        border-right: 1px solid #e2e8f0;
-    }
+    # 显示加载动画
+    with st.spinner("正在分析..."):
+        started = time.perf_counter()
+        # 处理特征
+        processed_features = feature_processor.process_all_features(answers)
+        
+        # 进行预测，同时得到各特征对风险的贡献
+        explanation = model_service.explain(processed_features)
+        prediction, contributions = explanation if explanation is not None else (None, None)
+        
+        # 记录审计日志（只入队，由后台线程批量写入）
+        audit_log = get_audit_log()
+        if audit_log is not None and prediction is not None:
+            audit_log.record(answers, processed_features, positive_scores([prediction])[0],
+                             time.perf_counter() - started, model_sha256=model_service.model_fingerprint(),
+                             source='ui')
     
-    .sidebar-header {
-        font-size: 1.5rem;
-        font-weight: 700;
-        color: #1e293b;
-        margin-bottom: 1.5rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
+    # 展示结果
+    if prediction is not None:
+        with metrics.timer('ui_render'):
+            render_result(prediction, contributions)
+    else:
+        st.error("预测失败，请检查模型是否正确加载")
+        model_info = model_service.get_model_info()
+        if model_info.get('load_error'):
+            st.error(f"详细错误: {model_info['load_error']}")
 
-    /* 按钮美化 */
-    .stButton > button {
-        width: 100%;
-        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
-        color: white;
-        border: none;
-        border-radius: 16px;
-        padding: 0.8rem 2rem;
-        font-size: 1.1rem;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 6px -1px rgba(59, 130, 246, 0.4);
-    }
-    
-    .stButton > button:hover {
-        background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%);
-        transform: scale(1.02);
-        box-shadow: 0 10px 15px -3px rgba(59, 130, 246, 0.5);
-    }
 
-    /* 风险仪表盘 */
-    .risk-meter-container {
-        position: relative;
-        height: 24px;
-        background: #e2e8f0;
-        border-radius: 12px;
-        overflow: hidden;
-        margin: 2rem 0;
-    }
-    
-    .risk-meter-fill {
-        height: 100%;
-        transition: width 1.5s cubic-bezier(0.1, 0, 0.1, 1);
-        background: linear-gradient(90deg, #22c55e 0%, #eab308 50%, #ef4444 100%);
-    }
+def render_result(prediction, contributions):
+    """风险评估报告卡片"""
+    st.markdown('<div class="card animate-fade-in">', unsafe_allow_html=True)
+    st.markdown('<h2 style="text-align: center; color: #1e293b; margin-bottom: 1.5rem;">🎯 风险评估报告</h2>', unsafe_allow_html=True)
+
+    # 获取阳性概率
+    if isinstance(prediction, list) or (hasattr(prediction, '__len__') and len(prediction) > 1):
+        risk_score = float(prediction[1])
+    else:
+        risk_score = float(prediction)
 
-    .risk-label-container {
-        display: flex;
-        justify-content: space-between;
-        margin-top: 0.5rem;
-        color: #64748b;
-        font-size: 0.85rem;
-        font-weight: 500;
-    }
+    # 风险等级判定（阈值见 risk.RISK_THRESHOLDS）
+    level = int(risk_level_codes(risk_score))
+    risk_level = RISK_LEVELS[level]
+    risk_color, risk_desc = RISK_STYLES[level]
 
-    /* 动画效果 */
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(10px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    .animate-fade-in {
-        animation: fadeIn 0.6s ease-out forwards;
-    }
+    # 可视化仪表盘
+    st.markdown(f"""
+    <div style="text-align: center; margin-bottom: 0.5rem;">
+        <span style="font-size: 1.2rem; color: #64748b;">风险概率: </span>
+        <span style="font-size: 2.5rem; font-weight: 800; color: {risk_color};">{risk_score*100:.1f}%</span>
+    </div>
+    <div class="risk-meter-container">
+        <div class="risk-meter-fill" style="width: {risk_score*100}%; background: {risk_color};"></div>
+    </div>
+    <div class="risk-label-container">
+        {''.join(f'<span>{name}</span>' for name in RISK_LEVELS)}
+    </div>
+    """, unsafe_allow_html=True)
+
+    # 风险结论卡片
+    st.markdown(f"""
+    <div style="background: {risk_color}15; border-radius: 16px; padding: 1.5rem; border: 1px solid {risk_color}30; margin-top: 1rem;">
+        <h3 style="color: {risk_color}; margin-top: 0;">评估结果：{risk_level}</h3>
+        <p style="color: #334155; margin-bottom: 0;">{risk_desc}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # 按对风险的贡献排序的个性化建议
+    if contributions is not None:
+        raised = [i for i in sorted(range(len(contributions)), key=lambda i: -contributions[i])
+                  if contributions[i] > 0]
+        if raised:
+            st.markdown('<div class="prevention-tips">', unsafe_allow_html=True)
+            st.markdown('<h4>📊 提高您风险的主要因素</h4>', unsafe_allow_html=True)
+            for i in raised:
+                # 贡献按模型输入顺序排列，与 FEATURE_SCHEMA 一一对应
+                spec = FEATURE_SCHEMA[i]
+                st.write(f"- **{spec.label}**（风险贡献 +{contributions[i]:.2f}）：{spec.tip}")
+            st.markdown('</div>', unsafe_allow_html=True)
+
+    # 预防建议
+    st.markdown('<div class="prevention-tips">', unsafe_allow_html=True)
+    st.markdown('<h4>💡 专家预防建议</h4>', unsafe_allow_html=True)
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.write("✅ **个人卫生**")
+        st.write("- 饭前便后勤洗手")
+        st.write("- 建议使用公筷公勺")
+        st.write("- 定期更换牙刷")
+    with col_b:
+        st.write("🥗 **饮食习惯**")
+        st.write("- 减少生食摄入")
+        st.write("- 蔬菜水果洗净削皮")
+        st.write("- 避免共用餐具")
+    st.markdown('</div>', unsafe_allow_html=True)
 
-    /* 响应式调整 */
-    @media (max-width: 640px) {
-        .title { font-size: 2rem; }
-        .card { padding: 1.5rem; }
-    }
-</style>
-""", unsafe_allow_html=True)
+    st.markdown('<p class="info-text" style="text-align: center;">⚠️ 注: 本评估基于统计模型，结果仅供参考。如有不适请务必咨询专业医师。</p>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
 
 # 主页面
 def main():
@@ -178,28 +241,7 @@ def main():
         st.markdown('</div>', unsafe_allow_html=True)
         return
     
-    # 初始化服务
-    print("========================================")
-    print("        初始化服务")
-    print("========================================")
-    
-    # 获取绝对路径
-    current_dir = os.path.dirname(__file__)
-    project_root = os.path.abspath(os.path.join(current_dir, '../../..'))
-    models_dir = os.path.join(project_root, 'mlpredict', 'models')
-    
-    print(f"当前文件目录: {current_dir}")
-    print(f"项目根目录: {project_root}")
-    print(f"模型目录: {models_dir}")
-    print(f"模型目录是否存在: {os.path.exists(models_dir)}")
-    
-    if os.path.exists(models_dir):
-        print(f"模型目录中的文件: {os.listdir(models_dir)}")
-    else:
-        print("警告: 模型目录不存在！")
-    
-    feature_processor = FeatureProcessor()
-    model_service = ModelService(model_dir=models_dir)
+    feature_processor, model_service = get_services(MODELS_DIR, RELOAD_INTERVAL)
     
     # 侧边栏信息
     with st.sidebar:
@@ -210,7 +252,7 @@ def main():
             st.info("请如实填写右侧的特征信息，系统将为您提供实时的预测结果。")
         
         # 模型信息
-        model_info = model_service.get_model_info()
+        model_info = get_model_info(model_service, model_service.loaded_snapshot())
         with st.expander("🤖 模型信息", expanded=False):
             st.write(f"**加载状态:** {'✅ 已就绪' if model_info['model_loaded'] else '❌ 未加载'}")
             if model_info['model_file']:
@@ -231,151 +273,8 @@ def main():
             主要通过“口-口”或“粪-口”途径传播。
             """)
     
-    # 主内容区
-    with st.container():
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.header("特征信息填写")
-        
-        # 表单布局
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # 1. 如果使用马桶，是否习惯盖马桶盖
-            toilet_lid = st.selectbox(
-                "如果使用马桶，是否习惯盖马桶盖",
-                options=['请选择', '是', '否', '未填'],
-                index=0
-            )
-            
-            # 2. 家庭厕所类型
-            toilet_type = st.selectbox(
-                "家庭厕所类型",
-                options=['请选择', '传统旱厕', '冲洗坑厕', '抽水马桶'],
-                index=0
-            )
-            
-            # 3. 居住房屋所有权
-            house_ownership = st.selectbox(
-                "居住房屋所有权",
-                options=['请选择', '自己购买新房', '自己购买二手房', '自建房', '租房', '否'],
-                index=0
-            )
-        
-        with col2:
-            # 4. 零食的食用频率
-            snack_frequency = st.selectbox(
-                "零食的食用频率",
-                options=['请选择', '否', '1-2次/年', '1-2次/月', '1-2次/周', '3-5次/周', '＞5次/周', '未填'],
-                index=0
-            )
-            
-            # 5. 家中蔬菜的购买方式
-            vegetable_purchase = st.selectbox(
-                "家中蔬菜的购买方式",
-                options=['请选择', '自家种植', '超市', '菜市场', '街头小贩', '都有'],
-                index=0
-            )
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    # 预测按钮
-    with st.container():
-        if st.button("开始预测"):
-            # 验证输入
-            if any([toilet_lid == '请选择', toilet_type == '请选择', 
-                    house_ownership == '请选择', snack_frequency == '请选择', 
-                    vegetable_purchase == '请选择']):
-                st.error("请填写所有特征信息")
-            else:
-                # 显示加载动画
-                with st.spinner("正在分析..."):
-                    # 准备特征数据
-                    features = {
-                        'toilet_lid': toilet_lid if toilet_lid != '请选择' else '',
-                        'toilet_type': toilet_type if toilet_type != '请选择' else '',
-                        'house_ownership': house_ownership if house_ownership != '请选择' else '',
-                        'snack_frequency': snack_frequency if snack_frequency != '请选择' else '',
-                        'vegetable_purchase': vegetable_purchase if vegetable_purchase != '请选择' else ''
-                    }
-                    
-                    # 处理特征
-                    processed_features = feature_processor.process_all_features(features)
-                    
-                    # 进行预测
-                    prediction = model_service.predict(processed_features)
-                    
-                    # 展示结果
-                    if prediction is not None:
-                        st.markdown('<div class="card animate-fade-in">', unsafe_allow_html=True)
-                        st.markdown('<h2 style="text-align: center; color: #1e293b; margin-bottom: 1.5rem;">🎯 风险评估报告</h2>', unsafe_allow_html=True)
-                        
-                        # 获取阳性概率
-                        if isinstance(prediction, list) or (hasattr(prediction, '__len__') and len(prediction) > 1):
-                            risk_score = float(prediction[1])
-                        else:
-                            risk_score = float(prediction)
-                        
-                        # 风险等级判定
-                        if risk_score < 0.3:
-                            risk_level = "低风险"
-                            risk_color = "#22c55e"
-                            risk_desc = "您的生活习惯良好，感染风险较低。请继续保持！"
-                        elif risk_score < 0.7:
-                            risk_level = "中等风险"
-                            risk_color = "#eab308"
-                            risk_desc = "存在一定的感染风险。建议改善卫生习惯，并关注胃部状况。"
-                        else:
-                            risk_level = "高风险"
-                            risk_color = "#ef4444"
-                            risk_desc = "感染风险较高！建议及时去医院进行 C13/C14 呼气试验筛查。"
-
-                        # 可视化仪表盘
-                        st.markdown(f"""
-                        <div style="text-align: center; margin-bottom: 0.5rem;">
-                            <span style="font-size: 1.2rem; color: #64748b;">风险概率: </span>
-                            <span style="font-size: 2.5rem; font-weight: 800; color: {risk_color};">{risk_score*100:.1f}%</span>
-                        </div>
-                        <div class="risk-meter-container">
-                            <div class="risk-meter-fill" style="width: {risk_score*100}%; background: {risk_color};"></div>
-                        </div>
-                        <div class="risk-label-container">
-                            <span>低风险</span>
-                            <span>中等风险</span>
-                            <span>高风险</span>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # 风险结论卡片
-                        st.markdown(f"""
-                        <div style="background: {risk_color}15; border-radius: 16px; padding: 1.5rem; border: 1px solid {risk_color}30; margin-top: 1rem;">
-                            <h3 style="color: {risk_color}; margin-top: 0;">评估结果：{risk_level}</h3>
-                            <p style="color: #334155; margin-bottom: 0;">{risk_desc}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                        # 预防建议
-                        st.markdown('<div class="prevention-tips">', unsafe_allow_html=True)
-                        st.markdown('<h4>💡 专家预防建议</h4>', unsafe_allow_html=True)
-                        col_a, col_b = st.columns(2)
-                        with col_a:
-                            st.write("✅ **个人卫生**")
-                            st.write("- 饭前便后勤洗手")
-                            st.write("- 建议使用公筷公勺")
-                            st.write("- 定期更换牙刷")
-                        with col_b:
-                            st.write("🥗 **饮食习惯**")
-                            st.write("- 减少生食摄入")
-                            st.write("- 蔬菜水果洗净削皮")
-                            st.write("- 避免共用餐具")
-                        st.markdown('</div>', unsafe_allow_html=True)
-                        
-                        st.markdown('<p class="info-text" style="text-align: center;">⚠️ 注: 本评估基于统计模型，结果仅供参考。如有不适请务必咨询专业医师。</p>', unsafe_allow_html=True)
-                        st.markdown('</div>', unsafe_allow_html=True)
-                    else:
-                        st.error("预测失败，请检查模型是否正确加载")
-                        model_info = model_service.get_model_info()
-                        if model_info.get('load_error'):
-                            st.error(f"详细错误: {model_info['load_error']}")
+    # 主内容区：表单和结果在同一个片段中，修改选项不触发重跑，提交时只重跑该片段
+    prediction_panel(feature_processor, model_service)
     
     # 页脚
     st.markdown('<footer style="text-align: center; margin-top: 3rem; color: #7f8c8d;">', unsafe_allow_html=True)
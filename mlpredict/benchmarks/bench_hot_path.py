@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+热路径性能测试
+分别测量特征编码、模型加载、单条/批量预测和端到端单次请求的耗时，
+输出包含 p50/p95/p99 延迟、吞吐量和峰值内存的JSON结果，并可与历史结果对比发现性能回退
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(PROJECT_ROOT)
+
+from mlpredict.app.services.feature_processor import FeatureProcessor, FEATURE_DOMAINS
+from mlpredict.app.services.model_service import ModelService
+from mlpredict.app.services.risk import positive_scores, risk_levels
+from mlpredict.app.services.score_table import domain_grid
+
+MODELS_DIR = os.path.join(PROJECT_ROOT, 'mlpredict', 'models')
+
+# 基准测试使用的固定问卷回答
+SAMPLE_ANSWERS = {
+    'toilet_lid': '是',
+    'toilet_type': '冲洗坑厕+抽水马桶',
+    'house_ownership': '自建房',
+    'snack_frequency': '1-2次/周',
+    'vegetable_purchase': '超市+菜市场'
+}
+
+
+def _percentile_ms(samples: np.ndarray, q: float) -> float:
+    return float(np.percentile(samples, q) * 1000.0)
+
+
+def run_benchmark(name: str, func, rows_per_call: int = 1, min_iterations: int = 5,
+                  min_time: float = 0.5, max_iterations: int = 100000, warmup: int = 2) -> dict:
+    """反复调用 func 并统计延迟分布、吞吐量和峰值内存
+
+    先计时（不开启 tracemalloc，避免影响计时），再单独调用一次测量峰值内存。
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_iterations:
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= min_iterations and time.perf_counter() - started >= min_time:
+            break
+    samples = np.array(samples)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = float(samples.mean())
+    return {
+        'name': name,
+        'rows_per_call': rows_per_call,
+        'iterations': int(len(samples)),
+        'mean_ms': mean * 1000.0,
+        'p50_ms': _percentile_ms(samples, 50),
+        'p95_ms': _percentile_ms(samples, 95),
+        'p99_ms': _percentile_ms(samples, 99),
+        'throughput_rows_per_s': rows_per_call / mean if mean > 0 else float('inf'),
+        'peak_memory_bytes': int(peak)
+    }
+
+
+def _environment() -> dict:
+    versions = {'python': platform.python_version(), 'numpy': np.__version__}
+    for name in ('pandas', 'sklearn', 'joblib'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            pass
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': commit,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions
+    }
+
+
+def run_suite(model_dir: str, batch_sizes: list) -> list:
+    """运行全部基准测试"""
+    processor = FeatureProcessor()
+    table_service = ModelService(model_dir=model_dir)
+    model_service = ModelService(model_dir=model_dir, use_score_table=False)
+
+    features = processor.process_all_features(SAMPLE_ANSWERS)
+    results = []
+
+    # 特征编码
+    results.append(run_benchmark(
+        'feature_processor.process_all_features',
+        lambda: processor.process_all_features(SAMPLE_ANSWERS)
+    ))
+
+    # 模型加载：进程级缓存命中 / 清空缓存后重新加载
+    results.append(run_benchmark(
+        'model_service.load_model[cached]', table_service.load_model
+    ))
+
+    def cold_load():
+        ModelService.clear_cache()
+        table_service.load_model()
+    results.append(run_benchmark(
+        'model_service.load_model[cold]', cold_load, min_iterations=3, max_iterations=20
+    ))
+
+    # 单条预测
+    for label, service in (('score_table', table_service), ('model', model_service)):
+        results.append(run_benchmark(
+            f'model_service.predict[{label}]', lambda s=service: s.predict(features)
+        ))
+
+    # 批量预测：在整个输入域上循环取样，覆盖全部取值组合
+    grid = domain_grid(FEATURE_DOMAINS)
+    for size in batch_sizes:
+        X = grid[np.arange(size) % len(grid)]
+        for label, service in (('score_table', table_service), ('model', model_service)):
+            results.append(run_benchmark(
+                f'model_service.predict_batch[{label},n={size}]',
+                lambda s=service, X=X: s.predict_batch(X),
+                rows_per_call=size, min_iterations=3 if size >= 100000 else 5
+            ))
+
+    # 端到端单次请求：编码 -> 预测 -> 风险等级
+    def request():
+        prediction = table_service.predict(processor.process_all_features(SAMPLE_ANSWERS))
+        scores = positive_scores([prediction])
+        return risk_levels(scores)[0]
+    results.append(run_benchmark('end_to_end.request', request))
+
+    return results
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """与历史结果对比，返回 p50 延迟变慢超过 tolerance 的项"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r['name']: r for r in json.load(f)['results']}
+
+    regressions = []
+    for r in results:
+        old = baseline.get(r['name'])
+        if old and old['p50_ms'] > 0 and r['p50_ms'] > old['p50_ms'] * (1 + tolerance):
+            regressions.append({
+                'name': r['name'],
+                'baseline_p50_ms': old['p50_ms'],
+                'p50_ms': r['p50_ms'],
+                'ratio': r['p50_ms'] / old['p50_ms']
+            })
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="热路径性能测试")
+    parser.add_argument('--model-dir', default=MODELS_DIR, help="模型目录")
+    parser.add_argument('--quick', action='store_true', help="快速模式，不测 1M 行批量预测")
+    parser.add_argument('-o', '--output', default=None, help="结果JSON输出路径（默认输出到标准输出）")
+    parser.add_argument('--compare', default=None, help="对比的历史结果JSON路径")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="p50 延迟允许变慢的比例，超过则返回非零退出码（默认: 0.2）")
+    args = parser.parse_args()
+
+    batch_sizes = [1, 100, 10000] if args.quick else [1, 100, 10000, 1000000]
+    report = {
+        'environment': _environment(),
+        'results': run_suite(args.model_dir, batch_sizes)
+    }
+
+    exit_code = 0
+    if args.compare:
+        report['regressions'] = compare(report['results'], args.compare, args.tolerance)
+        if report['regressions']:
+            exit_code = 1
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    for r in report.get('regressions', []):
+        print(f"性能回退: {r['name']} p50 {r['baseline_p50_ms']:.3f}ms -> {r['p50_ms']:.3f}ms", file=sys.stderr)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
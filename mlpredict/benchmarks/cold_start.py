@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+冷启动性能测试
+在全新的Python子进程中测量导入耗时（python -X importtime）和首次预测耗时，结果以JSON输出
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# 项目根目录（mlpredict 的上级目录）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+MODELS_DIR = os.path.join(PROJECT_ROOT, 'mlpredict', 'models')
+
+# 关注其导入耗时的重量级依赖
+HEAVY_MODULES = ('numpy', 'pandas', 'joblib', 'sklearn', 'scipy')
+
+# 在子进程中为临时目录中的模型导出轻量打分文件
+EXPORT_SCRIPT = '''
+import sys
+from mlpredict.app.services.model_service import ModelService
+ModelService(model_dir=sys.argv[1], use_score_table=False, use_linear_artifact=False).export_linear_artifact()
+'''
+
+# 子进程中执行的首次预测脚本，输出各阶段耗时（秒）
+FIRST_PREDICTION_SCRIPT = '''
+import json, os, sys, time
+start = time.perf_counter()
+from mlpredict.app.services.feature_processor import FeatureProcessor
+from mlpredict.app.services.model_service import ModelService
+imported = time.perf_counter()
+service = ModelService(model_dir=sys.argv[1], use_score_table=sys.argv[2] == '1')
+loaded = time.perf_counter()
+features = FeatureProcessor().process_all_features({
+    'toilet_lid': '是', 'toilet_type': '抽水马桶', 'house_ownership': '自己购买新房',
+    'snack_frequency': '1-2次/周', 'vegetable_purchase': '超市'
+})
+prediction = service.predict(features)
+predicted = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'load_model_s': loaded - imported,
+    'first_predict_s': predicted - loaded,
+    'ok': prediction is not None,
+    'modules': {name: name in sys.modules for name in ('pandas', 'sklearn', 'joblib', 'numpy')}
+}))
+'''
+
+
+def measure_import_time(module: str) -> dict:
+    """用 -X importtime 测量导入某个模块的累计耗时"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    total_us = 0
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        cumulative[name.strip()] = int(fields[1])
+        # 顶层导入（只有一个前导空格）的累计耗时之和即为总耗时
+        if name.startswith(' ') and not name.startswith('  '):
+            total_us += int(fields[1])
+    return {
+        'module': module,
+        'total_ms': total_us / 1000.0,
+        'heavy_imports_ms': {name: cumulative[name] / 1000.0 for name in HEAVY_MODULES if name in cumulative}
+    }
+
+
+def measure_first_prediction(model_dir: str, use_score_table: bool) -> dict:
+    """在新进程中测量从解释器启动到首次预测完成的耗时"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', FIRST_PREDICTION_SCRIPT, model_dir, '1' if use_score_table else '0'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+    stages = json.loads(result.stdout.strip().splitlines()[-1])
+    stages['process_wall_s'] = wall
+    return stages
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="冷启动性能测试")
+    parser.add_argument('--model-dir', default=MODELS_DIR, help="模型目录")
+    parser.add_argument('--repeat', type=int, default=3, help="重复次数，取最小值（默认: 3）")
+    parser.add_argument('-o', '--output', default=None, help="结果JSON输出路径（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    # 导出轻量打分文件的临时模型目录，用于测量不加载 scikit-learn 的冷启动
+    artifact_dir = tempfile.mkdtemp()
+    for name in os.listdir(args.model_dir):
+        if name.endswith('.joblib'):
+            shutil.copy(os.path.join(args.model_dir, name), artifact_dir)
+    subprocess.run([sys.executable, '-c', EXPORT_SCRIPT, artifact_dir],
+                   cwd=PROJECT_ROOT, capture_output=True, check=True)
+    scenarios = (
+        ('score_table', args.model_dir, True),
+        ('no_score_table', args.model_dir, False),
+        ('linear_artifact', artifact_dir, True)
+    )
+
+    results = {
+        'python': sys.version.split()[0],
+        'import_time': [
+            min((measure_import_time(m) for _ in range(args.repeat)), key=lambda r: r['total_ms'])
+            for m in (
+                'mlpredict.app.services.feature_processor',
+                'mlpredict.app.services.model_service',
+            )
+        ],
+        'first_prediction': {
+            name: min(
+                (measure_first_prediction(model_dir, table) for _ in range(args.repeat)),
+                key=lambda r: r['process_wall_s']
+            )
+            for name, model_dir, table in scenarios
+        }
+    }
+    shutil.rmtree(artifact_dir, ignore_errors=True)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,40 @@
 #!/usr/bin/env python3
 """
 启动脚本
-用于启动Streamlit健康风险预测应用
+用于启动Streamlit健康风险预测应用，或对问卷导出文件进行离线批量打分
+
+用法:
+    python run.py                                 启动Streamlit应用
+    python run.py --api                           同时启动Streamlit应用和HTTP推理服务
+    python run.py --api-only                      只启动HTTP推理服务
+    python run.py score input.csv -o output.csv   批量打分（也支持 .parquet / .arrow / .xlsx）
+    python run.py export-linear                   导出纯NumPy打分器使用的模型文件
+    python run.py export-mmap                     导出可内存映射、多进程共享的模型文件
+    python run.py drift-profile input.csv -o reference.json   生成漂移监控的参考分布
+    python run.py aggregate input.csv --by region -o report.csv   按分组汇总人群风险分布
 """
 
 import os
 import sys
+import argparse
+import importlib.util
 import subprocess
 import time
 
-def check_dependencies():
-    """检查依赖是否安装"""
-    try:
-        import streamlit
-        import pandas
-        import numpy
-        print("依赖检查通过")
-        return True
-    except ImportError as e:
-        print(f"依赖缺失: {e}")
+def check_dependencies(modules=('streamlit', 'pandas', 'numpy')):
+    """检查依赖是否安装（只查找模块，不导入）"""
+    missing = [name for name in modules if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"依赖缺失: {', '.join(missing)}")
         print("请运行: pip install -r requirements.txt")
         return False
+    
+    print("依赖检查通过")
+    return True
 
-def check_model_file():
-    """检查模型文件是否存在"""
-    model_dir = os.path.join(os.path.dirname(__file__), 'models')
+def check_model_file(model_dir=None):
+    """检查模型目录中是否存在模型文件，默认检查项目自带的 models 目录"""
+    model_dir = model_dir or os.path.join(os.path.dirname(__file__), 'models')
     
     if not os.path.exists(model_dir):
         print(f"模型目录不存在: {model_dir}")
@@ -34,7 +44,7 @@ def check_model_file():
     model_files = [f for f in os.listdir(model_dir) if f.endswith(('.pkl', '.pickle', '.joblib', '.model'))]
     
     if not model_files:
-        print(f"models目录中未找到模型文件")
+        print(f"模型目录中未找到模型文件: {model_dir}")
         print("请放入模型文件，支持的格式: .pkl, .pickle, .joblib, .model")
         return False
     
@@ -73,8 +83,331 @@ def start_streamlit():
         print("应用已停止")
         return True
 
-def main():
+def start_api_server(args):
+    """在当前进程中启动HTTP推理服务（阻塞）"""
+    # 添加项目根目录到Python路径
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from mlpredict.app.api.server import run_server
+    from mlpredict.app.services.logging_config import configure_logging
+    
+    configure_logging()
+    
+    run_server(model_dir=args.model_dir, host=args.api_host, port=args.api_port,
+               micro_batch_size=args.micro_batch_size, micro_batch_wait_ms=args.micro_batch_wait_ms,
+               enable_metrics=not args.no_metrics, reload_interval=args.reload_interval or 0,
+               shadow_model=args.shadow_model, drift_reference=args.drift_reference,
+               audit_db=args.audit_db, audit_flush_interval=args.audit_flush_interval)
+    return True
+
+def spawn_api_server(args):
+    """在子进程中启动HTTP推理服务，与Streamlit并行运行"""
+    command = [
+        sys.executable, os.path.abspath(__file__), '--api-only',
+        '--api-host', args.api_host,
+        '--api-port', str(args.api_port),
+        '--micro-batch-size', str(args.micro_batch_size),
+        '--micro-batch-wait-ms', str(args.micro_batch_wait_ms),
+        '--reload-interval', str(args.reload_interval or 0),
+        '--audit-flush-interval', str(args.audit_flush_interval),
+    ] + (['--no-metrics'] if args.no_metrics else []) + (
+        ['--shadow-model', args.shadow_model] if args.shadow_model else []
+    ) + (
+        ['--drift-reference', args.drift_reference] if args.drift_reference else []
+    ) + (
+        ['--audit-db', args.audit_db] if args.audit_db else []
+    ) + [
+        '--model-dir', args.model_dir
+    ]
+    print(f"启动API服务: {' '.join(command)}")
+    return subprocess.Popen(command)
+
+def print_progress(rows, elapsed):
+    """批量打分和汇总的进度输出（输出到 stderr，不混入结果）"""
+    print(f"已处理 {rows} 行, {rows / elapsed if elapsed > 0 else 0:,.0f} 行/秒", file=sys.stderr)
+
+def run_score(args):
+    """批量打分问卷导出文件"""
+    # 添加项目根目录到Python路径
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from mlpredict.app.services.batch_scorer import BatchScorer
+    from mlpredict.app.services.logging_config import configure_logging
+    from mlpredict.app.services.parallel_scorer import ParallelScorer
+    
+    configure_logging()
+    
+    if not os.path.exists(args.input):
+        print(f"输入文件不存在: {args.input}")
+        return 1
+    
+    if not check_model_file(args.model_dir):
+        return 1
+    
+    if args.workers == 1:
+        scorer = BatchScorer(model_dir=args.model_dir, chunk_size=args.chunk_size)
+    else:
+        scorer = ParallelScorer(model_dir=args.model_dir, chunk_size=args.chunk_size,
+                                workers=args.workers or None, start_method=args.start_method)
+        print(f"使用 {scorer.workers} 个工作进程")
+    # 多进程时模型只在工作进程中加载，加载失败在打分时以 RuntimeError 报告
+    if scorer.model_service is not None and not scorer.model_service.model_loaded:
+        print(f"模型加载失败: {scorer.model_service.load_error}")
+        return 1
+    
+    try:
+        stats = scorer.score_file(args.input, args.output, sep=args.sep, encoding=args.encoding,
+                                  progress=print_progress)
+    except RuntimeError as e:
+        print(f"打分失败: {e}")
+        return 1
+    print(f"打分完成: {stats['rows']} 行, 耗时 {stats['seconds']:.2f} 秒, {stats['rows_per_sec']:,.0f} 行/秒")
+    print(f"结果已写入: {args.output}")
+    return 0
+
+def run_export_linear(args):
+    """导出逻辑回归模型的轻量打分文件"""
+    # 添加项目根目录到Python路径
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from mlpredict.app.services.logging_config import configure_logging
+    from mlpredict.app.services.model_service import ModelService
+    
+    configure_logging()
+    if not check_model_file(args.model_dir):
+        return 1
+    
+    model_service = ModelService(model_dir=args.model_dir, use_score_table=False, use_linear_artifact=False)
+    if not model_service.model_loaded:
+        print(f"模型加载失败: {model_service.load_error}")
+        return 1
+    
+    try:
+        output_path = model_service.export_linear_artifact(args.output)
+    except ValueError as e:
+        print(f"导出失败: {e}")
+        return 1
+    
+    print(f"导出完成: {output_path}")
+    return 0
+
+def run_export_mmap(args):
+    """导出可内存映射的模型文件"""
+    # 添加项目根目录到Python路径
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from mlpredict.app.services.logging_config import configure_logging
+    from mlpredict.app.services.model_service import ModelService
+    
+    configure_logging()
+    if not check_model_file(args.model_dir):
+        return 1
+    
+    model_service = ModelService(model_dir=args.model_dir, use_score_table=False,
+                                 use_linear_artifact=False, use_mmap_artifact=False)
+    if not model_service.model_loaded:
+        print(f"模型加载失败: {model_service.load_error}")
+        return 1
+    
+    output_path = model_service.export_mmap_artifact(args.output)
+    print(f"导出完成: {output_path}")
+    return 0
+
+def run_drift_profile(args):
+    """对问卷导出文件打分，保存输入与打分的分布作为漂移监控的参考分布"""
+    # 添加项目根目录到Python路径
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from mlpredict.app.services.batch_scorer import BatchScorer
+    from mlpredict.app.services.drift_monitor import DriftMonitor
+    from mlpredict.app.services.logging_config import configure_logging
+    
+    configure_logging()
+    
+    if not os.path.exists(args.input):
+        print(f"输入文件不存在: {args.input}")
+        return 1
+    
+    if not check_model_file(args.model_dir):
+        return 1
+    
+    scorer = BatchScorer(model_dir=args.model_dir, chunk_size=args.chunk_size)
+    if not scorer.model_service.model_loaded:
+        print(f"模型加载失败: {scorer.model_service.load_error}")
+        return 1
+    
+    monitor = DriftMonitor()
+    scorer.model_service.drift_monitor = monitor
+    for chunk in scorer.iter_chunks(args.input, sep=args.sep, encoding=args.encoding):
+        scorer.compute_scores(chunk)
+    monitor.save(args.output)
+    
+    report = monitor.report()
+    print(f"参考分布: {report['rows']} 行, 风险等级分布 {report['risk_levels']['counts']}")
+    print(f"已写入: {args.output}")
+    return 0
+
+def run_aggregate(args):
+    """流式打分问卷导出文件，按分组汇总风险分布"""
+    # 添加项目根目录到Python路径
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from mlpredict.app.services.batch_scorer import BatchScorer
+    from mlpredict.app.services.cohort_aggregator import CohortAggregator, parse_bands
+    from mlpredict.app.services.logging_config import configure_logging
+    from mlpredict.app.services.parallel_scorer import ParallelScorer
+    
+    configure_logging()
+    
+    if not os.path.exists(args.input):
+        print(f"输入文件不存在: {args.input}")
+        return 1
+    
+    try:
+        bands = parse_bands(args.band)
+        # 加载模型前检查分组与分段参数
+        CohortAggregator(args.by, bands=bands, score_bins=args.bins)
+    except ValueError as e:
+        print(f"分组参数错误: {e}")
+        return 1
+    
+    if not check_model_file(args.model_dir):
+        return 1
+    
+    if args.workers == 1:
+        scorer = BatchScorer(model_dir=args.model_dir, chunk_size=args.chunk_size)
+    else:
+        scorer = ParallelScorer(model_dir=args.model_dir, chunk_size=args.chunk_size,
+                                workers=args.workers or None, start_method=args.start_method)
+        print(f"使用 {scorer.workers} 个工作进程")
+    # 多进程时模型只在工作进程中加载，加载失败在打分时以 RuntimeError 报告
+    if scorer.model_service is not None and not scorer.model_service.model_loaded:
+        print(f"模型加载失败: {scorer.model_service.load_error}")
+        return 1
+    
+    try:
+        stats = scorer.aggregate_file(args.input, args.by, output_path=args.output, bands=bands,
+                                      score_bins=args.bins, sep=args.sep, encoding=args.encoding,
+                                      progress=print_progress)
+    except KeyError as e:
+        print(f"输入文件缺少分组列: {e}")
+        return 1
+    except RuntimeError as e:
+        print(f"汇总失败: {e}")
+        return 1
+    print(f"汇总完成: {stats['rows']} 行, {stats['groups']} 个分组, 耗时 {stats['seconds']:.2f} 秒, "
+          f"{stats['rows_per_sec']:,.0f} 行/秒")
+    if args.output:
+        print(f"结果已写入: {args.output}")
+    else:
+        print(stats['report'][args.by + ['count', 'mean_risk', 'std_risk']].to_string(index=False))
+    return 0
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="幽门螺旋杆菌风险预测系统")
+    parser.add_argument('--api', action='store_true', help="同时启动HTTP推理服务")
+    parser.add_argument('--api-only', action='store_true', help="只启动HTTP推理服务，不启动Streamlit")
+    parser.add_argument('--api-host', default='0.0.0.0', help="HTTP推理服务监听地址（默认: 0.0.0.0）")
+    parser.add_argument('--api-port', type=int, default=8000, help="HTTP推理服务端口（默认: 8000）")
+    parser.add_argument('--micro-batch-size', type=int, default=0,
+                        help="HTTP推理服务合批的最大批大小，0 表示不合批（默认: 0）")
+    parser.add_argument('--micro-batch-wait-ms', type=float, default=2.0,
+                        help="HTTP推理服务合批的最长等待时间，毫秒（默认: 2.0）")
+    parser.add_argument('--no-metrics', action='store_true', help="HTTP推理服务不收集性能指标")
+    parser.add_argument('--reload-interval', type=float, default=None,
+                        help="轮询模型文件变化的间隔秒数，模型更新后自动热更新，0 表示不启用"
+                             "（默认: Streamlit应用 2 秒，HTTP推理服务不启用）")
+    parser.add_argument('--shadow-model', default=None,
+                        help="HTTP推理服务的影子打分候选模型（模型清单中的 名称 或 名称@版本）")
+    parser.add_argument('--drift-reference', default=None,
+                        help="HTTP推理服务漂移监控的参考分布文件（由 drift-profile 生成），/drift 接口据此计算 PSI")
+    parser.add_argument('--audit-db', default=None,
+                        help="预测审计日志的SQLite数据库路径，Streamlit应用和HTTP推理服务的每次预测都会记录（默认不记录）")
+    parser.add_argument('--audit-flush-interval', type=float, default=1.0,
+                        help="审计日志攒批写入的最长间隔秒数（默认: 1.0）")
+    parser.add_argument('--log-level', default=None, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="日志级别（默认: INFO，也可通过 MLPREDICT_LOG_LEVEL 设置）")
+    parser.add_argument('--model-dir', default=os.path.join(os.path.dirname(__file__), 'models'),
+                        help="模型目录")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    score_parser = subparsers.add_parser('score', help="对问卷导出文件进行批量打分")
+    score_parser.add_argument('input', help="输入文件路径（CSV/TSV/Parquet/Arrow/xlsx）")
+    score_parser.add_argument('-o', '--output', required=True,
+                              help="输出文件路径（CSV/TSV/Parquet/Arrow，按扩展名判断），追加 risk_score 和 risk_level 列")
+    score_parser.add_argument('--chunk-size', type=int, default=50000, help="每次读取的行数（默认: 50000）")
+    score_parser.add_argument('--sep', default=None, help="输入文件分隔符（默认按扩展名判断）")
+    score_parser.add_argument('--encoding', default='utf-8', help="文件编码（默认: utf-8）")
+    score_parser.add_argument('--workers', type=int, default=1,
+                              help="工作进程数，0 表示使用全部CPU核（默认: 1，不启用多进程）")
+    score_parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'], default=None,
+                              help="多进程启动方式（默认使用平台默认值）")
+    score_parser.add_argument('--model-dir', default=argparse.SUPPRESS, help="模型目录")
+    
+    export_parser = subparsers.add_parser('export-linear', help="导出纯NumPy打分器使用的逻辑回归模型文件")
+    export_parser.add_argument('-o', '--output', default=None,
+                               help="输出路径（默认与模型文件同名，扩展名为 .linear.json）")
+    export_parser.add_argument('--model-dir', default=argparse.SUPPRESS, help="模型目录")
+    
+    mmap_parser = subparsers.add_parser('export-mmap', help="导出可内存映射、多进程共享的模型文件")
+    mmap_parser.add_argument('-o', '--output', default=None,
+                             help="输出路径（默认与模型文件同名，扩展名为 .mmap）")
+    mmap_parser.add_argument('--model-dir', default=argparse.SUPPRESS, help="模型目录")
+    
+    drift_parser = subparsers.add_parser('drift-profile', help="生成漂移监控的参考分布（输入与打分的分布统计）")
+    drift_parser.add_argument('input', help="输入文件路径（CSV/TSV/Parquet/Arrow/xlsx），如训练数据或上线初期的问卷")
+    drift_parser.add_argument('-o', '--output', required=True, help="参考分布输出路径（JSON）")
+    drift_parser.add_argument('--chunk-size', type=int, default=50000, help="每次读取的行数（默认: 50000）")
+    drift_parser.add_argument('--sep', default=None, help="输入文件分隔符（默认按扩展名判断）")
+    drift_parser.add_argument('--encoding', default='utf-8', help="文件编码（默认: utf-8）")
+    drift_parser.add_argument('--model-dir', default=argparse.SUPPRESS, help="模型目录")
+    
+    aggregate_parser = subparsers.add_parser('aggregate', help="流式打分问卷导出文件，按地区、年龄段等分组汇总风险分布")
+    aggregate_parser.add_argument('input', help="输入文件路径（CSV/TSV/Parquet/Arrow/xlsx）")
+    aggregate_parser.add_argument('--by', nargs='+', required=True, help="分组列名（输入文件中的任意列，可指定多个）")
+    aggregate_parser.add_argument('-o', '--output', default=None,
+                                  help="汇总表输出路径（CSV/TSV/Parquet，按扩展名判断），不指定时打印到终端")
+    aggregate_parser.add_argument('--band', action='append', default=[], metavar='COLUMN=EDGES',
+                                  help="将数值列按边界分段后分组（左闭右开），如 age=0,18,40,60,inf，可重复指定")
+    aggregate_parser.add_argument('--bins', type=int, default=10, help="风险分数直方图的分箱数（默认: 10）")
+    aggregate_parser.add_argument('--chunk-size', type=int, default=50000, help="每次读取的行数（默认: 50000）")
+    aggregate_parser.add_argument('--sep', default=None, help="输入文件分隔符（默认按扩展名判断）")
+    aggregate_parser.add_argument('--encoding', default='utf-8', help="文件编码（默认: utf-8）")
+    aggregate_parser.add_argument('--workers', type=int, default=1,
+                                  help="工作进程数，0 表示使用全部CPU核（默认: 1，不启用多进程）")
+    aggregate_parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'], default=None,
+                                  help="多进程启动方式（默认使用平台默认值）")
+    aggregate_parser.add_argument('--model-dir', default=argparse.SUPPRESS, help="模型目录")
+    
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """主函数"""
+    args = parse_args(argv)
+    if args.log_level:
+        # 通过环境变量传给 Streamlit 和 API 子进程
+        os.environ['MLPREDICT_LOG_LEVEL'] = args.log_level
+    if args.audit_db:
+        # 通过环境变量传给 Streamlit 子进程
+        os.environ['MLPREDICT_AUDIT_DB'] = os.path.abspath(args.audit_db)
+    if args.reload_interval is not None:
+        # 通过环境变量传给 Streamlit 子进程
+        os.environ['MLPREDICT_RELOAD_INTERVAL'] = str(args.reload_interval)
+    # 通过环境变量传给 Streamlit 子进程
+    os.environ['MLPREDICT_MODEL_DIR'] = os.path.abspath(args.model_dir)
+    
+    if args.command == 'score':
+        return run_score(args)
+    if args.command == 'export-linear':
+        return run_export_linear(args)
+    if args.command == 'export-mmap':
+        return run_export_mmap(args)
+    if args.command == 'drift-profile':
+        return run_drift_profile(args)
+    if args.command == 'aggregate':
+        return run_aggregate(args)
+    
+    # 只启动HTTP推理服务，不需要Streamlit
+    if args.api_only:
+        if not check_model_file(args.model_dir):
+            return 1
+        return 0 if start_api_server(args) else 1
+    
     print("========================================")
     print("        健康风险预测系统启动")
     print("========================================")
@@ -84,12 +417,18 @@ def main():
         return 1
     
     # 检查模型文件
-    if not check_model_file():
+    if not check_model_file(args.model_dir):
         return 1
     
     # 启动应用
-    if not start_streamlit():
-        return 1
+    api_process = spawn_api_server(args) if args.api else None
+    try:
+        if not start_streamlit():
+            return 1
+    finally:
+        if api_process is not None:
+            api_process.terminate()
+            api_process.wait()
     
     return 0
 
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+测试预测审计日志：后台批量写入、错误记录隔离、入队时复制数组、关闭
+"""
+
+import atexit
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.audit_log import AuditLog
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS
+
+
+def random_features(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.array([[rng.choice(np.array([np.nan if v is None else v for v in domain]))
+                      for domain in FEATURE_DOMAINS] for _ in range(n)])
+
+
+def count_rows(path: str) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+
+
+def test_audit_log_writes_batches(tmp_path):
+    path = str(tmp_path / 'audit.db')
+    log = AuditLog(path, flush_interval=0.05)
+    try:
+        X = random_features(20)
+        assert log.record({'toilet_lid': '是'}, list(X[0]), 0.2, 0.001, source='test')
+        assert log.record_batch(None, X, np.linspace(0, 1, len(X)), 0.01, source='test')
+        assert log.flush(timeout=10)
+        assert count_rows(path) == 21
+        assert log.stats()['written'] == 21
+    finally:
+        log.close()
+
+
+def test_audit_log_survives_malformed_records(tmp_path):
+    """无法写入的记录计为失败，后台线程继续写入之后的记录"""
+    path = str(tmp_path / 'audit.db')
+    log = AuditLog(path, flush_interval=0.05)
+    try:
+        with pytest.raises(ValueError):
+            log.record_batch([{'toilet_lid': '是'}], [[1, 2, 4, 3, 1], [1, 2, 4, 3, 1]], [0.1, 0.9], 0.01)
+
+        log.record({'toilet_lid': '是'}, [1, 2, 4, 3, 1], 0.5, 0.001)
+        # 绕过 record_batch 的校验直接入队一条行数不一致的记录
+        log._put((time.time(), None, None, 0.0, [{}], [[1, 2, 4, 3, 1]] * 2, [0.1, 0.9]), 2)
+        log.record({'toilet_lid': '否'}, [0, 2, 4, 3, 1], 0.6, 0.001)
+        assert log.flush(timeout=10)
+
+        log.record(None, [1, 2, 4, 3, 1], 0.7, 0.001)
+        assert log.flush(timeout=10)
+        stats = log.stats()
+        assert (stats['written'], stats['failed']) == (3, 2)
+        assert count_rows(path) == 3
+    finally:
+        log.close()
+
+
+def test_audit_log_copies_batch_arrays(tmp_path):
+    """入队后调用方修改特征和分数数组，写入的仍是记录时的值"""
+    path = str(tmp_path / 'audit.db')
+    # 后台线程在第一条记录入队后攒批 flush_interval 秒才写入，修改发生在写入之前
+    log = AuditLog(path, flush_interval=0.5)
+    try:
+        features = np.array([[1, 2, 4, 3, 1], [0, 1, 1, 1, 2]], dtype=np.float64)
+        scores = np.array([0.25, 0.75])
+        assert log.record_batch(None, features, scores, 0.01)
+        features[:] = -1
+        scores[:] = -1
+        assert log.flush(timeout=10)
+    finally:
+        log.close()
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute('SELECT features, risk_score FROM predictions ORDER BY id').fetchall()
+    assert rows == [('[1.0, 2.0, 4.0, 3.0, 1.0]', 0.25), ('[0.0, 1.0, 1.0, 1.0, 2.0]', 0.75)]
+
+
+def test_close_unregisters_atexit_hook(tmp_path, monkeypatch):
+    """关闭后不再由 atexit 持有，避免已关闭的日志对象一直留在内存中"""
+    registered = []
+    monkeypatch.setattr(atexit, 'register', registered.append)
+    monkeypatch.setattr(atexit, 'unregister', registered.remove)
+    log = AuditLog(str(tmp_path / 'audit.db'))
+    assert registered == [log.close]
+    log.close()
+    assert registered == []
+    assert not log.record(None, [1, 2, 4, 3, 1], 0.5, 0.001)
+    log.close()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+测试批量打分：多进程结果顺序、列式文件与 Excel 输入、分组风险汇总的分块/进程合并
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.batch_scorer import BatchScorer
+from mlpredict.app.services.cohort_aggregator import CohortAggregator
+from mlpredict.app.services.feature_schema import FEATURE_SCHEMA
+from mlpredict.app.services import columnar_io, parallel_scorer
+from mlpredict.app.services.parallel_scorer import ParallelScorer
+from mlpredict.app.services.risk import RISK_LEVELS, risk_levels
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+
+@pytest.fixture(scope='module')
+def survey(tmp_path_factory):
+    """随机问卷导出文件：原始回答列（部分为中文列名）、地区、年龄和行号"""
+    rng = np.random.default_rng(0)
+    n = 3000
+    data = {}
+    for i, spec in enumerate(FEATURE_SCHEMA):
+        # 一半的特征使用中文列名，覆盖列名别名
+        data[spec.name if i % 2 else spec.key] = rng.choice(spec.options + ['', '未知'], n)
+    data['region'] = rng.choice(['北京', '上海', '四川', ''], n)
+    data['age'] = rng.integers(1, 95, n).astype(str)
+    data['age'][::40] = '未知'
+    data['id'] = np.arange(n).astype(str)
+    path = tmp_path_factory.mktemp('survey') / 'survey.csv'
+    pd.DataFrame(data).to_csv(path, index=False)
+    return str(path)
+
+
+def test_parallel_scoring_keeps_input_order(survey, tmp_path):
+    """多进程打分的输出与单进程逐行相同，并保持输入顺序"""
+    serial_path, parallel_path = tmp_path / 'serial.csv', tmp_path / 'parallel.csv'
+    BatchScorer(model_dir=MODEL_DIR, chunk_size=250).score_file(survey, str(serial_path))
+    ParallelScorer(model_dir=MODEL_DIR, chunk_size=250, workers=2, max_pending=3).score_file(
+        survey, str(parallel_path)
+    )
+    serial = pd.read_csv(serial_path, dtype=str, keep_default_na=False)
+    parallel = pd.read_csv(parallel_path, dtype=str, keep_default_na=False)
+    assert parallel['id'].tolist() == [str(i) for i in range(len(parallel))]
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_parallel_scorer_loads_model_only_in_workers(tmp_path):
+    """主进程不加载模型，工作进程按给定选项加载；加载失败时打分抛出 RuntimeError"""
+    scorer = ParallelScorer(model_dir=MODEL_DIR, workers=1, use_score_table=False, use_mmap_artifact=False)
+    assert scorer.model_service is None
+
+    parallel_scorer._init_worker(scorer.model_dir, scorer.model_options)
+    service = parallel_scorer._worker_scorer.model_service
+    assert service.model_loaded
+    assert not service.use_score_table and not service.use_mmap_artifact and service.use_linear_artifact
+
+    survey = tmp_path / 'survey.csv'
+    pd.DataFrame({spec.key: spec.options[:1] for spec in FEATURE_SCHEMA}).to_csv(survey, index=False)
+    broken = ParallelScorer(model_dir=str(tmp_path / 'missing'), workers=1)
+    with pytest.raises(RuntimeError):
+        broken.score_file(str(survey), str(tmp_path / 'out.csv'))
+
+
+def test_progress_is_reported_through_callback(survey, tmp_path, capsys):
+    """进度只通过回调报告，打分本身不向终端输出"""
+    calls = []
+    stats = BatchScorer(model_dir=MODEL_DIR, chunk_size=1000).score_file(
+        survey, str(tmp_path / 'scored.csv'), progress=lambda rows, elapsed: calls.append(rows)
+    )
+    assert calls == [1000, 2000, 3000]
+    assert stats['rows'] == 3000
+    captured = capsys.readouterr()
+    assert captured.out == '' and captured.err == ''
+
+
+def write_input(frame: pd.DataFrame, path: str, input_format: str):
+    """把问卷导出表写成指定格式的输入文件"""
+    if input_format == 'xlsx':
+        frame.to_excel(path, index=False)
+        return
+    import pyarrow as pa
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if input_format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, path, row_group_size=1000)
+    else:
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table, max_chunksize=1000)
+
+
+def read_output(path: str) -> pd.DataFrame:
+    output_format = columnar_io.file_format(path)
+    if output_format == 'parquet':
+        return pd.read_parquet(path)
+    if output_format == 'arrow':
+        import pyarrow as pa
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+    return pd.read_csv(path, dtype={'id': str, 'risk_level': str}, keep_default_na=False,
+                       float_precision='round_trip')
+
+
+@pytest.mark.parametrize('input_format, output_name, module', [
+    ('parquet', 'scored.parquet', 'pyarrow'),
+    ('arrow', 'scored.arrow', 'pyarrow'),
+    ('xlsx', 'scored.csv', 'openpyxl'),
+])
+def test_columnar_and_excel_inputs_match_csv(survey, tmp_path, input_format, output_name, module):
+    """Parquet / Arrow IPC / .xlsx 输入的打分结果与 CSV 输入相同，列式输入按同一格式写出"""
+    pytest.importorskip(module)
+    frame = pd.read_csv(survey, dtype=str, keep_default_na=False)
+    input_path = str(tmp_path / f'survey.{input_format}')
+    write_input(frame, input_path, input_format)
+
+    scorer = BatchScorer(model_dir=MODEL_DIR, chunk_size=700)
+    scorer.score_file(survey, str(tmp_path / 'expected.csv'))
+    stats = scorer.score_file(input_path, str(tmp_path / output_name))
+    assert stats['rows'] == len(frame)
+
+    expected = read_output(str(tmp_path / 'expected.csv'))
+    actual = read_output(str(tmp_path / output_name))
+    assert actual['id'].astype(str).tolist() == frame['id'].tolist()
+    assert np.array_equal(actual['risk_score'].to_numpy(dtype=np.float64), expected['risk_score'].to_numpy())
+    assert actual['risk_level'].astype(str).tolist() == expected['risk_level'].tolist()
+
+
+def expected_report(survey: str, by: list) -> pd.DataFrame:
+    """逐行打分后用 pandas groupby 计算的参照结果"""
+    frame = pd.read_csv(survey, dtype=str, keep_default_na=False)
+    frame['score'] = BatchScorer(model_dir=MODEL_DIR).compute_scores(frame)
+    frame['level'] = risk_levels(frame['score'].to_numpy())
+    grouped = frame.groupby(by)
+    expected = pd.DataFrame({
+        'count': grouped.size(),
+        'mean_risk': grouped['score'].mean(),
+        'std_risk': grouped['score'].std(ddof=0)
+    })
+    levels = pd.crosstab([frame[c] for c in by], frame['level']).reindex(columns=RISK_LEVELS, fill_value=0)
+    return expected.join(levels)
+
+
+def check_report(report: pd.DataFrame, expected: pd.DataFrame, by: list, score_bins: int):
+    report = report.set_index(by).sort_index()
+    expected = expected.sort_index()
+    assert report.index.tolist() == expected.index.tolist()
+    assert report['count'].tolist() == expected['count'].tolist()
+    assert np.allclose(report['mean_risk'], expected['mean_risk'], rtol=0, atol=1e-12)
+    assert np.allclose(report['std_risk'], expected['std_risk'], rtol=0, atol=1e-9)
+    for level in RISK_LEVELS:
+        assert report[level].tolist() == expected[level].tolist()
+    histogram = report[[c for c in report.columns if c.startswith('score_')]]
+    assert histogram.shape[1] == score_bins
+    assert histogram.sum(axis=1).tolist() == report['count'].tolist()
+
+
+@pytest.mark.parametrize('by', [['region'], ['region', '家庭厕所类型']])
+def test_cohort_report_matches_groupby(survey, by):
+    """分块累加再合并的结果与整表 groupby 相同，与分块大小无关"""
+    expected = expected_report(survey, by)
+    for chunk_size in (100, 3000):
+        scorer = BatchScorer(model_dir=MODEL_DIR, chunk_size=chunk_size)
+        report = scorer.aggregate_file(survey, by, score_bins=5)['report']
+        check_report(report, expected, by, score_bins=5)
+
+
+def test_parallel_cohort_report_matches_serial(survey):
+    """工作进程返回的部分汇总在主进程合并后与单进程结果相同"""
+    by = ['region']
+    serial = BatchScorer(model_dir=MODEL_DIR, chunk_size=200).aggregate_file(survey, by)
+    parallel = ParallelScorer(model_dir=MODEL_DIR, chunk_size=200, workers=2).aggregate_file(survey, by)
+    assert parallel['rows'] == serial['rows'] == 3000
+    check_report(parallel['report'], expected_report(survey, by), by, score_bins=10)
+
+
+def test_cohort_bands(survey):
+    """数值列按边界分段，无法转换为数值的值归入空分组"""
+    report = BatchScorer(model_dir=MODEL_DIR, chunk_size=500).aggregate_file(
+        survey, ['age'], bands={'age': [0, 18, 60, float('inf')]}
+    )['report']
+    frame = pd.read_csv(survey, dtype=str, keep_default_na=False)
+    ages = pd.to_numeric(frame['age'], errors='coerce')
+    counts = dict(zip(report['age'].astype(object).where(report['age'].notna(), None), report['count']))
+    assert counts == {
+        '0-18': int((ages < 18).sum()),
+        '18-60': int(((ages >= 18) & (ages < 60)).sum()),
+        '60+': int((ages >= 60).sum()),
+        None: int(ages.isna().sum())
+    }
+
+
+def test_cohort_merge_is_order_independent():
+    rng = np.random.default_rng(1)
+    groups = pd.DataFrame({'region': rng.choice(['a', 'b', 'c'], 1000)})
+    scores = rng.random(1000)
+    whole = CohortAggregator(['region'])
+    whole.update(groups, scores)
+    parts = [CohortAggregator(['region']) for _ in range(3)]
+    for part, index in zip(parts, np.array_split(np.arange(1000), 3)):
+        part.update(groups.iloc[index], scores[index])
+    merged = CohortAggregator(['region'])
+    for part in reversed(parts):
+        merged.merge(part)
+    pd.testing.assert_frame_equal(merged.report(), whole.report(), check_exact=False, atol=1e-12)
+
+
+def test_cohort_rejects_bands_outside_group_by():
+    with pytest.raises(ValueError):
+        CohortAggregator(['region'], bands={'age': [0, 18]})
+    with pytest.raises(ValueError):
+        CohortAggregator(['age'], bands={'age': [18, 0]})
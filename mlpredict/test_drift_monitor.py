@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+测试漂移监控：分片统计的合并，以及监控出错时不影响预测
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.drift_monitor import DriftMonitor
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS
+from mlpredict.app.services.model_service import ModelService
+from mlpredict.app.services.risk import positive_scores
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+
+def random_features(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.array([[rng.choice(np.array([np.nan if v is None else v for v in domain]))
+                      for domain in FEATURE_DOMAINS] for _ in range(n)])
+
+
+class BrokenMonitor(DriftMonitor):
+    """每次更新都抛出异常的漂移监控"""
+
+    def update(self, features, prediction):
+        raise RuntimeError("monitor is broken")
+
+    def update_batch(self, X, prediction):
+        raise RuntimeError("monitor is broken")
+
+
+@pytest.fixture(scope='module')
+def model_service():
+    service = ModelService(model_dir=MODEL_DIR)
+    assert service.model_loaded
+    return service
+
+
+def test_drift_monitor_merge_matches_single_monitor(model_service):
+    """按分片分别统计再合并，与一个监控器统计全部数据的结果相同"""
+    X = random_features(1000, seed=1)
+    prediction = model_service.predict_batch(X)
+
+    whole = DriftMonitor()
+    whole.update_batch(X, prediction)
+    merged = DriftMonitor()
+    for index in np.array_split(np.arange(len(X)), 4):
+        part = DriftMonitor()
+        for i in index[:10]:
+            part.update(X[i], prediction[i])
+        part.update_batch(X[index[10:]], prediction[index[10:]])
+        merged.merge(part)
+
+    # 计数完全相同，分数和只差浮点累加顺序
+    merged_state, whole_state = merged.to_dict(), whole.to_dict()
+    assert merged_state.pop('score_sum') == pytest.approx(whole_state.pop('score_sum'), rel=1e-12)
+    assert merged_state == whole_state
+    restored = DriftMonitor.from_dict(merged.to_dict())
+    assert restored.report()['score']['mean'] == pytest.approx(positive_scores(prediction).mean(), abs=1e-12)
+
+    whole.set_reference(restored)
+    assert whole.report()['max_psi'] == pytest.approx(0.0, abs=1e-12)
+
+
+def test_monitor_errors_do_not_fail_predictions(model_service):
+    """漂移监控出错时，单条、批量预测和贡献计算照常返回结果"""
+    X = random_features(50, seed=2)
+    expected = model_service.predict_batch(X)
+    service = ModelService(model_dir=MODEL_DIR, prediction_cache_size=16, drift_monitor=BrokenMonitor())
+    assert np.array_equal(service.predict_batch(X), expected)
+    prediction, contributions = service.explain_batch(X)
+    assert np.array_equal(prediction, expected)
+    assert contributions.shape == X.shape
+    for _ in range(2):
+        assert np.array_equal(service.predict(list(X[0])), expected[0])
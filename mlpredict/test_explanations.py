@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+测试逐特征风险贡献：基线对数几率加各特征贡献等于模型的对数几率
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.explanations import LinearExplainer
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS, FEATURE_NAMES
+from mlpredict.app.services.linear_scorer import LinearScorer, compile_linear_model
+from mlpredict.app.services.model_service import ModelService
+from mlpredict.app.services.score_table import domain_grid
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+
+def test_contributions_sum_to_logit_over_domain():
+    """在整个输入域（含缺失值）上，基线 + Σ 贡献 与 decision_function 的误差不超过 1e-12"""
+    service = ModelService(model_dir=MODEL_DIR, use_score_table=False, use_linear_artifact=False,
+                           use_mmap_artifact=False)
+    X = domain_grid(FEATURE_DOMAINS)
+    prediction, contributions = service.explain_batch(X)
+    assert contributions.shape == (len(X), len(FEATURE_NAMES))
+
+    model_input = pd.DataFrame(np.nan_to_num(X, nan=0.0), columns=FEATURE_NAMES)
+    logit = service.model.decision_function(model_input)
+    reconstructed = service.contribution_baseline() + contributions.sum(axis=1)
+    assert np.max(np.abs(reconstructed - logit)) <= 1e-12
+    assert np.array_equal(prediction, service.predict_batch(X))
+
+
+def test_linear_scorer_and_pipeline_give_same_contributions():
+    service = ModelService(model_dir=MODEL_DIR, use_score_table=False, use_linear_artifact=False,
+                           use_mmap_artifact=False)
+    X = domain_grid(FEATURE_DOMAINS)
+    scorer = LinearScorer(compile_linear_model(service.model, FEATURE_NAMES))
+    from_pipeline = LinearExplainer.from_model(service.model, FEATURE_NAMES, X)
+    from_scorer = LinearExplainer.from_model(scorer, FEATURE_NAMES, X)
+    assert from_pipeline.baseline_logit == from_scorer.baseline_logit
+    assert np.array_equal(from_pipeline.contributions(X), from_scorer.contributions(X))
+
+
+def test_baseline_contributions_average_to_zero():
+    """贡献相对于基线输入的平均贡献，在基线输入上的平均值为 0"""
+    service = ModelService(model_dir=MODEL_DIR, use_score_table=False)
+    X = domain_grid(FEATURE_DOMAINS)
+    explainer = LinearExplainer.from_model(service.model, FEATURE_NAMES, X)
+    assert np.allclose(explainer.contributions(X).mean(axis=0), 0.0, rtol=0, atol=1e-12)
+
+
+def test_unsupported_model_has_no_explainer():
+    assert LinearExplainer.from_model(object(), FEATURE_NAMES, domain_grid(FEATURE_DOMAINS)) is None
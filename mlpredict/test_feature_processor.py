@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+测试批量特征编码与逐条编码的结果一致
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.feature_processor import FeatureProcessor
+from mlpredict.app.services.feature_schema import FEATURE_KEYS, FEATURE_SCHEMA
+
+# 每个字段除界面选项外还测试的回答：空回答、未知回答、带空格和'+'的多选回答
+EXTRA_ANSWERS = ['', '未知', ' 超市 + 菜市场', '抽水马桶+传统旱厕', '+', '未填+', '都有+街头小贩']
+
+
+def random_rows(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    answers = {spec.key: spec.options + list(spec.mapping) + spec.missing + EXTRA_ANSWERS for spec in FEATURE_SCHEMA}
+    return [{key: str(rng.choice(values)) for key, values in answers.items()} for _ in range(n)]
+
+
+def per_row(processor: FeatureProcessor, rows: list) -> np.ndarray:
+    return np.array(
+        [[np.nan if v is None else v for v in processor.process_all_features(row)] for row in rows],
+        dtype=np.float64
+    )
+
+
+def test_transform_frame_matches_process_all_features():
+    """批量编码与逐条编码逐位相同（None 对应 NaN）"""
+    processor = FeatureProcessor()
+    rows = random_rows(5000)
+    expected = per_row(processor, rows)
+    actual = processor.transform_frame(pd.DataFrame(rows))
+    assert actual.dtype == np.float64
+    assert np.array_equal(actual, expected, equal_nan=True)
+    assert not np.isinf(actual).any()
+
+
+def test_categorical_columns_match_process_all_features():
+    """Categorical 列（如 Parquet/Arrow 的字典列）按字典编码，结果相同"""
+    processor = FeatureProcessor()
+    rows = random_rows(2000, seed=1)
+    frame = pd.DataFrame(rows).astype('category')
+    assert np.array_equal(processor.transform_frame(frame), per_row(processor, rows), equal_nan=True)
+
+
+def test_missing_cells_are_empty_answers():
+    """缺少的列和空单元格按空回答处理"""
+    processor = FeatureProcessor()
+    frame = pd.DataFrame({'toilet_type': ['抽水马桶', None], 'vegetable_purchase': [np.nan, '超市']})
+    expected = per_row(processor, [
+        {'toilet_type': '抽水马桶', 'vegetable_purchase': ''},
+        {'toilet_type': '', 'vegetable_purchase': '超市'}
+    ])
+    assert np.array_equal(processor.transform_frame(frame), expected, equal_nan=True)
+
+
+@pytest.mark.parametrize('value', [5, 1.5])
+def test_non_string_multi_select_answers_are_rejected(value):
+    """多选回答不是字符串时，逐条和批量处理都报错，而不是得到 -inf"""
+    processor = FeatureProcessor()
+    row = dict(random_rows(1)[0], toilet_type=value)
+    with pytest.raises(AttributeError):
+        processor.process_all_features(row)
+    with pytest.raises(TypeError):
+        processor.transform_frame(pd.DataFrame([row]))
+
+
+def test_transform_arrays_rejects_unequal_lengths():
+    processor = FeatureProcessor()
+    columns = [['是']] * (len(FEATURE_KEYS) - 1) + [['超市', '超市']]
+    with pytest.raises(ValueError):
+        processor.transform_arrays(*columns)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+测试性能指标：阶段耗时与计数器的记录、导出，以及关闭时不记录
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.metrics import METRIC_PREFIX, MetricsRegistry, metrics
+from mlpredict.app.services.model_service import ModelService
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+
+@pytest.fixture
+def global_metrics():
+    """开启并清空全局指标，测试结束后恢复原来的开关状态"""
+    enabled = metrics.enabled
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.reset()
+    metrics.enabled = enabled
+
+
+def test_stages_and_counters_are_recorded_and_exported():
+    registry = MetricsRegistry(enabled=True)
+    for _ in range(3):
+        with registry.timer('ui_render'):
+            pass
+    registry.observe('ui_render', 0.5)
+    registry.inc('model_loads_total', source='joblib')
+    registry.inc('predicted_rows_total', 10)
+    registry.inc('predicted_rows_total', 5)
+
+    snapshot = registry.snapshot()
+    stage = snapshot['stages']['ui_render']
+    assert stage['count'] == 4
+    assert stage['sum'] >= 0.5
+    assert sum(stage['buckets'].values()) == 4
+    counters = {(c['name'], tuple(c['labels'].items())): c['value'] for c in snapshot['counters']}
+    assert counters == {('model_loads_total', (('source', 'joblib'),)): 1, ('predicted_rows_total', ()): 15}
+
+    text = registry.to_prometheus()
+    name = f'{METRIC_PREFIX}stage_duration_seconds'
+    assert f'{name}_bucket{{stage="ui_render",le="+Inf"}} 4' in text
+    assert f'{name}_count{{stage="ui_render"}} 4' in text
+    assert f'{METRIC_PREFIX}model_loads_total{{source="joblib"}} 1' in text
+    assert f'{METRIC_PREFIX}predicted_rows_total 15' in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    with registry.timer('ui_render'):
+        pass
+    registry.observe('ui_render', 0.5)
+    registry.inc('predicted_rows_total', 10)
+    assert registry.snapshot() == {'enabled': False, 'stages': {}, 'counters': []}
+    assert registry.to_prometheus() == '\n'
+
+
+def test_model_service_stages_are_timed(global_metrics):
+    """预测经过的各阶段记录在全局指标中"""
+    service = ModelService(model_dir=MODEL_DIR, use_score_table=False)
+    service.predict_batch([[1, 2, 4, 3, 1], [0, 1, 1, 1, 2]])
+    snapshot = global_metrics.snapshot()
+    assert {'load_model', 'predict_batch', 'predict_proba'} <= set(snapshot['stages'])
+    counters = {c['name']: c['value'] for c in snapshot['counters'] if not c['labels']}
+    assert counters['predicted_rows_total'] == 2
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+测试动态合批：合批结果与单独预测一致、逐行校验与错误隔离、关闭后拒绝请求
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS
+from mlpredict.app.services.micro_batcher import MicroBatcher
+from mlpredict.app.services.model_service import ModelService
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+# 让 FailingService 抛出异常的特征值
+POISON = 99.0
+
+
+def random_features(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.array([[rng.choice(np.array([np.nan if v is None else v for v in domain]))
+                      for domain in FEATURE_DOMAINS] for _ in range(n)])
+
+
+class FailingService:
+    """批中含有 POISON 行时整批失败的模型服务"""
+
+    load_error = None
+
+    def __init__(self, model_service: ModelService):
+        self.model_service = model_service
+        self.batch_sizes = []
+
+    def predict_batch(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        self.batch_sizes.append(len(X))
+        if (X == POISON).any():
+            raise ValueError("poisoned batch")
+        return self.model_service.predict_batch(X)
+
+
+@pytest.fixture(scope='module')
+def model_service():
+    service = ModelService(model_dir=MODEL_DIR)
+    assert service.model_loaded
+    return service
+
+
+def test_micro_batches_match_single_predictions(model_service):
+    """并发提交的单条请求合批打分后，各自的结果与单独预测相同"""
+    X = random_features(300)
+    batcher = MicroBatcher(model_service, max_batch_size=16, max_wait_ms=5)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda row: batcher.predict(list(row), timeout=10), X))
+    finally:
+        batcher.close(timeout=10)
+    assert np.array_equal(np.array(results), model_service.predict_batch(X))
+    stats = batcher.stats()
+    assert stats['requests'] == len(X)
+    assert stats['batches'] < len(X)
+
+
+@pytest.mark.parametrize('features', [[1, 2, 3], [1, 2, 'x', 3, 1], [[1, 2, 4, 3, 1]], [1, 2, {}, 3, 1]])
+def test_invalid_rows_are_rejected_on_submit(model_service, features):
+    batcher = MicroBatcher(model_service)
+    try:
+        with pytest.raises(ValueError):
+            batcher.submit(features)
+        assert batcher.stats()['requests'] == 0
+    finally:
+        batcher.close(timeout=10)
+
+
+def test_failed_row_only_fails_its_caller(model_service):
+    """批量打分失败时逐行重试，只有出错的那一行得到异常"""
+    X = random_features(8, seed=2)
+    X[3, 0] = POISON
+    service = FailingService(model_service)
+    batcher = MicroBatcher(service, max_batch_size=len(X), max_wait_ms=1000)
+    try:
+        futures = [batcher.submit(list(row)) for row in X]
+        with pytest.raises(ValueError):
+            futures[3].result(timeout=10)
+        expected = model_service.predict_batch(X)
+        for i, future in enumerate(futures):
+            if i != 3:
+                assert np.array_equal(future.result(timeout=10), expected[i])
+    finally:
+        batcher.close(timeout=10)
+    assert service.batch_sizes[0] == len(X)
+
+
+def test_submit_after_close_is_rejected(model_service):
+    batcher = MicroBatcher(model_service)
+    future = batcher.submit([1, 2, 4, 3, 1])
+    batcher.close(timeout=10)
+    assert future.done()
+    with pytest.raises(RuntimeError):
+        batcher.submit([1, 2, 4, 3, 1])
+    batcher.close(timeout=10)
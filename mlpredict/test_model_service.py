@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+测试模型服务：进程级模型缓存、纯NumPy打分器、全输入域结果表、单条预测缓存与多模型清单
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS
+from mlpredict.app.services.model_registry import MANIFEST_NAME, ModelRegistry
+from mlpredict.app.services.model_service import ModelService
+from mlpredict.app.services.score_table import domain_grid
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+MODEL_FILE = 'best_logistic_regression_model.joblib'
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """只含模型文件和清单的临时模型目录，导出文件不会写入仓库"""
+    for name in (MODEL_FILE, MANIFEST_NAME):
+        shutil.copy(os.path.join(MODEL_DIR, name), tmp_path / name)
+    return str(tmp_path)
+
+
+def sample_inputs(n: int = 2000, seed: int = 0) -> np.ndarray:
+    """整个输入域加上随机抽取（含缺失值）的特征向量"""
+    rng = np.random.default_rng(seed)
+    random_rows = np.array([[rng.choice(np.array([np.nan if v is None else v for v in domain]))
+                             for domain in FEATURE_DOMAINS] for _ in range(n)])
+    return np.vstack([domain_grid(FEATURE_DOMAINS), random_rows])
+
+
+def test_model_cache_reuses_loaded_entry(tmp_path):
+    """同一模型文件只加载一次，文件变化后重新加载"""
+    shutil.copy(os.path.join(MODEL_DIR, MODEL_FILE), tmp_path / MODEL_FILE)
+    ModelService.clear_cache()
+    first = ModelService(model_dir=str(tmp_path), use_score_table=False)
+    second = ModelService(model_dir=str(tmp_path), use_score_table=False)
+    assert first.model_loaded and second.model_loaded
+    assert second.model is first.model
+    assert ModelService.cache_stats()['misses'] == 1
+    assert ModelService.cache_stats()['hits'] == 1
+
+    stat = os.stat(tmp_path / MODEL_FILE)
+    os.utime(tmp_path / MODEL_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert second.load_model()
+    assert second.model is not first.model
+    assert ModelService.cache_stats()['misses'] == 2
+
+
+def test_cache_hit_checks_manifest_sha256(model_dir):
+    """缓存命中时同样校验清单中的校验和，并记录在缓存条目上"""
+    ModelService.clear_cache()
+    ModelService(model_dir=model_dir, use_score_table=False)
+    service = ModelService(model_dir=model_dir, use_score_table=False)
+    assert service.model_loaded
+    assert ModelService.cache_stats()['hits'] == 1
+    assert service.model_fingerprint() == service.model_spec.sha256
+
+
+def test_linear_artifact_matches_predict_proba(model_dir):
+    """导出的纯NumPy打分器与 scikit-learn predict_proba 的误差不超过 1e-12"""
+    reference = ModelService(model_dir=model_dir, use_score_table=False, use_linear_artifact=False,
+                             use_mmap_artifact=False)
+    assert reference.model_loaded
+    artifact = reference.export_linear_artifact()
+    assert os.path.exists(artifact)
+
+    linear = ModelService(model_dir=model_dir, use_score_table=False, use_mmap_artifact=False)
+    assert linear.get_model_info()['model_source'] == 'linear_artifact'
+
+    X = sample_inputs()
+    expected = reference.predict_batch(X)
+    actual = linear.predict_batch(X)
+    assert actual.shape == expected.shape
+    assert np.max(np.abs(actual - expected)) <= 1e-12
+
+
+def test_score_table_matches_model(model_dir):
+    """结果表查表与直接调用模型的预测一致"""
+    table = ModelService(model_dir=model_dir, use_linear_artifact=False, use_mmap_artifact=False)
+    model = ModelService(model_dir=model_dir, use_score_table=False, use_linear_artifact=False,
+                         use_mmap_artifact=False)
+    X = sample_inputs()
+    assert np.allclose(table.predict_batch(X), model.predict_batch(X), rtol=0, atol=1e-12)
+
+
+def test_predict_matches_predict_batch(model_dir):
+    service = ModelService(model_dir=model_dir)
+    X = sample_inputs(200)[-200:]
+    batch = service.predict_batch(X)
+    for row, expected in zip(X, batch):
+        assert np.array_equal(service.predict(list(row)), expected)
+
+
+def test_cached_prediction_is_not_shared_with_caller(model_dir):
+    """修改返回的预测结果不影响缓存中的结果"""
+    service = ModelService(model_dir=model_dir, prediction_cache_size=16)
+    features = [1, 2, 4, 3, 1]
+    first = service.predict(features)
+    expected = first.copy()
+    first[:] = -1
+    hit = service.predict(features)
+    assert np.array_equal(hit, expected)
+    hit[:] = -1
+    assert np.array_equal(service.predict(features), expected)
+    assert service.prediction_cache_stats()['hits'] == 2
+
+
+def test_mmap_artifact_is_memory_mapped(model_dir):
+    """内存映射导出文件加载后模型数组为只读的 np.memmap，预测与 joblib 加载的模型一致"""
+    reference = ModelService(model_dir=model_dir, use_score_table=False, use_linear_artifact=False,
+                             use_mmap_artifact=False)
+    reference.export_mmap_artifact()
+
+    mapped = ModelService(model_dir=model_dir, use_score_table=False, use_linear_artifact=False)
+    assert mapped.get_model_info()['model_source'] == 'mmap_artifact'
+    classifier = mapped.model.steps[-1][1]
+    assert isinstance(classifier.coef_, np.memmap)
+    assert not classifier.coef_.flags.writeable
+
+    X = sample_inputs()
+    assert np.array_equal(mapped.predict_batch(X), reference.predict_batch(X))
+
+
+@pytest.mark.parametrize('export', ['export_linear_artifact', 'export_mmap_artifact'])
+def test_stale_artifact_falls_back_to_joblib(tmp_path, export):
+    """没有清单校验和时按 (mtime, size) 判断导出文件是否过期，模型文件更新后不再使用旧的导出文件"""
+    shutil.copy(os.path.join(MODEL_DIR, MODEL_FILE), tmp_path / MODEL_FILE)
+    options = {'use_score_table': False, 'use_linear_artifact': export == 'export_linear_artifact'}
+    getattr(ModelService(model_dir=str(tmp_path), use_score_table=False, use_linear_artifact=False,
+                         use_mmap_artifact=False), export)()
+    assert ModelService(model_dir=str(tmp_path), **options).get_model_info()['model_source'] != 'joblib'
+
+    stat = os.stat(tmp_path / MODEL_FILE)
+    os.utime(tmp_path / MODEL_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert ModelService(model_dir=str(tmp_path), **options).get_model_info()['model_source'] == 'joblib'
+
+
+def test_registry_follows_manifest_edits(model_dir):
+    """清单增删模型后，注册表为新模型创建服务并移除已删除的模型"""
+    registry = ModelRegistry(model_dir=model_dir, use_score_table=False)
+    manifest_path = os.path.join(model_dir, MANIFEST_NAME)
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    with pytest.raises(KeyError):
+        registry.get('hp-risk', '2.0.0')
+
+    shutil.copy(os.path.join(model_dir, MODEL_FILE), os.path.join(model_dir, 'v2.joblib'))
+    manifest['models'].append(dict(manifest['models'][0], version='2.0.0', file='v2.joblib', sha256=None))
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    # mtime 精度不足时靠文件大小变化识别清单更新
+    service = registry.get('hp-risk', '2.0.0')
+    assert service.model_loaded
+    assert sorted(m['version'] for m in registry.list_models()) == ['1.0.0', '2.0.0']
+
+    manifest['models'] = manifest['models'][1:]
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    assert [m['version'] for m in registry.list_models()] == ['2.0.0']
+    assert registry.get() is service
+    with pytest.raises(KeyError):
+        registry.get('hp-risk', '1.0.0')
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+测试模型热更新：模型文件更新后自动替换，新文件损坏时继续使用旧模型
+"""
+
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.services.model_service import ModelService
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+MODEL_FILE = 'best_logistic_regression_model.joblib'
+FEATURES = [[1, 2, 4, 3, 1], [0, 1, 1, 1, 2]]
+
+
+def wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def service(tmp_path):
+    """临时模型目录（不含清单）上的模型服务，测试结束后停止轮询"""
+    shutil.copy(os.path.join(MODEL_DIR, MODEL_FILE), tmp_path / MODEL_FILE)
+    service = ModelService(model_dir=str(tmp_path), use_score_table=False)
+    assert service.model_loaded
+    yield service
+    service.stop_watching()
+
+
+def test_changed_model_is_swapped_in(service):
+    old_model = service.model
+    old_prediction = service.predict_batch(FEATURES)
+    watcher = service.start_watching(interval=0.05)
+
+    # 截距加 1 的新模型，预测结果不同
+    saved = joblib.load(service.model_file)
+    classifier = saved[0].steps[-1][1]
+    classifier.intercept_ = classifier.intercept_ + 1.0
+    joblib.dump(saved, service.model_file + '.tmp')
+    os.replace(service.model_file + '.tmp', service.model_file)
+
+    assert wait_for(lambda: service.model is not old_model)
+    assert watcher.stats()['reloads'] == 1
+    assert not np.allclose(service.predict_batch(FEATURES), old_prediction)
+
+
+def test_corrupt_model_keeps_previous_model(service):
+    old_model = service.model
+    expected = service.predict_batch(FEATURES)
+    watcher = service.start_watching(interval=0.05)
+
+    with open(service.model_file, 'wb') as f:
+        f.write(b'not a model')
+
+    assert wait_for(lambda: watcher.stats()['failures'] >= 1)
+    assert service.model is old_model
+    assert service.model_loaded
+    assert np.array_equal(service.predict_batch(FEATURES), expected)
+    # 同一个损坏的文件只尝试加载一次
+    time.sleep(0.3)
+    assert watcher.stats()['failures'] == 1
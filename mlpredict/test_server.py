@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+测试HTTP推理服务：在进程内启动服务器，通过真实的HTTP连接请求各接口
+"""
+
+import asyncio
+import json
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.api.server import HTTPServer, PredictionAPI
+from mlpredict.app.services.feature_processor import FEATURE_KEYS
+from mlpredict.app.services.feature_schema import FEATURE_SCHEMA
+from mlpredict.app.services.micro_batcher import MicroBatcher
+from mlpredict.app.services.model_registry import ModelRegistry
+from mlpredict.app.services.risk import positive_scores
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+# 每个字段取第一个界面选项的原始回答
+ANSWERS = {spec.key: spec.options[0] for spec in FEATURE_SCHEMA}
+
+
+@pytest.fixture(params=[False, True], ids=['direct', 'micro_batch'])
+def api(request):
+    """直接预测或经合批器预测的接口"""
+    registry = ModelRegistry(model_dir=MODEL_DIR)
+    model_service = registry.get()
+    micro_batcher = MicroBatcher(model_service, max_batch_size=8, max_wait_ms=1.0) if request.param else None
+    yield PredictionAPI(model_service=model_service, micro_batcher=micro_batcher, model_registry=registry)
+    if micro_batcher is not None:
+        micro_batcher.close()
+
+
+async def _exchange(api: PredictionAPI, method: str, path: str, payload) -> tuple:
+    server = await asyncio.start_server(HTTPServer(api).handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    return status, json.loads(body)
+
+
+def request(api: PredictionAPI, method: str, path: str, payload=None) -> tuple:
+    """发送一个请求，返回 (状态码, 解析后的JSON响应)"""
+    return asyncio.run(_exchange(api, method, path, payload))
+
+
+def test_health(api):
+    status, body = request(api, 'GET', '/health')
+    assert status == 200
+    assert body['status'] == 'ok'
+    assert body['model_name'] == 'hp-risk'
+    assert ('micro_batching' in body) == (api.micro_batcher is not None)
+
+
+def test_predict_matches_model_service(api):
+    features = api.feature_processor.process_all_features(ANSWERS)
+    expected = float(positive_scores(api.model_service.predict_batch([features]))[0])
+    for payload in ({'features': ANSWERS}, {'vector': features}):
+        status, body = request(api, 'POST', '/predict', payload)
+        assert status == 200
+        assert body['features'] == features
+        assert body['risk_score'] == pytest.approx(expected, rel=0, abs=1e-12)
+
+
+def test_predict_batch_matches_model_service(api):
+    rows = [ANSWERS, dict(ANSWERS, toilet_type='抽水马桶+传统旱厕'), {}]
+    vectors = [api.feature_processor.process_all_features(row) for row in rows]
+    expected = positive_scores(api.model_service.predict_batch(vectors))
+    for payload in ({'rows': rows}, {'vectors': vectors}):
+        status, body = request(api, 'POST', '/predict_batch', payload)
+        assert status == 200
+        assert body['count'] == len(rows)
+        assert np.allclose(body['risk_scores'], expected, rtol=0, atol=1e-12)
+
+
+def test_explain_contributions_sum_to_logit(api):
+    """请求体中 explain 为 true 时，基线加各特征贡献等于对数几率"""
+    baseline = api.model_service.contribution_baseline()
+    status, body = request(api, 'POST', '/predict', {'features': ANSWERS, 'explain': True})
+    assert status == 200
+    assert sorted(body['contributions']) == sorted(FEATURE_KEYS)
+    score = body['risk_score']
+    assert baseline + sum(body['contributions'].values()) == pytest.approx(math.log(score / (1 - score)), abs=1e-9)
+
+    status, body = request(api, 'POST', '/predict_batch', {'rows': [ANSWERS, {}], 'explain': True})
+    assert status == 200
+    assert body['contribution_features'] == FEATURE_KEYS
+    for score, contributions in zip(body['risk_scores'], body['contributions']):
+        assert baseline + sum(contributions) == pytest.approx(math.log(score / (1 - score)), abs=1e-9)
+
+
+@pytest.mark.parametrize('path, payload', [
+    ('/predict', {'vector': [1, 2, 3]}),
+    ('/predict', {'vector': [1, 2, 'x', 3, 1]}),
+    ('/predict', {'features': dict(ANSWERS, toilet_type=5)}),
+    ('/predict', {}),
+    ('/predict_batch', {'vectors': [[1, 2, 4, 3, 1], [1, 2]]}),
+    ('/predict_batch', {'rows': [dict(ANSWERS, vegetable_purchase=1.5)]}),
+    ('/predict_batch', {'rows': ['not an object']}),
+])
+def test_bad_requests_are_rejected(api, path, payload):
+    status, body = request(api, 'POST', path, payload)
+    assert status == 400
+    assert 'error' in body
+
+
+def test_unknown_model_and_path(api):
+    status, body = request(api, 'POST', '/predict', {'features': ANSWERS, 'model': 'no-such-model'})
+    assert status == 404
+    assert 'error' in body
+    status, _ = request(api, 'POST', '/predict_batch', {'rows': [ANSWERS], 'model': 'hp-risk', 'version': '9.9'})
+    assert status == 404
+    status, _ = request(api, 'GET', '/no-such-path')
+    assert status == 404
+    status, _ = request(api, 'GET', '/predict')
+    assert status == 405
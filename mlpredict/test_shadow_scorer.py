@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试影子打分：不影响生产模型的响应，候选模型出错或结果不同时记录一致性统计
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mlpredict.app.api.server import PredictionAPI
+from mlpredict.app.services.feature_schema import FEATURE_DOMAINS, FEATURE_SCHEMA
+from mlpredict.app.services.model_service import ModelService
+from mlpredict.app.services.risk import RISK_LEVELS, positive_scores, risk_level_codes
+from mlpredict.app.services.score_table import domain_grid
+from mlpredict.app.services.shadow_scorer import ShadowScorer
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+
+class Candidate:
+    """候选模型：阳性概率与生产模型互补（1 - p），fail 为 True 时抛出异常"""
+
+    load_error = None
+
+    def __init__(self, model_service: ModelService):
+        self.model_service = model_service
+        self.fail = False
+
+    def predict_batch(self, X):
+        if self.fail:
+            raise RuntimeError("candidate crashed")
+        return self.model_service.predict_batch(X)[:, ::-1]
+
+
+@pytest.fixture(scope='module')
+def model_service():
+    service = ModelService(model_dir=MODEL_DIR)
+    assert service.model_loaded
+    return service
+
+
+def test_primary_response_is_unchanged(model_service):
+    rows = [{spec.key: option for spec in FEATURE_SCHEMA} for option in ('', '未知')] + \
+        [{spec.key: spec.options[0] for spec in FEATURE_SCHEMA}]
+    payload = {'rows': rows, 'explain': True}
+    candidate = Candidate(model_service)
+    candidate.fail = True
+    shadow = ShadowScorer(candidate)
+    try:
+        expected = PredictionAPI(model_service=model_service).predict_batch(payload)
+        assert PredictionAPI(model_service=model_service, shadow_scorer=shadow).predict_batch(payload) == expected
+    finally:
+        shadow.close(timeout=10)
+    assert shadow.stats()['errors'] == len(rows)
+
+
+def test_candidate_errors_and_differences_are_recorded(model_service):
+    X = domain_grid(FEATURE_DOMAINS)
+    production = model_service.predict_batch(X)
+    candidate = Candidate(model_service)
+    shadow = ShadowScorer(candidate)
+    try:
+        candidate.fail = True
+        assert shadow.submit(X[:10], production[:10])
+        deadline = time.monotonic() + 10
+        while shadow.stats()['errors'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # 出错后后台线程继续处理后续请求
+        candidate.fail = False
+        assert shadow.submit(X, production)
+        for row, output in zip(X[:5], production[:5]):
+            assert shadow.submit(row, output)
+    finally:
+        shadow.close(timeout=10)
+
+    stats = shadow.stats()
+    assert stats['errors'] == 10
+    assert stats['rows'] == len(X) + 5
+
+    scores = positive_scores(np.vstack([production, production[:5]]))
+    production_levels, candidate_levels = risk_level_codes(scores), risk_level_codes(1.0 - scores)
+    assert stats['agreement_rate'] == pytest.approx(np.mean(production_levels == candidate_levels))
+    assert stats['max_abs_score_diff'] == pytest.approx(np.max(np.abs(1.0 - 2.0 * scores)))
+    for i, level in enumerate(RISK_LEVELS):
+        for j, other in enumerate(RISK_LEVELS):
+            expected = int(np.sum((production_levels == i) & (candidate_levels == j)))
+            assert stats['confusion'][level][other] == expected